@@ -1,4 +1,6 @@
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent.resolve()
-DATA_PATH = BASE_DIR / "data" / "data.json"
\ No newline at end of file
+DATA_PATH = BASE_DIR / "data" / "data.json"
+SNAPSHOT_DIR = BASE_DIR / "data" / "snapshots"
+OPLOG_DIR = BASE_DIR / "data" / "oplog"
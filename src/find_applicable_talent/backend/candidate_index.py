@@ -0,0 +1,500 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+import heapq
+from threading import Lock
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from find_applicable_talent.backend.dynamic_candidate_filter import (
+    CompiledFilter,
+    FilterPlan,
+    compile_path,
+    normalize_string,
+)
+from find_applicable_talent.backend.columnar import Column, ColumnStore, UnsupportedColumn
+from find_applicable_talent.backend.facets import FacetCounter
+from find_applicable_talent.backend.filter_planner import FilterPlanner
+from find_applicable_talent.backend.ranking import FeatureTable
+from find_applicable_talent.backend.search import SearchIndex
+from find_applicable_talent.backend.shared_pool import SharedRecords
+from find_applicable_talent.backend.util.bitmaps import bitmap_from_positions, iter_positions, full_bitmap
+from find_applicable_talent.backend.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+CATEGORICAL_PATHS = (
+    "location",
+    "work_availability",
+    "skills",
+    "education.highest_level",
+    "education.degrees.school",
+    "work_experiences.company",
+    "derived.tokens",
+)
+
+RANGE_PATHS = (
+    "education.most_recent_gpa",
+    "education.degrees.gpa",
+    "education.most_recent_end_date",
+    "education.degrees.startDate",
+    "education.degrees.endDate",
+    "submitted_at",
+    "derived.salary",
+    "derived.salary_full_time",
+    "derived.salary_part_time",
+    "derived.grad_year",
+    "derived.years_since_grad",
+    "derived.job_count",
+)
+
+RANGE_OPERATORS = ("==", ">", ">=", "<", "<=")
+
+
+class UnindexableValue(Exception):
+    pass
+
+
+class InvertedIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.accessor = compile_path(path)
+        # (type, value) -> ascending candidate positions. Removed candidates are not
+        # purged from postings, they are masked out by CandidateIndex.live instead
+        self.postings: Dict[tuple, array] = {}
+        self.values: Dict[tuple, object] = {}
+        # normalized (safe_compare form) value -> keys sharing it
+        self.keys: Dict[object, List[tuple]] = {}
+        self.counts: Dict[tuple, int] = {}
+        self.size = 0
+        self._bitmaps: Dict[tuple, int] = {}
+
+    def build(self, column: Column):
+        # group positions by code with one stable sort, positions stay ascending
+        # within every code; a position can hold the same value twice (two degrees
+        # from one school), dict.fromkeys drops the repeats first
+        pairs = list(dict.fromkeys(column.iter_codes()))
+        codes = [code for _, code in pairs]
+        order = sorted(range(len(pairs)), key=codes.__getitem__)
+        positions = array("L", [pairs[i][0] for i in order])
+        counts = Counter(codes)
+        start = 0
+        for code in range(1, len(column.dictionary)):
+            end = start + counts.get(code, 0)
+            self._register(column.dictionary[code], positions[start:end])
+            start = end
+        self.size = len(column)
+
+    def _register(self, value, posting: array) -> tuple:
+        key = (type(value), value)
+        self.postings[key] = posting
+        self.values[key] = value
+        self.keys.setdefault(_index_key(value), []).append(key)
+        self.counts[key] = len(posting)
+        return key
+
+    def add(self, position: int, candidate):
+        seen = set()
+        for value in self.accessor(candidate):
+            key = (type(value), value)
+            try:
+                if key in seen:
+                    continue
+                seen.add(key)
+            except TypeError:
+                raise UnindexableValue(f"{self.path} has unhashable value {value!r}")
+            posting = self.postings.get(key)
+            if posting is None:
+                self._register(value, array("L", [position]))
+                continue
+            posting.append(position)
+            self.counts[key] += 1
+            if key in self._bitmaps:
+                self._bitmaps[key] |= 1 << position
+        self.size = max(self.size, position + 1)
+
+    def remove(self, position: int, candidate):
+        for key in {(type(value), value) for value in self.accessor(candidate)}:
+            if key in self.counts:
+                self.counts[key] -= 1
+
+    def _posting_mask(self, key: tuple) -> int:
+        mask = self._bitmaps.get(key)
+        if mask is not None:
+            return mask
+        posting = self.postings[key]
+        mask = bitmap_from_positions(posting)
+        # a bitmap costs size / 8 bytes, only keep it around for dense postings
+        if len(posting) * 32 >= self.size:
+            self._bitmaps[key] = mask
+        return mask
+
+    def _equal_keys(self, f: CompiledFilter) -> Optional[tuple]:
+        # the keys an == on a string can match, None for anything else
+        target = f.target_value
+        if f.operator_key == "==" and isinstance(target, str) and target not in ("true", "false"):
+            return self.keys.get(normalize_string(target), ())
+        return None
+
+    def count(self, f: CompiledFilter) -> Optional[int]:
+        # live positions an == on a string matches, None when only evaluating
+        # would tell
+        keys = self._equal_keys(f)
+        if keys is None:
+            return None
+        return sum(self.counts[key] for key in keys)
+
+    def value_counts(self, mask: int) -> List[Tuple[object, int]]:
+        # (value, candidates of `mask` holding it) for every indexed value
+        values = self.values
+        return [(values[key], (self._posting_mask(key) & mask).bit_count()) for key in self.postings]
+
+    def match(self, f: CompiledFilter) -> int:
+        # Evaluating the compiled comparison once per distinct value gives exactly
+        # the scan's any-semantics, since a candidate sits in the posting of every
+        # value it holds
+        keys = self._equal_keys(f)
+        if keys is None:
+            keys = self.postings.keys()
+        values = self.values
+        mask = 0
+        for key in keys:
+            if f.compare(values[key]):
+                mask |= self._posting_mask(key)
+        return mask
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _datetime_key(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+class RangeIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.kind = None  # "float" or "datetime", decided by the first non-null value
+        self.keys = None  # sorted column of numeric keys
+        self.positions = array("L")  # candidate position for each key
+        self.indexed = 0  # positions holding at least one key
+        self.scalar = True  # at most one key per position
+        self.size = 0
+
+    def _key(self, value):
+        # ints compare numerically against every target they can match, so they
+        # share the float key space
+        if isinstance(value, (float, int)) and not isinstance(value, bool) and self.kind != "datetime":
+            self.kind = "float"
+            return float(value)
+        if isinstance(value, datetime) and value.tzinfo is None and self.kind != "float":
+            self.kind = "datetime"
+            return _datetime_key(value)
+        raise UnindexableValue(f"{self.path} has non-{self.kind or 'range'} value {value!r}")
+
+    def build(self, column: Column):
+        code_keys = [None] + [None if v is None else self._key(v) for v in column.dictionary[1:]]
+        elements = [(position, code) for position, code in column.iter_codes() if code_keys[code] is not None]
+        # stable sort by key, positions stay ascending within equal keys
+        element_keys = [code_keys[code] for _, code in elements]
+        order = sorted(range(len(elements)), key=element_keys.__getitem__)
+        self.scalar = column.scalar
+        self.keys = array("d" if self.kind == "float" else "q", map(element_keys.__getitem__, order))
+        self.positions = array("L", [elements[i][0] for i in order])
+        self.indexed = bitmap_from_positions(self.positions)
+        self.size = len(column)
+
+    def add(self, position: int, values: list):
+        keys = [self._key(v) for v in values if v is not None]
+        if not keys:
+            return
+        if not self.keys:
+            # the kind may only just have been decided
+            self.keys = array("d" if self.kind == "float" else "q")
+        if len(keys) > 1:
+            self.scalar = False
+        for key in keys:
+            # positions only ever grow, so bisect_right keeps them ascending within a key
+            i = bisect_right(self.keys, key)
+            self.keys.insert(i, key)
+            self.positions.insert(i, position)
+        self.indexed |= 1 << position
+        self.size = max(self.size, position + 1)
+
+    def _target_key(self, target):
+        # Same coercions safe_compare would apply against float / naive datetime values,
+        # None when the comparison would never hold (or raise) so the caller can fall back
+        if isinstance(target, str) and target in ("true", "false"):
+            return None
+        try:
+            if self.kind == "float":
+                if isinstance(target, datetime):
+                    return None
+                target = float(target)
+                # NaN never compares true, and would confuse bisection
+                return target if target == target else None
+            target = target if isinstance(target, datetime) else datetime.fromisoformat(target)
+        except (TypeError, ValueError):
+            return None
+        if target.tzinfo is not None:
+            return None
+        return _datetime_key(target)
+
+    def span(self, f: CompiledFilter) -> Optional[Tuple[int, int]]:
+        # [lo, hi) of the sorted keys the filter selects, None when it can't be
+        # answered from the keys
+        if self.kind is None or f.operator_key not in RANGE_OPERATORS:
+            return None
+        target = self._target_key(f.target_value)
+        if target is None:
+            return None
+        op = f.operator_key
+        keys = self.keys
+        if op == "==":
+            lo, hi = bisect_left(keys, target), bisect_right(keys, target)
+        elif op == ">":
+            lo, hi = bisect_right(keys, target), len(keys)
+        elif op == ">=":
+            lo, hi = bisect_left(keys, target), len(keys)
+        elif op == "<":
+            lo, hi = 0, bisect_left(keys, target)
+        else:
+            lo, hi = 0, bisect_right(keys, target)
+        return lo, hi
+
+    def match(self, f: CompiledFilter) -> Optional[int]:
+        span = self.span(f)
+        if span is None:
+            return None
+        lo, hi = span
+        keys = self.keys
+        if self.scalar and hi - lo > len(keys) // 2:
+            # cheaper to knock the keys outside the range out of the indexed set
+            outside = bitmap_from_positions(self.positions[:lo]) | bitmap_from_positions(self.positions[hi:])
+            return self.indexed & ~outside
+        return bitmap_from_positions(self.positions[lo:hi])
+
+
+def _index_key(value):
+    if isinstance(value, str):
+        return normalize_string(value)
+    return value
+
+
+class CandidateIndex:
+    def __init__(
+        self,
+        candidates: list,
+        paths: Tuple[str, ...] = CATEGORICAL_PATHS,
+        range_paths: Tuple[str, ...] = RANGE_PATHS,
+        column_paths: Tuple[str, ...] = (),
+    ):
+        # a SharedRecords pool stays mapped, anything else is copied into a list
+        self.pool = candidates if isinstance(candidates, SharedRecords) else list(candidates)
+        # one dictionary-encoded column per path; the indexes below are derived from
+        # them, and paths without an index are evaluated on the column directly.
+        # A shared pool brings its columns along, mapped from its segment.
+        if isinstance(candidates, SharedRecords):
+            self.columns = ColumnStore.from_columns(candidates.segment.columns(), len(self.pool))
+        else:
+            self.columns = self.build_columns(self.pool, paths, range_paths, column_paths)
+        self.positions: Dict[str, int] = {candidate_id: i for i, candidate_id in enumerate(self._ids())}
+        self.live = full_bitmap(len(self.pool))
+        # bumped on every change to `live`, lets cached results tell they're stale
+        self.generation = 0
+        # (generation, positions added in it) for every batch added after the build
+        self.additions: List[Tuple[int, int]] = []
+        # full-text index, built on first use
+        self._search: Optional[SearchIndex] = None
+        self._search_lock = Lock()
+        self._features: Optional[FeatureTable] = None
+        self._facets: Optional[FacetCounter] = None
+        self.planner = FilterPlanner(self)
+        self.indexes: Dict[str, InvertedIndex] = {}
+        for path in paths:
+            column = self.columns.columns.get(path)
+            if column is None:
+                logger.warning("Not indexing %s: no column", path)
+                continue
+            index = InvertedIndex(path)
+            index.build(column)
+            self.indexes[path] = index
+        self.range_indexes: Dict[str, RangeIndex] = {}
+        for path in range_paths:
+            column = self.columns.columns.get(path)
+            if column is None:
+                logger.warning("Not range indexing %s: no column", path)
+                continue
+            range_index = RangeIndex(path)
+            try:
+                range_index.build(column)
+            except UnindexableValue as e:
+                logger.warning("Not range indexing %s: %s", path, e)
+                continue
+            self.range_indexes[path] = range_index
+        logger.info(
+            "Indexed %s candidates on %s; range indexed on %s; %s columns",
+            len(self.pool), ", ".join(self.indexes), ", ".join(self.range_indexes), len(self.columns.columns),
+        )
+
+    @staticmethod
+    def build_columns(
+        candidates: list,
+        paths: Tuple[str, ...] = CATEGORICAL_PATHS,
+        range_paths: Tuple[str, ...] = RANGE_PATHS,
+        column_paths: Tuple[str, ...] = (),
+    ) -> ColumnStore:
+        return ColumnStore(candidates, (*paths, *range_paths, *column_paths))
+
+    def _ids(self) -> Iterable[str]:
+        # every position's id, from the id column when there is one
+        column = self.columns.columns.get("id")
+        if column is not None and column.scalar:
+            return map(column.dictionary.__getitem__, column.codes)
+        return (c.id for c in self.pool)
+
+    def id_of(self, position: int) -> str:
+        column = self.columns.columns.get("id")
+        if column is not None and column.scalar:
+            return column.dictionary[column.codes[position]]
+        return self.pool[position].id
+
+    def position_of(self, candidate_id: str) -> Optional[int]:
+        position = self.positions.get(candidate_id)
+        if position is None or not (self.live >> position) & 1:
+            return None
+        return position
+
+    def remap(self, mask: int, other: "CandidateIndex") -> int:
+        # a mask over `other`'s positions, translated by id onto this index
+        if other is self:
+            return mask & self.live
+        ids = map(other.id_of, iter_positions(mask))
+        positions = self.positions
+        return bitmap_from_positions(
+            position for position in map(positions.get, ids) if position is not None
+        ) & self.live
+
+    def remove(self, candidate_id: str) -> Optional[int]:
+        position = self._tombstone(candidate_id)
+        if position is not None:
+            self.generation += 1
+        return position
+
+    def _tombstone(self, candidate_id: str) -> Optional[int]:
+        position = self.position_of(candidate_id)
+        if position is None:
+            return None
+        candidate = self.pool[position]
+        for index in self.indexes.values():
+            index.remove(position, candidate)
+        self.live &= ~(1 << position)
+        return position
+
+    def upsert(self, candidates: List, removed_ids: Iterable[str] = ()) -> Tuple[int, int, int]:
+        # Applies one batch: candidates replace any live candidate with the same id
+        # (the old slot is tombstoned, the new version appended), removed_ids are
+        # dropped. Every index is updated in place. Returns (added, updated, removed).
+        added = updated = removed = 0
+        for candidate_id in removed_ids:
+            if self._tombstone(candidate_id) is not None:
+                removed += 1
+        new_positions = []
+        for candidate in candidates:
+            if self._tombstone(candidate.id) is None:
+                added += 1
+            else:
+                updated += 1
+            new_positions.append(self._append(candidate))
+        self.generation += 1
+        if new_positions:
+            self.additions.append((self.generation, bitmap_from_positions(new_positions)))
+        return added, updated, removed
+
+    def _append(self, candidate) -> int:
+        position = len(self.pool)
+        self.pool.append(candidate)
+        self.columns.append(position, candidate)
+        for path, index in list(self.indexes.items()):
+            try:
+                index.add(position, candidate)
+            except UnindexableValue as e:
+                logger.warning("No longer indexing %s: %s", path, e)
+                del self.indexes[path]
+        for path, range_index in list(self.range_indexes.items()):
+            try:
+                range_index.add(position, compile_path(path)(candidate))
+            except UnindexableValue as e:
+                logger.warning("No longer range indexing %s: %s", path, e)
+                del self.range_indexes[path]
+        if self._search is not None:
+            self._search.add(position, candidate)
+        self.positions[candidate.id] = position
+        self.live |= 1 << position
+        return position
+
+    @property
+    def search_index(self) -> SearchIndex:
+        if self._search is None:
+            with self._search_lock:
+                if self._search is None:
+                    self._search = SearchIndex(self.columns, self.pool)
+        return self._search
+
+    @property
+    def feature_table(self) -> FeatureTable:
+        # rebuilt once candidates have been appended since it was computed
+        features = self._features
+        if features is None or features.size != len(self.pool):
+            features = self._features = FeatureTable(self)
+        return features
+
+    @property
+    def facet_counter(self) -> FacetCounter:
+        if self._facets is None:
+            self._facets = FacetCounter(self)
+        return self._facets
+
+    def added_since(self, generation: int) -> int:
+        # positions appended after `generation`
+        mask = 0
+        for added_generation, added in reversed(self.additions):
+            if added_generation <= generation:
+                break
+            mask |= added
+        return mask
+
+    def match(self, f: CompiledFilter) -> Optional[int]:
+        mask = None
+        range_index = self.range_indexes.get(f.path)
+        if range_index is not None:
+            mask = range_index.match(f)
+        if mask is None:
+            index = self.indexes.get(f.path)
+            if index is not None:
+                mask = index.match(f)
+            else:
+                mask = self.columns.match(f)
+                if mask is None:
+                    return None
+        if f.invert:
+            return self.live & ~mask
+        return mask & self.live
+
+    def evaluate(self, plan: FilterPlan, base_mask: int) -> int:
+        # ordered and short-circuited by the planner, see filter_planner.py
+        return self.planner.evaluate(plan, base_mask & self.live)
+
+    def sort_positions(self, mask: int, path: str, descending: bool = False, limit: Optional[int] = None) -> List[int]:
+        column = self.columns.columns.get(path)
+        if column is None:
+            raise UnsupportedColumn(f"Can't sort on {path}")
+        keys = column.sort_keys(descending)
+        # both keep position order between equal keys
+        if limit is not None:
+            return heapq.nsmallest(limit, iter_positions(mask), key=keys.__getitem__)
+        return sorted(iter_positions(mask), key=keys.__getitem__)
+
+    def materialize(self, mask: int) -> list:
+        pool = self.pool
+        return [pool[p] for p in iter_positions(mask)]
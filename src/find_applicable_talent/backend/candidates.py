@@ -1,15 +1,46 @@
-from typing import List, Dict, Optional, Union, Callable
+from typing import List, Dict, Optional, Set, Union, Callable, Iterable, Iterator, Tuple
 from find_applicable_talent.backend.util.logger import get_logger
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import json
 import os
+import pickle
 import re
+import time
 import uuid
-from find_applicable_talent.backend.dynamic_candidate_filter import build_filter_functions
+from find_applicable_talent.backend.dynamic_candidate_filter import compile_filters
+from find_applicable_talent.backend.candidate_index import CandidateIndex
+from find_applicable_talent.backend.columnar import leaf_paths
+from find_applicable_talent.backend.dedup import DEDUP_ENABLED, DEDUP_THRESHOLD, deduplicate
+from find_applicable_talent.backend.derived import derive_fields
+from find_applicable_talent.backend.records import (
+    CandidateRecord, DegreeRecord, DerivedRecord, EducationRecord, Interner, WorkRecord, pack_date,
+)
+from find_applicable_talent.backend.listing import paginate, sort_items
+from find_applicable_talent.backend.metrics import FILTER_SELECTIVITY, STAGE_SECONDS
+from find_applicable_talent.backend.ranking import rank_positions
+from find_applicable_talent.backend.result_cache import FilterResultCache, canonical_key, specs_for
+from find_applicable_talent.backend.submissions import iter_submissions, read_ndjson_tail
+from find_applicable_talent.backend.snapshot import load_snapshot, source_header, write_snapshot
+from find_applicable_talent.backend.oplog import DELETE, INGEST, OPLOG_ENABLED, SELECT, UNSELECT, operation_log
+from find_applicable_talent.backend.shared_pool import (
+    EVENT_LOG_FOLD_BYTES, SHARED_POOL, EventLog, LogSuperseded, Segment, SharedRecords, fold_segment, open_segment,
+)
+from find_applicable_talent.backend.util.bitmaps import iter_positions
 from find_applicable_talent.backend import DATA_PATH
 
 logger = get_logger(__name__)
+
+# Set CANDIDATE_LOAD_WORKERS > 1 to parse submissions in a process pool
+LOAD_WORKERS = int(os.environ.get("CANDIDATE_LOAD_WORKERS", "1"))
+SHARD_SIZE = int(os.environ.get("CANDIDATE_SHARD_SIZE", "5000"))
+# Reuse the parsed + filtered pool from data/snapshots/ while the source file is unchanged
+USE_SNAPSHOTS = os.environ.get("CANDIDATE_SNAPSHOTS", "true").lower() == "true"
+
 class WorkExperience(BaseModel):
     company: Optional[str] = None
     roleName: Optional[str] = None
@@ -18,6 +49,26 @@ class WorkExperience(BaseModel):
         super().__init__(**data)
 
 
+def _naive_from_iso(value: str) -> datetime:
+    # every stored datetime is naive, aware ones are converted to UTC first
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_degree_date(value: str) -> Optional[datetime]:
+    # Attempt to parse as a year, then as an ISO date (what the API itself emits)
+    try:
+        return datetime(int(value), 1, 1)
+    except ValueError:
+        pass
+    try:
+        return _naive_from_iso(value.upper())
+    except ValueError:
+        return None
+
+
 class Degree(BaseModel):
     degree: Optional[str] = None
     subject: Optional[str] = None
@@ -50,11 +101,7 @@ class Degree(BaseModel):
             if start_str == "present":
                 data['startDate'] = None
             else:
-                # Attempt to parse as a year
-                try:
-                    data['startDate'] = datetime(int(start_str), 1, 1)
-                except ValueError:
-                    data['startDate'] = None
+                data['startDate'] = _parse_degree_date(start_str)
 
         # Handle endDate
         if isinstance(end, str):
@@ -62,11 +109,7 @@ class Degree(BaseModel):
             if end_str == "present":
                 data['endDate'] = None
             else:
-                # Attempt to parse as a year
-                try:
-                    data['endDate'] = datetime(int(end_str), 1, 1)
-                except ValueError:
-                    data['endDate'] = None
+                data['endDate'] = _parse_degree_date(end_str)
 
         super().__init__(**data)
 
@@ -104,6 +147,23 @@ class Education(BaseModel):
 
         super().__init__(**data)
 
+class DerivedFields(BaseModel):
+    # Filled in from the other fields when a candidate is parsed, see derived.py.
+    # Filterable like any other path, e.g. {"path": "derived.salary", "operator": "<=", ...}
+    salary: Optional[float] = None
+    salary_full_time: Optional[float] = None
+    salary_part_time: Optional[float] = None
+    grad_year: Optional[int] = None
+    years_since_grad: Optional[int] = None
+    job_count: int = 0
+    # lowercase tokens of roles, companies, subjects, schools and skills; filter
+    # with {"path": "derived.tokens", "operator": "==", "value": "python"}
+    tokens: Optional[List[str]] = Field(default=None, exclude=True)
+
+
+SUBMISSION_ID_NAMESPACE = uuid.UUID("9443db47-338f-400d-bb1a-f0f6c720936a")
+
+
 class Candidate(BaseModel):
     id: str
     name: Optional[str] = None
@@ -116,175 +176,845 @@ class Candidate(BaseModel):
     work_experiences: Optional[List[WorkExperience]] = None
     education: Optional[Education] = None
     skills: Optional[List[str]] = None
+    derived: Optional[DerivedFields] = None
+    # IDs of earlier submissions by the same applicant that this one replaced
+    merged_ids: Optional[List[str]] = None
 
     def __init__(self, **data):
-        # Generate a unique ID if one isn't provided
+        # Submissions without an ID get one derived from their content, so the same
+        # submission has the same ID on every load (the operation log refers to IDs)
         if 'id' not in data:
-            data['id'] = str(uuid.uuid4())
+            content = json.dumps(data, sort_keys=True, default=str)
+            data['id'] = str(uuid.uuid5(SUBMISSION_ID_NAMESPACE, content))
             
         # If there's a date-like field for submitted_at, parse it
         submitted_at_value = data.get('submitted_at', None)
         if isinstance(submitted_at_value, str):
-            data['submitted_at'] = datetime.strptime(
-                submitted_at_value, "%Y-%m-%d %H:%M:%S.%f"
-            )
+            try:
+                data['submitted_at'] = datetime.strptime(
+                    submitted_at_value, "%Y-%m-%d %H:%M:%S.%f"
+                )
+            except ValueError:
+                # ISO format, as the API serializes it
+                data['submitted_at'] = _naive_from_iso(submitted_at_value)
+        # always recomputed, never taken from the input
+        data.pop('derived', None)
         super().__init__(**data)
+        self.derived = DerivedFields.model_construct(**derive_fields(self))
+
+
+# Filterable paths that get a column in the index, e.g. "education.degrees.school"
+COLUMN_PATHS = leaf_paths(Candidate)
+
+# Bump whenever the models, their parsing or the eligibility rules change so old
+# snapshots get rebuilt instead of loaded
+CANDIDATE_SNAPSHOT_SCHEMA = 6
+
+
+def _candidate_to_row(c: Candidate) -> tuple:
+    # The row layout is CandidateRecord's slots, nested records as tuples, which is
+    # also what snapshots hold and what parse workers send back
+    education = c.education
+    if education is not None:
+        degrees = education.degrees
+        if degrees is not None:
+            degrees = [
+                (d.degree, d.subject, d.school, d.gpa, pack_date(d.startDate), pack_date(d.endDate),
+                 d.originalSchool, d.isTop50, d.isTop25)
+                for d in degrees
+            ]
+        education = (
+            education.highest_level, degrees, pack_date(education.most_recent_end_date), education.most_recent_gpa,
+        )
+    work_experiences = c.work_experiences
+    if work_experiences is not None:
+        work_experiences = [(w.company, w.roleName) for w in work_experiences]
+    salary = c.annual_salary_expectation
+    if salary is not None:
+        salary = tuple(salary.items())
+    derived = c.derived
+    if derived is not None:
+        # years_since_grad depends on today, it is recomputed from grad_year
+        derived = (
+            derived.salary, derived.salary_full_time, derived.salary_part_time,
+            derived.grad_year, derived.job_count, derived.tokens,
+        )
+    return (
+        c.id, c.name, c.email, c.phone, c.location, c.submitted_at, c.work_availability,
+        salary, work_experiences, education, c.skills, derived, c.merged_ids,
+    )
+
+
+def _record_to_row(r: CandidateRecord) -> tuple:
+    education = r.education
+    if education is not None:
+        degrees = education.degrees
+        if degrees is not None:
+            degrees = [
+                (d.degree, d.subject, d.school, d.gpa, d.start, d.end, d.originalSchool, d.isTop50, d.isTop25)
+                for d in degrees
+            ]
+        education = (education.highest_level, degrees, education.most_recent_end, education.most_recent_gpa)
+    work_experiences = r.work_experiences
+    if work_experiences is not None:
+        work_experiences = [(w.company, w.roleName) for w in work_experiences]
+    derived = r.derived
+    if derived is not None:
+        derived = (
+            derived.salary, derived.salary_full_time, derived.salary_part_time,
+            derived.grad_year, derived.job_count, derived.tokens,
+        )
+    return (
+        r.id, r.name, r.email, r.phone, r.location, r.submitted_at, r.work_availability,
+        r.salary_pairs, work_experiences, education, r.skills, derived, r.merged_ids,
+    )
+
+
+def _record_from_row(row: tuple, intern: Interner) -> CandidateRecord:
+    # Rows were validated before they were written, so nothing is re-parsed; values
+    # that repeat across candidates (places, schools, roles, skills, years...) are
+    # interned, the per-candidate ones (id, name, email, phone) are not
+    (candidate_id, name, email, phone, location, submitted_at, work_availability,
+     salary, work_experiences, education, skills, derived, merged_ids) = row
+    if work_experiences is not None:
+        work_experiences = [
+            WorkRecord(intern(company), intern(role_name)) for company, role_name in work_experiences
+        ]
+    if education is not None:
+        highest_level, degrees, most_recent_end, most_recent_gpa = education
+        if degrees is not None:
+            degrees = [
+                DegreeRecord(
+                    intern(degree), intern(subject), intern(school), intern(gpa), intern(start), intern(end),
+                    intern(original_school), is_top50, is_top25,
+                )
+                for degree, subject, school, gpa, start, end, original_school, is_top50, is_top25 in degrees
+            ]
+        education = EducationRecord(intern(highest_level), degrees, intern(most_recent_end), intern(most_recent_gpa))
+    if derived is not None:
+        salary_headline, salary_full_time, salary_part_time, grad_year, job_count, tokens = derived
+        derived = DerivedRecord(
+            intern(salary_headline), intern(salary_full_time), intern(salary_part_time),
+            intern(grad_year), job_count, intern.all(tokens),
+        )
+    return CandidateRecord(
+        candidate_id, name, email, phone, intern(location), submitted_at, intern.all(work_availability),
+        intern(salary), work_experiences, education, intern.all(skills), derived, merged_ids,
+    )
+
+
+def candidate_model(record: CandidateRecord) -> Candidate:
+    # Builds the pydantic model for one record, for responses; skips validation
+    # like snapshot loading always has
+    work_experiences = record.work_experiences
+    if work_experiences is not None:
+        work_experiences = [
+            WorkExperience.model_construct(company=w.company, roleName=w.roleName) for w in work_experiences
+        ]
+    education = record.education
+    if education is not None:
+        degrees = education.degrees
+        if degrees is not None:
+            degrees = [
+                Degree.model_construct(
+                    degree=d.degree, subject=d.subject, school=d.school, gpa=d.gpa, startDate=d.startDate,
+                    endDate=d.endDate, originalSchool=d.originalSchool, isTop50=d.isTop50, isTop25=d.isTop25,
+                )
+                for d in degrees
+            ]
+        education = Education.model_construct(
+            highest_level=education.highest_level, degrees=degrees,
+            most_recent_end_date=education.most_recent_end_date, most_recent_gpa=education.most_recent_gpa,
+        )
+    derived = record.derived
+    if derived is not None:
+        derived = DerivedFields.model_construct(
+            salary=derived.salary, salary_full_time=derived.salary_full_time,
+            salary_part_time=derived.salary_part_time, grad_year=derived.grad_year,
+            years_since_grad=derived.years_since_grad, job_count=derived.job_count, tokens=derived.tokens,
+        )
+    return Candidate.model_construct(
+        id=record.id, name=record.name, email=record.email, phone=record.phone, location=record.location,
+        submitted_at=record.submitted_at, work_availability=record.work_availability,
+        annual_salary_expectation=record.annual_salary_expectation,
+        work_experiences=work_experiences, education=education, skills=record.skills, derived=derived,
+        merged_ids=record.merged_ids,
+    )
+
+
+def _parse_submission(submission: dict) -> Optional[Candidate]:
+    try:
+        return Candidate(**submission)
+    except Exception as e:
+        print(f"Error: {e} - discarding submission: {submission}")
+        return None
+
+
+def _parse_shard(shard: List[dict]) -> Tuple[List[tuple], float]:
+    # Runs in a worker process: validate and pre-filter one shard of submissions,
+    # sent back as rows (much cheaper to pickle than the models)
+    start = time.perf_counter()
+    kept = []
+    for submission in shard:
+        candidate = _parse_submission(submission)
+        if candidate is not None and CandidateList._is_eligible(candidate):
+            kept.append(_candidate_to_row(candidate))
+    return kept, time.perf_counter() - start
+
+
+def _iter_shards(submissions: Iterable[dict], shard_size: int) -> Iterator[List[dict]]:
+    shard = []
+    for submission in submissions:
+        shard.append(submission)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
 
 
 class CandidateList:
-    def __init__(self, path_to_submissions: str = str(DATA_PATH)):
+    def __init__(
+        self,
+        path_to_submissions: str = str(DATA_PATH),
+        workers: int = LOAD_WORKERS,
+        use_snapshot: bool = USE_SNAPSHOTS,
+        on_progress: Optional[Callable[[str, int], None]] = None,
+        shared: bool = SHARED_POOL,
+        rebuild_token: Optional[str] = None,
+        on_reload: Optional[Callable[[str, str], None]] = None,
+        use_oplog: bool = OPLOG_ENABLED,
+        dedup: bool = DEDUP_ENABLED,
+        dedup_threshold: float = DEDUP_THRESHOLD,
+    ):
         self.path_to_submissions = path_to_submissions
-        self.candidates = []
-        self.selected_candidates = []
-        self.filtered_candidates = []
-        self._load_candidates()
-        self.filtered_candidates = self.candidates.copy()
+        self.workers = workers
+        self.use_snapshot = use_snapshot
+        # called with (phase, submissions read so far) while loading
+        self.on_progress = on_progress
+        # shared mode (see shared_pool.py): the pool is a mapped segment and every
+        # mutation goes through `events`; a reload event from any worker calls
+        # on_reload(path, token) so this worker can follow
+        self.shared = shared
+        self.rebuild_token = rebuild_token
+        self.events: Optional[EventLog] = None
+        self.segment: Optional[Segment] = None
+        self.on_reload = on_reload
+        self.use_oplog = use_oplog
+        # durable selections and deletions, replayed onto every load (oplog.py)
+        self.oplog = operation_log(path_to_submissions) if use_oplog else None
+        # bumped by whoever publishes a reloaded list, see reloader.py
+        self.version = 0
+        # one entry per parsed shard: {"shard", "submissions", "kept", "seconds"}
+        self.load_stats: List[dict] = []
+        # repeat applications folded together on the last load that parsed the
+        # submissions (see dedup.py); snapshots hold the already collapsed pool
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self.dedup_stats: Optional[dict] = None
+        # id -> candidate, in selection order
+        self._selected: Dict[str, CandidateRecord] = {}
+        # ids the operation log has deleted, whether or not they are in the pool;
+        # ingesting one of them again restores it
+        self._deleted: Set[str] = set()
+        # shared values of this list's records; a reload starts a fresh one
+        self._intern = Interner()
+        with STAGE_SECONDS.time("load"):
+            self._load_candidates()
 
     def _load_candidates(self):
-        with open(self.path_to_submissions, 'r') as f:
-            submissions = json.load(f)
+        if not self.shared:
+            self.candidates = self._read_candidates()
+            self.replay_operations()
+            return
+        # only the worker that ends up building the segment reads the submissions
+        self._attach(open_segment(
+            self.path_to_submissions, CANDIDATE_SNAPSHOT_SCHEMA, self.dedup, self.dedup_threshold,
+            self._segment_contents, self.rebuild_token,
+        ))
 
-        # Load candidates while ignoring any invalid entries
-        raw_candidates = []
-        for submission in submissions:
-            try:
-                candidate = Candidate(**submission)
-                raw_candidates.append(candidate)
-            except Exception as e:
-                print(f"Error: {e} - discarding submission: {submission}")
+    def _attach(self, segment: Segment):
+        # Switches to `segment`: its records, the selections it was folded with,
+        # the operation log, then whatever was already logged against it
+        intern = self._intern
+        self.segment = segment
+        self.events = EventLog.for_segment(segment)
+        self.candidates = SharedRecords(segment, lambda blob: _record_from_row(pickle.loads(blob), intern))
+        index = self.index
+        self._selected = {}
+        for candidate_id in segment.header.get("selected", ()):
+            position = index.position_of(candidate_id)
+            if position is not None:
+                self._selected[candidate_id] = index.pool[position]
+        self.replay_operations()
+        # a reload logged against this build has either produced a newer build
+        # already (and open_segment waited for it) or failed
+        for event, _ in self._read_events():
+            if event["op"] != "reload":
+                self._apply(event)
 
-        # Now filter them according to your rules
-        self.candidates = self._filter_candidates(raw_candidates)
+    def _segment_contents(self) -> Tuple[List[tuple], dict]:
+        # rows and index columns of a new segment, see shared_pool.write_segment
+        candidates = self._read_candidates()
+        columns = CandidateIndex.build_columns(candidates, column_paths=COLUMN_PATHS).columns
+        return [_record_to_row(c) for c in candidates], columns
 
-    def _filter_candidates(self, candidates: List[Candidate]) -> List[Candidate]:
-        filtered = []
+    def _folded_contents(self) -> Tuple[List[tuple], dict, dict]:
+        # the pool as it stands once the rest of the log is applied, see fold_segment
+        for event, _ in self.events.read_new():
+            self._apply(event)
+        candidates = self.index.materialize(self.index.live)
+        columns = CandidateIndex.build_columns(candidates, column_paths=COLUMN_PATHS).columns
+        return [_record_to_row(c) for c in candidates], columns, {"selected": list(self._selected)}
 
-        for c in candidates:
-            # 1. Must have at least one degree
-            if not c.education or not c.education.degrees or len(c.education.degrees) < 1:
-                continue
+    def _read_candidates(self) -> List[CandidateRecord]:
+        start = time.perf_counter()
+        rows = None
+        if self.use_snapshot:
+            rows = load_snapshot(
+                self.path_to_submissions, CANDIDATE_SNAPSHOT_SCHEMA, self.dedup, self.dedup_threshold,
+            )
+        if rows is not None:
+            self.load_stats = []
+            self._report("indexing", len(rows))
+            intern = self._intern
+            candidates = [_record_from_row(row, intern) for row in rows]
+            logger.info("Loaded %s candidates from snapshot in %.3fs", len(rows), time.perf_counter() - start)
+            return candidates
 
-            # Find the latest numeric endDate among the degrees
-            # (ignore any 'endDate' that is None or "Present")
-            numeric_end_dates = []
-            for d in c.education.degrees:
-                if d.endDate is not None:  # present => None
-                    numeric_end_dates.append(d.endDate.year)
+        # what the snapshot is stamped with has to describe the file as it was read
+        header = None
+        if self.use_snapshot:
+            header = source_header(
+                self.path_to_submissions, CANDIDATE_SNAPSHOT_SCHEMA, self.dedup, self.dedup_threshold,
+            )
+        if self.workers > 1:
+            candidates = self._load_candidates_parallel()
+        else:
+            # Submissions are streamed one at a time and dropped as soon as they fail
+            # validation or eligibility, so only the retained pool is ever in memory
+            candidates = []
+            submitted = 0
+            for submission in iter_submissions(self.path_to_submissions):
+                submitted += 1
+                if submitted % SHARD_SIZE == 0:
+                    self._report("parsing", submitted)
+                candidate = _parse_submission(submission)
+                if candidate is not None and self._is_eligible(candidate):
+                    candidates.append(self._compact(candidate))
+            self.load_stats = [{
+                "shard": 0, "submissions": submitted, "kept": len(candidates),
+                "seconds": time.perf_counter() - start,
+            }]
 
-            # If there's no numeric endDate, we can't confirm they graduated
-            if not numeric_end_dates:
-                continue
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, "validate")
+        logger.info(
+            "Loaded %s candidates from %s in %.3fs using %s worker(s)",
+            len(candidates), self.path_to_submissions, seconds, max(self.workers, 1),
+        )
+        self._report("indexing", sum(s["submissions"] for s in self.load_stats))
+        # the same submission twice gets the same content ID, keep one of them
+        unique = list({c.id: c for c in candidates}.values())
+        if len(unique) < len(candidates):
+            logger.info("Dropped %s repeated submissions", len(candidates) - len(unique))
+            candidates = unique
+        if self.dedup:
+            with STAGE_SECONDS.time("dedup"):
+                candidates, self.dedup_stats = deduplicate(candidates, self.dedup_threshold)
+            logger.info(
+                "Collapsed %s repeat applications into %s candidates: %s",
+                self.dedup_stats["collapsed"], self.dedup_stats["groups"], self.dedup_stats,
+            )
+        if self.use_snapshot:
+            write_snapshot(self.path_to_submissions, [_record_to_row(c) for c in candidates], header)
+        return candidates
 
-            latest_grad_year = max(numeric_end_dates)
+    def _load_candidates_parallel(self) -> List[CandidateRecord]:
+        # Shards go out to the pool as they are read, with a bounded number in flight,
+        # and come back in submission order so the pool keeps the file's ordering.
+        # spawn rather than fork: reloads happen from a threaded server process.
+        candidates = []
+        self.load_stats = []
+        in_flight = deque()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            shards = _iter_shards(iter_submissions(self.path_to_submissions), SHARD_SIZE)
+            for shard in shards:
+                in_flight.append((len(shard), executor.submit(_parse_shard, shard)))
+                if len(in_flight) >= 2 * self.workers:
+                    self._collect_shard(*in_flight.popleft(), candidates)
+            while in_flight:
+                self._collect_shard(*in_flight.popleft(), candidates)
+        return candidates
 
-            if latest_grad_year < 2000:
-                continue
+    def _collect_shard(self, submitted: int, future, candidates: List[CandidateRecord]):
+        kept, seconds = future.result()
+        shard = len(self.load_stats)
+        self.load_stats.append({"shard": shard, "submissions": submitted, "kept": len(kept), "seconds": seconds})
+        logger.info("Shard %s: kept %s of %s submissions in %.3fs", shard, len(kept), submitted, seconds)
+        intern = self._intern
+        candidates.extend(_record_from_row(row, intern) for row in kept)
+        self._report("parsing", sum(s["submissions"] for s in self.load_stats))
 
-            # 3. Must not have more than 10 total jobs
-            jobs_count = 0
-            if c.work_experiences:
-                jobs_count = len(c.work_experiences)
+    def _compact(self, candidate: Candidate) -> CandidateRecord:
+        return _record_from_row(_candidate_to_row(candidate), self._intern)
 
-            if jobs_count > 10:
-                continue
+    def _report(self, phase: str, submissions: int):
+        if self.on_progress is not None:
+            self.on_progress(phase, submissions)
+
+    # Candidates live in the index's slot array; `index.positions` maps id -> slot and
+    # `index.live` tombstones deleted slots, so lookups and deletes never scan. The
+    # list views below are only materialized (and cached) when someone asks for them.
+    # Everything in here is a CandidateRecord; main.py turns the ones it returns into
+    # Candidate models with candidate_model().
+    @property
+    def candidates(self) -> List[CandidateRecord]:
+        if self._candidates_view is None:
+            self._candidates_view = self.index.materialize(self.index.live)
+        return self._candidates_view
+
+    @candidates.setter
+    def candidates(self, candidates: List[CandidateRecord]):
+        previous = getattr(self, "index", None)
+        with STAGE_SECONDS.time("index"):
+            self.index = CandidateIndex(candidates, column_paths=COLUMN_PATHS)
+        self.filter_cache = FilterResultCache(self.index)
+        self._candidates_view = None
+        self._filtered_view = None
+        if previous is None:
+            self._filtered_mask = self.index.live
+        else:
+            # keep whatever part of the filtered view survived
+            self._filtered_mask = self.index.remap(self._filtered_mask, previous)
+
+    @property
+    def filtered_candidates(self) -> List[CandidateRecord]:
+        if self._filtered_view is None:
+            self._filtered_view = self.index.materialize(self._filtered_mask)
+        return self._filtered_view
+
+    @property
+    def selected_candidates(self) -> List[CandidateRecord]:
+        return list(self._selected.values())
+
+    def __len__(self) -> int:
+        return self.index.live.bit_count()
+
+    def _filter_candidates(self, candidates: List[Candidate]) -> List[Candidate]:
+        return [c for c in candidates if self._is_eligible(c)]
+
+    @staticmethod
+    def _is_eligible(c: Candidate) -> bool:
+        # 1. Must have at least one degree
+        if not c.education or not c.education.degrees or len(c.education.degrees) < 1:
+            return False
+
+        # Find the latest numeric endDate among the degrees
+        # (ignore any 'endDate' that is None or "Present")
+        numeric_end_dates = []
+        for d in c.education.degrees:
+            if d.endDate is not None:  # present => None
+                numeric_end_dates.append(d.endDate.year)
+
+        # If there's no numeric endDate, we can't confirm they graduated
+        if not numeric_end_dates:
+            return False
+
+        latest_grad_year = max(numeric_end_dates)
 
-            # 4. Must not have more than 1 job per year post-college
-            # i.e. (2025 - latest_grad_year) / jobs_count > 1
-            # => 2025 - latest_grad_year > jobs_count
-            # We handle the case of jobs_count = 0 separately (allow?).
-            if jobs_count > 0:
-                years_since_grad = 2025 - latest_grad_year
-                if years_since_grad <= jobs_count:  # means ratio <= 1
-                    continue
+        if latest_grad_year < 2000:
+            return False
 
-            filtered.append(c)
+        # 3. Must not have more than 10 total jobs
+        jobs_count = 0
+        if c.work_experiences:
+            jobs_count = len(c.work_experiences)
 
-        return filtered
+        if jobs_count > 10:
+            return False
+
+        # 4. Must not have more than 1 job per year post-college
+        # i.e. (2025 - latest_grad_year) / jobs_count > 1
+        # => 2025 - latest_grad_year > jobs_count
+        # We handle the case of jobs_count = 0 separately (allow?).
+        if jobs_count > 0:
+            years_since_grad = 2025 - latest_grad_year
+            if years_since_grad <= jobs_count:  # means ratio <= 1
+                return False
+
+        return True
     
+    def upsert_submissions(self, submissions: Iterable[dict]) -> dict:
+        if self.events is not None:
+            stats, ingested = self._logged({"op": "upsert", "submissions": list(submissions)})
+        else:
+            stats, ingested = self._upsert_submissions(submissions)
+        # replayed onto every load, so ingested applicants outlive restarts and reloads
+        for candidate_id, submission in ingested.items():
+            self._log_operation(INGEST, candidate_id, submission)
+        return stats
+
+    def _upsert_submissions(self, submissions: Iterable[dict]) -> Tuple[dict, Dict[str, dict]]:
+        # Delta ingestion: parse and eligibility-check just this batch, then upsert it
+        # by id into the live index. Candidates that no longer qualify are dropped.
+        # Returns the stats and, by id, the submissions that parsed.
+        start = time.perf_counter()
+        parsed, rejected = [], 0
+        ingested: Dict[str, dict] = {}
+        for submission in submissions:
+            candidate = _parse_submission(submission)
+            if candidate is None:
+                rejected += 1
+            else:
+                parsed.append(candidate)
+                # with its id, in case that was derived from the content
+                ingested[candidate.id] = dict(submission, id=candidate.id)
+        # the last version of an id within the batch wins
+        parsed = list({c.id: c for c in parsed}.values())
+        eligible = [self._compact(c) for c in self._filter_candidates(parsed)]
+        STAGE_SECONDS.observe(time.perf_counter() - start, "validate")
+        eligible_ids = {c.id for c in eligible}
+        ineligible_ids = [c.id for c in parsed if c.id not in eligible_ids]
+        restored = [candidate_id for candidate_id in eligible_ids if candidate_id in self._deleted]
+        self._deleted.difference_update(restored)
+
+        added, updated, removed = self.index.upsert(eligible, ineligible_ids)
+        self._candidates_view = None
+        self._filtered_view = None
+        # updated candidates were re-appended, so masks no longer cover them
+        self._filtered_mask &= self.index.live
+        for candidate in eligible:
+            if candidate.id in self._selected:
+                self._selected[candidate.id] = candidate
+
+        stats = {
+            "submissions": len(parsed) + rejected, "rejected": rejected,
+            "ineligible": len(ineligible_ids), "added": added, "updated": updated, "removed": removed,
+            "restored": len(restored), "seconds": time.perf_counter() - start,
+        }
+        logger.info("Upserted submissions: %s", stats)
+        return stats, ingested
+
+    def ingest_tail(self, path: str, offset: int = 0) -> dict:
+        # Upserts the NDJSON lines appended to `path` since `offset`; pass the returned
+        # "offset" back in on the next call
+        submissions, offset = read_ndjson_tail(path, offset)
+        stats = self.upsert_submissions(submissions)
+        stats["offset"] = offset
+        return stats
+
     def reload_candidates(self, path_to_submissions: str = str(DATA_PATH)):
         self.path_to_submissions = path_to_submissions
-        self.candidates = []
-        self.selected_candidates = []
-        self.filtered_candidates = []
-        self._load_candidates()
-        self.filtered_candidates = self.candidates.copy()
+        self._selected = {}
+        self._deleted = set()
+        self._intern = Interner()
+        self.oplog = operation_log(path_to_submissions) if self.use_oplog else None
+        self.index = None
+        with STAGE_SECONDS.time("load"):
+            self._load_candidates()
+
+    def replay_operations(self):
+        # Puts the logged selections and deletions back on this pool. Selections go
+        # first: a selected candidate stays selected after being deleted.
+        if self.oplog is None:
+            return
+        state = self.oplog.state()
+        index = self.index
+        self._deleted = set()
+        if state.ingested:
+            # a filtered view nobody has narrowed yet covers them too
+            everyone = self._filtered_mask == index.live
+            self._upsert_submissions(state.ingested.values())
+            if everyone:
+                self._filtered_mask = index.live
+        self._selected = {}
+        for candidate_id in state.selected:
+            position = index.position_of(candidate_id)
+            if position is not None:
+                self._selected[candidate_id] = index.pool[position]
+        self._deleted = set(state.deleted)
+        removed = sum(1 for candidate_id in state.deleted if self._remove_candidate(candidate_id))
+        logger.info(
+            "Replayed %s ingested submissions, %s selections and %s deletions",
+            len(state.ingested), len(self._selected), removed,
+        )
+
+    def commit(self):
+        # Blocks until the selections and deletions made so far are durable; call it
+        # outside any lock so concurrent requests share the fsync
+        if self.oplog is not None:
+            self.oplog.wait()
+
+    def _log_operation(self, op: str, candidate_id: str, submission: Optional[dict] = None):
+        if self.oplog is not None:
+            self.oplog.append(op, candidate_id, submission)
 
     
-    def dynamic_simple_filters(self, filter_function: Callable[[Candidate], bool], inplace:bool = True) -> List[Candidate]:
+    def dynamic_simple_filters(self, filter_function: Callable[[CandidateRecord], bool], inplace:bool = True) -> List[CandidateRecord]:
         res = [candidate for candidate in self.candidates if filter_function(candidate)]
         if inplace:
             self.candidates = res
         return res
     
-    def dynamic_filters(self, filter_spec_list: List[dict], from_fresh_candidates: bool = True) -> List[Candidate]:
-        filter_funcs = []
-        for spec in filter_spec_list:
-            f = build_filter_functions(
-                path=spec['path'],
-                operator_key=spec['operator'],
-                target_value=spec['value'],
-                invert=spec['invert']
-            )
-            filter_funcs.append(f)
+    def dynamic_filters(self, filter_spec_list: List[dict], from_fresh_candidates: bool = True) -> List[CandidateRecord]:
+        self.dynamic_filter_mask(filter_spec_list, from_fresh_candidates)
+        return self.filtered_candidates
 
-        def pass_all_filters(candidate) -> bool:
-            return all(f(candidate) for f in filter_funcs)
-        
-        if from_fresh_candidates:
-            self.filtered_candidates = [c for c in self.candidates if pass_all_filters(c)]
+    def dynamic_filter_mask(self, filter_spec_list: List[dict], from_fresh_candidates: bool = True) -> int:
+        base_mask = self.index.live if from_fresh_candidates else self._filtered_mask
+        self._filtered_mask = self.evaluate_filters(filter_spec_list, base_mask)
+        self._filtered_view = None
+        return self._filtered_mask
+
+    def evaluate_filters(self, filter_spec_list: List[dict], base_mask: Optional[int] = None) -> int:
+        # Pure: filters base_mask (everyone by default) without touching any shared view
+        index = self.index
+        base_mask = index.live if base_mask is None else base_mask & index.live
+
+        def compute(base: int) -> int:
+            # indexed paths are answered from postings, the rest is scanned
+            with STAGE_SECONDS.time("filter"):
+                mask = index.evaluate(compile_filters(filter_spec_list), base)
+            if base:
+                FILTER_SELECTIVITY.observe(mask.bit_count() / base.bit_count())
+            return mask
+
+        return self.filter_cache.evaluate(filter_spec_list, base_mask, compute)
+
+    def warm_filter_cache(self, keys: Iterable[frozenset]) -> int:
+        # Re-runs queries that were hot elsewhere (e.g. on the list this one replaces)
+        warmed = 0
+        for key in keys:
+            try:
+                self.evaluate_filters(specs_for(key))
+            except Exception as e:
+                logger.warning("Could not warm filter cache entry %s: %s", sorted(key, key=repr), e)
+                continue
+            warmed += 1
+        return warmed
+
+    def search(
+        self, query: str, filter_spec_list: Optional[List[dict]] = None, limit: int = 20,
+        prefix: bool = True, match_all: bool = True, fields: Optional[List[str]] = None,
+        base_mask: Optional[int] = None,
+    ) -> Tuple[int, List[Tuple[CandidateRecord, float]]]:
+        # Keyword search ranked by BM25, restricted to whoever passes the filters
+        mask = self.evaluate_filters(filter_spec_list or [], base_mask)
+        index = self.index
+        total, top = index.search_index.search(query, mask, limit, prefix, match_all, fields)
+        return total, [(index.pool[p], score) for p, score in top]
+
+    def rank(
+        self, weights: Dict[str, float], filter_spec_list: Optional[List[dict]] = None, limit: int = 10,
+        roles: Iterable[str] = (), skills: Iterable[str] = (), salary_budget: Optional[float] = None,
+        base_mask: Optional[int] = None,
+    ) -> Tuple[int, List[Tuple[CandidateRecord, float]]]:
+        # Top `limit` candidates passing the filters by a weighted sum of ranking.FEATURES
+        mask = self.evaluate_filters(filter_spec_list or [], base_mask)
+        index = self.index
+        total, top = rank_positions(index.feature_table, mask, weights, limit, roles, skills, salary_budget)
+        return total, [(index.pool[p], score) for p, score in top]
+
+    def facets(
+        self, filter_spec_list: Optional[List[dict]] = None, base_mask: Optional[int] = None,
+    ) -> Tuple[int, dict]:
+        # (candidates passing the filters, facets.FacetCounter.counts over them)
+        filter_spec_list = filter_spec_list or []
+        mask = self.evaluate_filters(filter_spec_list, base_mask)
+        with STAGE_SECONDS.time("facets"):
+            facets = self.index.facet_counter.counts(mask, canonical_key(filter_spec_list))
+        return mask.bit_count(), facets
+
+    @property
+    def live_mask(self) -> int:
+        return self.index.live
+
+    @property
+    def filtered_mask(self) -> int:
+        return self._filtered_mask
+
+    def page(
+        self, mask: int, sort_by: Optional[str] = None, descending: bool = False,
+        offset: int = 0, limit: Optional[int] = None,
+    ) -> Tuple[int, List[CandidateRecord]]:
+        # (total matches, one page of them); only the page is materialized
+        return mask.bit_count(), list(self.iter_page(mask, sort_by, descending, offset, limit))
+
+    def iter_page(
+        self, mask: int, sort_by: Optional[str] = None, descending: bool = False,
+        offset: int = 0, limit: Optional[int] = None,
+    ) -> Iterator[CandidateRecord]:
+        # Lazy version of page() for streaming; holds on to the pool it started
+        # with, so a concurrent reload doesn't change what it yields
+        pool = self.index.pool
+        end = None if limit is None else offset + limit
+        if sort_by is None:
+            positions = islice(iter_positions(mask), offset, end)
         else:
-            self.filtered_candidates = [c for c in self.filtered_candidates if pass_all_filters(c)]
+            positions = self.index.sort_positions(mask, sort_by, descending, end)[offset:]
+        return map(pool.__getitem__, positions)
 
-        return self.filtered_candidates
+    def selected_page(
+        self, sort_by: Optional[str] = None, descending: bool = False,
+        offset: int = 0, limit: Optional[int] = None,
+    ) -> Tuple[int, List[CandidateRecord]]:
+        selected = self.selected_candidates
+        if sort_by is not None:
+            selected = sort_items(selected, sort_by, descending)
+        return len(selected), paginate(selected, offset, limit)
     
-    def get_candidates(self) -> List[Candidate]:
+    def get_candidates(self) -> List[CandidateRecord]:
         return self.candidates
     
-    def get_filtered_candidates(self) -> List[Candidate]:
+    def get_filtered_candidates(self) -> List[CandidateRecord]:
         return self.filtered_candidates
 
-    def get_candidate_by_id(self, candidate_id: str) -> Optional[Candidate]:
-        for candidate in self.candidates:
-            if candidate.id == candidate_id:
-                return candidate    
-        return None
+    def get_candidate_by_id(self, candidate_id: str) -> Optional[CandidateRecord]:
+        position = self.index.position_of(candidate_id)
+        if position is None:
+            return None
+        return self.index.pool[position]
     
     def remove_candidate_by_id(self, candidate_id: str) -> bool:
-        for candidate in self.filtered_candidates:
-            if candidate.id == candidate_id:
-                self.filtered_candidates.remove(candidate)
+        if self.events is not None:
+            removed = self._logged({"op": "delete", "id": candidate_id})
+        else:
+            removed = self._remove_candidate(candidate_id)
+        if removed:
+            self._log_operation(DELETE, candidate_id)
+        return removed
 
-        for candidate in self.candidates:
-            if candidate.id == candidate_id:
-                self.candidates.remove(candidate)
-                return True
-        return False
+    def _remove_candidate(self, candidate_id: str) -> bool:
+        position = self.index.remove(candidate_id)
+        if position is None:
+            return False
+        self._deleted.add(candidate_id)
+        self._candidates_view = None
+        if (self._filtered_mask >> position) & 1:
+            self._filtered_mask &= ~(1 << position)
+            self._filtered_view = None
+        return True
 
     def select_candidate_by_id(self, candidate_id: str) -> bool:
-        logger.info(f"Selecting candidate {candidate_id}")
-        # logger.info(f"Have candidates: {self.candidates}")
+        if self.events is not None:
+            selected = self._logged({"op": "select", "id": candidate_id})
+        else:
+            selected = self._select_candidate(candidate_id)
+        if selected:
+            self._log_operation(SELECT, candidate_id)
+        return selected
+
+    def _select_candidate(self, candidate_id: str) -> bool:
+        logger.info("Selecting candidate %s", candidate_id)
         candidate = self.get_candidate_by_id(candidate_id)
         if candidate is None:
             return False
-        for c in self.selected_candidates:
-            if c.id == candidate_id:
-                logger.info(f"Candidate {candidate_id} already in selected candidates")
-                return True
+        if candidate_id in self._selected:
+            logger.info("Candidate %s already in selected candidates", candidate_id)
+            return True
             
-        logger.info(f"Adding candidate {candidate.id} to selected candidates")
-        self.selected_candidates.append(candidate)
+        logger.info("Adding candidate %s to selected candidates", candidate_id)
+        self._selected[candidate_id] = candidate
         return True
     
     def remove_selected_candidate_by_id(self, candidate_id: str) -> bool:
-        logger.info(f"Have selected candidates: { ', '.join(s.id for s in self.selected_candidates) }")  
-        for candidate in self.selected_candidates:
-            if candidate.id == candidate_id:
-                self.selected_candidates.remove(candidate)
-                return True
-        return False
-
-    def get_selected_candidates(self) -> List[Candidate]:
-        logger.info(f"Have selected candidates: { ', '.join(s.id for s in self.selected_candidates) }")
+        if self.events is not None:
+            unselected = self._logged({"op": "unselect", "id": candidate_id})
+        else:
+            unselected = self._unselect_candidate(candidate_id)
+        if unselected:
+            self._log_operation(UNSELECT, candidate_id)
+        return unselected
+
+    def _unselect_candidate(self, candidate_id: str) -> bool:
+        logger.info("Have %d selected candidates", len(self._selected))
+        return self._selected.pop(candidate_id, None) is not None
+
+    def request_reload(self, path: str):
+        # shared mode: every worker (this one included) reloads when it sees this
+        self._logged({"op": "reload", "path": path, "token": uuid.uuid4().hex})
+
+    def shared_status(self) -> dict:
+        if self.events is None:
+            return {"shared": False}
+        return {
+            "shared": True,
+            "segment": str(self.segment.path),
+            "build": self.segment.build_id,
+            "generation": self.events.generation,
+            "applied": self.events.offset,
+            "candidates": len(self),
+        }
+
+    def sync(self) -> int:
+        # Applies what other workers logged since the last call, returns the shared
+        # generation. Callers serialize this with the other mutations.
+        if self.events is None:
+            return 0
+        for event, _ in self._read_events():
+            self._apply(event)
+        return self.events.offset
+
+    def _read_events(self) -> List[Tuple[dict, int]]:
+        try:
+            return self.events.read_new()
+        except LogSuperseded:
+            # this build was folded or rebuilt twice over and its log deleted
+            self._attach(Segment(self.segment.path))
+            return []
+
+    def _logged(self, event: dict):
+        # Appends `event`, then applies everything up to and including it in log
+        # order; the result is what applying `event` returned
+        while True:
+            try:
+                end = self.events.append(event)
+                break
+            except LogSuperseded:
+                # another worker folded the log, move to its build and log there
+                self.sync()
+        result = None
+        for logged, offset in self._read_events():
+            applied = self._apply(logged)
+            if offset == end:
+                result = applied
+        if self.events.offset >= EVENT_LOG_FOLD_BYTES:
+            self._fold()
+        return result
+
+    def _fold(self):
+        # Writes the pool as it stands into a new build, so the log starts over
+        # and a starting worker has nothing to replay
+        segment = fold_segment(self.segment, self.events, self._folded_contents)
+        if segment is None:
+            self.sync()
+        else:
+            self._attach(segment)
+
+    def _apply(self, event: dict):
+        op = event["op"]
+        if op == "delete":
+            return self._remove_candidate(event["id"])
+        if op == "select":
+            return self._select_candidate(event["id"])
+        if op == "unselect":
+            return self._unselect_candidate(event["id"])
+        if op == "upsert":
+            return self._upsert_submissions(event["submissions"])
+        if op == "fold":
+            self._attach(Segment(self.segment.path))
+            return None
+        if op == "reload":
+            if self.on_reload is not None:
+                self.on_reload(event["path"], event["token"])
+            return None
+        logger.warning("Ignoring unknown event %r", op)
+        return None
+
+    def get_selected_candidates(self) -> List[CandidateRecord]:
+        logger.info("Have %d selected candidates", len(self._selected))
         return self.selected_candidates
 
 
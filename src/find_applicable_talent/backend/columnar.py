@@ -0,0 +1,359 @@
+from array import array
+from collections import Counter
+from itertools import accumulate, chain, compress, repeat
+from operator import is_not
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, get_args
+from pydantic import BaseModel
+from find_applicable_talent.backend.dynamic_candidate_filter import CompiledFilter, _flatten, compile_path
+from find_applicable_talent.backend.util.bitmaps import TO_ASCII_BITS, bitmap_from_ascii, bitmap_from_positions
+from find_applicable_talent.backend.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+# code 0 is reserved for "path has no value here" and never matches
+_ABSENT = object()
+_MISSING = object()
+
+
+class UnsupportedColumn(ValueError):
+    pass
+
+
+def leaf_paths(model: type, prefix: str = "") -> Tuple[str, ...]:
+    # Every dotted path that ends in a non-model field, e.g. "education.degrees.gpa"
+    paths = []
+    for name, field in model.model_fields.items():
+        nested = _nested_model(field.annotation)
+        if nested is None:
+            paths.append(prefix + name)
+        else:
+            paths.extend(leaf_paths(nested, f"{prefix}{name}."))
+    return tuple(paths)
+
+
+def _nested_model(annotation) -> Optional[type]:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in get_args(annotation):
+        nested = _nested_model(arg)
+        if nested is not None:
+            return nested
+    return None
+
+
+# largest code each code array typecode holds
+_CODE_LIMITS = {"B": (1 << 8) - 1, "H": (1 << 16) - 1, "L": (1 << 32) - 1}
+
+
+def typecode(values) -> str:
+    # of an array, or of a memoryview cast over a mapped one (shared_pool.py)
+    return values.typecode if isinstance(values, array) else values.format
+
+
+def _code_array(codes: Iterable[int], dictionary_size: int) -> array:
+    if dictionary_size <= 1 << 8:
+        return array("B", codes)
+    if dictionary_size <= 1 << 16:
+        return array("H", codes)
+    return array("L", codes)
+
+
+def _lookup_level(objects: list, owners: list, key: str) -> Tuple[list, list]:
+    # getattr over the whole frontier at once, same rules as `_step`: attributes
+    # first, then dict keys, objects with neither drop out
+    values = list(map(getattr, objects, repeat(key), repeat(_MISSING)))
+    present = list(map(is_not, values, repeat(_MISSING)))
+    if all(present):
+        return values, owners
+    for i, obj in enumerate(objects):
+        if not present[i] and isinstance(obj, dict) and key in obj:
+            values[i] = obj[key]
+            present[i] = True
+    return list(compress(values, present)), list(compress(owners, present))
+
+
+def _expand_lists(values: list, owners: list) -> Tuple[list, list]:
+    # lists fan out into their items, keeping the owner of every item
+    is_list = list(map(isinstance, values, repeat(list)))
+    if not any(is_list):
+        return values, owners
+    if all(is_list):
+        # the common case, one flat list per object: chain them in C
+        expanded = list(chain.from_iterable(values))
+        if not any(map(isinstance, expanded, repeat(list))):
+            return expanded, list(chain.from_iterable(map(repeat, owners, map(len, values))))
+    expanded, expanded_owners = [], []
+    for value, owner in zip(values, owners):
+        if isinstance(value, list):
+            flat = []
+            _flatten(value, flat)
+            expanded.extend(flat)
+            expanded_owners.extend(repeat(owner, len(flat)))
+        else:
+            expanded.append(value)
+            expanded_owners.append(owner)
+    return expanded, expanded_owners
+
+
+def extract_columns(objects: list, paths: Tuple[str, ...]) -> List[Tuple[list, list]]:
+    # Resolves every path for every object level by level, one pass over the whole
+    # frontier per path segment instead of one walk per object, sharing common
+    # prefixes ("education.degrees.gpa" and "education.degrees.school" look
+    # education.degrees up once). Returns (values, owner positions) per path, with
+    # owners ascending; values match what compile_path(path) returns per object.
+    trie = {}
+    for slot, path in enumerate(paths):
+        node = trie
+        parts = path.split('.')
+        for depth, key in enumerate(parts):
+            entry = node.setdefault(key, ([], {}))
+            if depth == len(parts) - 1:
+                entry[0].append(slot)
+            node = entry[1]
+
+    results: List[Tuple[list, list]] = [([], []) for _ in paths]
+
+    def walk(node: dict, frontier: list, owners: list):
+        for key, (slots, children) in node.items():
+            values, value_owners = _expand_lists(*_lookup_level(frontier, owners, key))
+            for slot in slots:
+                results[slot] = (values, value_owners)
+            if children and values:
+                walk(children, values, value_owners)
+
+    frontier, owners = _expand_lists(list(objects), list(range(len(objects))))
+    walk(trie, frontier, owners)
+    return results
+
+
+class Column:
+    # Dictionary-encoded column. Scalar paths keep one code per position; list
+    # paths use the Arrow list layout, `offsets[p]:offsets[p + 1]` being the codes
+    # of position p, plus `owners` mapping every element back to its position.
+    # The code arrays may be read-only memoryviews into a mapped segment
+    # (shared_pool.py); they're copied the first time the column is appended to.
+    def __init__(self, path: str):
+        self.path = path
+        self.dictionary: List[object] = [_ABSENT]
+        self.scalar = True
+        self.codes = array("B")
+        self.offsets: Optional[array] = None
+        self.owners: Optional[array] = None
+        self._code_bytes: Optional[bytes] = None
+        self._sort_keys: Dict[bool, array] = {}
+        # (type, value) -> code, only needed to append so built on first use
+        self._lookup: Optional[Dict[tuple, int]] = None
+
+    @classmethod
+    def mapped(cls, path: str, values: list, codes, offsets=None, owners=None) -> "Column":
+        # `values` is the dictionary without the absent code 0, `offsets` and
+        # `owners` are None for a scalar column
+        column = cls(path)
+        column.dictionary = [_ABSENT, *values]
+        column.scalar = offsets is None
+        column.codes, column.offsets, column.owners = codes, offsets, owners
+        return column
+
+    def build(self, values: list, owners: list, size: int):
+        # keyed by type as well, True / 1 / 1.0 don't compare the same way
+        keys = list(zip(map(type, values), values))
+        try:
+            distinct = dict.fromkeys(keys)
+        except TypeError as e:
+            raise UnsupportedColumn(f"{self.path} has unhashable values: {e}")
+        lookup = {key: code for code, key in enumerate(distinct, 1)}
+        self.dictionary = [_ABSENT] + [value for _, value in distinct]
+        codes = list(map(lookup.__getitem__, keys))
+
+        counts = Counter(owners)
+        self.scalar = len(counts) == len(owners)
+        if self.scalar:
+            # one slot per position, absent ones get code 0
+            if len(owners) != size:
+                by_owner = dict(zip(owners, codes))
+                codes = map(by_owner.get, range(size), repeat(0))
+            self.codes = _code_array(codes, len(self.dictionary))
+        else:
+            self.codes = _code_array(codes, len(self.dictionary))
+            self.owners = array("L", owners)
+            self.offsets = array("L", accumulate(map(counts.get, range(size), repeat(0)), initial=0))
+
+    def __len__(self) -> int:
+        if self.scalar:
+            return len(self.codes)
+        return len(self.offsets) - 1
+
+    def _code(self, value) -> int:
+        if self._lookup is None:
+            dictionary = self.dictionary
+            self._lookup = dict(zip(zip(map(type, dictionary), dictionary), range(len(dictionary))))
+            del self._lookup[(object, _ABSENT)]
+        key = (type(value), value)
+        try:
+            code = self._lookup.get(key)
+        except TypeError as e:
+            raise UnsupportedColumn(f"{self.path} has unhashable values: {e}")
+        if code is None:
+            code = self._lookup[key] = len(self.dictionary)
+            self.dictionary.append(value)
+            if code > _CODE_LIMITS[self.codes.typecode]:
+                self.codes = _code_array(self.codes, len(self.dictionary))
+        return code
+
+    def _thaw(self):
+        # mapped arrays are read-only, appending needs copies of its own
+        if not isinstance(self.codes, array):
+            self.codes = array(self.codes.format, self.codes)
+            if not self.scalar:
+                self.offsets = array(self.offsets.format, self.offsets)
+                self.owners = array(self.owners.format, self.owners)
+
+    def _to_list_layout(self):
+        positions = [p for p, c in enumerate(self.codes) if c]
+        self.offsets = array("L", accumulate(map(bool, self.codes), initial=0))
+        self.owners = array("L", positions)
+        self.codes = array(self.codes.typecode, (c for c in self.codes if c))
+        self.scalar = False
+
+    def append(self, position: int, values: list):
+        # `values` (what compile_path returns) become the next position's entry
+        if position != len(self):
+            raise ValueError(f"{self.path}: appending position {position} to a column of {len(self)}")
+        self._thaw()
+        codes = [self._code(v) for v in values]
+        if self.scalar and len(codes) > 1:
+            self._to_list_layout()
+        if self.scalar:
+            self.codes.append(codes[0] if codes else 0)
+        else:
+            self.codes.extend(codes)
+            self.owners.extend(repeat(position, len(codes)))
+            self.offsets.append(self.offsets[-1] + len(codes))
+        self._code_bytes = None
+        self._sort_keys.clear()
+
+    def values_at(self, position: int) -> list:
+        if self.scalar:
+            code = self.codes[position]
+            return [self.dictionary[code]] if code else []
+        return [self.dictionary[c] for c in self.codes[self.offsets[position]:self.offsets[position + 1]]]
+
+    def iter_codes(self) -> Iterator[Tuple[int, int]]:
+        # (position, code) for every stored value, in position order
+        if self.scalar:
+            return ((p, c) for p, c in enumerate(self.codes) if c)
+        return zip(self.owners, self.codes)
+
+    def sort_keys(self, descending: bool = False) -> array:
+        # Rank of every position's value in sort order. None and absent values rank
+        # last either way; a list position ranks by its smallest value ascending and
+        # its largest descending. Columns never change once built, so ranks are cached.
+        keys = self._sort_keys.get(descending)
+        if keys is not None:
+            return keys
+        dictionary = self.dictionary
+        ordered = [code for code in range(1, len(dictionary)) if dictionary[code] is not None]
+        try:
+            ordered.sort(key=dictionary.__getitem__, reverse=descending)
+        except TypeError as e:
+            raise UnsupportedColumn(f"{self.path} has values that don't sort together: {e}")
+        last = len(ordered)
+        ranks = [last] * len(dictionary)
+        for rank, code in enumerate(ordered):
+            ranks[code] = rank
+        if self.scalar:
+            keys = array("L", map(ranks.__getitem__, self.codes))
+        else:
+            keys = array("L", repeat(last, len(self)))
+            for owner, code in zip(self.owners, self.codes):
+                if ranks[code] < keys[owner]:
+                    keys[owner] = ranks[code]
+        self._sort_keys[descending] = keys
+        return keys
+
+    def match(self, f: CompiledFilter) -> int:
+        # One comparison per distinct value, then every code is mapped through the
+        # resulting lookup table in C: bytes.translate for byte-wide codes, a
+        # map over the code array otherwise
+        compare = f.compare
+        flags = bytes([0]) + bytes(1 if compare(v) else 0 for v in self.dictionary[1:])
+        if 1 not in flags:
+            return 0
+        if not self.scalar:
+            # any-semantics: a position matches when any of its elements does
+            return bitmap_from_positions(compress(self.owners, map(flags.__getitem__, self.codes)))
+        table = flags.translate(TO_ASCII_BITS)
+        if self._code_bytes is None and typecode(self.codes) == "B":
+            self._code_bytes = self.codes.tobytes()
+        if self._code_bytes is not None:
+            return bitmap_from_ascii(self._code_bytes.translate(table.ljust(256, b"0")))
+        return bitmap_from_ascii(bytes(map(table.__getitem__, self.codes)))
+
+    def match_positions(self, f: CompiledFilter, positions: Iterable[int]) -> int:
+        # Same result as testing f on the candidates at `positions`, but from the
+        # codes: each distinct value is compared at most once, no record is touched
+        flags = {0: False}
+        compare = f.compare
+        codes = self.codes
+        matched = []
+        if self.scalar:
+            for p in positions:
+                code = codes[p]
+                flag = flags.get(code)
+                if flag is None:
+                    flag = flags[code] = bool(compare(self.dictionary[code]))
+                if flag != f.invert:
+                    matched.append(p)
+        else:
+            offsets = self.offsets
+            for p in positions:
+                flag = False
+                for code in codes[offsets[p]:offsets[p + 1]]:
+                    hit = flags.get(code)
+                    if hit is None:
+                        hit = flags[code] = bool(compare(self.dictionary[code]))
+                    if hit:
+                        flag = True
+                        break
+                if flag != f.invert:
+                    matched.append(p)
+        return bitmap_from_positions(matched)
+
+
+class ColumnStore:
+    def __init__(self, candidates: list, paths: Iterable[str]):
+        paths = tuple(dict.fromkeys(paths))
+        self.columns: Dict[str, Column] = {}
+        self.size = len(candidates)
+        for path, (values, owners) in zip(paths, extract_columns(candidates, paths)):
+            column = Column(path)
+            try:
+                column.build(values, owners, len(candidates))
+            except UnsupportedColumn as e:
+                logger.info("No column for %s: %s", path, e)
+                continue
+            self.columns[path] = column
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Column], size: int) -> "ColumnStore":
+        # columns built elsewhere, e.g. mapped from a shared segment
+        store = cls((), ())
+        store.columns = dict(columns)
+        store.size = size
+        return store
+
+    def append(self, position: int, candidate):
+        for path, column in list(self.columns.items()):
+            try:
+                column.append(position, compile_path(path)(candidate))
+            except UnsupportedColumn as e:
+                # the path is scanned from now on
+                logger.warning("Dropping column %s: %s", path, e)
+                del self.columns[path]
+        self.size = position + 1
+
+    def match(self, f: CompiledFilter) -> Optional[int]:
+        column = self.columns.get(f.path)
+        if column is None:
+            return None
+        return column.match(f)
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+from itertools import compress
+from typing import Dict, List, Optional, Tuple
+from find_applicable_talent.backend.metrics import Counter as MetricCounter
+from find_applicable_talent.backend.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Collapses repeat applications while the pool loads. Candidates sharing a
+# normalized email or phone are one applicant, and so are candidates whose name
+# words, companies and schools nearly coincide. Near duplicates are found with
+# MinHash signatures cut into LSH bands: only candidates landing in the same band
+# bucket are ever compared, so the stage stays linear in the pool instead of
+# comparing every pair. Of each group the most recently submitted candidate is
+# kept, with the IDs of the others in `merged_ids`.
+
+DEDUP_ENABLED = os.environ.get("CANDIDATE_DEDUP", "true").lower() == "true"
+# Jaccard similarity of two candidates' feature sets at which they're the same applicant
+DEDUP_THRESHOLD = float(os.environ.get("CANDIDATE_DEDUP_THRESHOLD", "0.8"))
+# LSH_BANDS bands of LSH_ROWS min-hashes; two candidates at the threshold share at
+# least one band with probability 1 - (1 - 0.8 ** 3) ** 10 > 0.999
+LSH_BANDS = 10
+LSH_ROWS = 3
+# candidates with fewer features (name words + companies + schools) than this
+# carry too little to call them near duplicates of anyone
+MIN_FEATURES = 4
+# members of a bucket are checked against at most this many of its earlier groups,
+# which keeps skewed buckets linear
+BUCKET_COMPARISONS = 4
+# a phone number needs this many digits to identify anyone
+MIN_PHONE_DIGITS = 7
+# RFC 2606 domains, used for placeholder addresses (the bundled data is anonymized
+# that way) that say nothing about who applied
+PLACEHOLDER_EMAIL_DOMAINS = ("example.com", "example.net", "example.org")
+
+DUPLICATES_COLLAPSED = MetricCounter(
+    "candidate_duplicates_collapsed", "Submissions folded into another one while loading, by what matched", ("match",),
+)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NON_DIGIT = re.compile(r"[^0-9]+")
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    # lowercase, without a +tag; None for missing and placeholder addresses
+    if not email or "@" not in email:
+        return None
+    local, _, domain = email.strip().lower().rpartition("@")
+    if not local or domain in PLACEHOLDER_EMAIL_DOMAINS or domain.endswith((".example", ".invalid", ".test")):
+        return None
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    # digits only, without an international 00 prefix
+    if not phone:
+        return None
+    digits = _NON_DIGIT.sub("", str(phone))
+    if digits.startswith("00"):
+        digits = digits[2:]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return _NON_ALNUM.sub(" ", value.lower()).strip() if value else ""
+
+
+def candidate_features(candidate, cache: Optional[dict] = None) -> frozenset:
+    # name words, companies and schools, tagged so a company can't match a school;
+    # `cache` keeps the tagged form of values already seen (companies and schools
+    # repeat a lot)
+    cache = {} if cache is None else cache
+
+    def tagged(tag: str, value: Optional[str]) -> str:
+        feature = cache.get((tag, value))
+        if feature is None:
+            text = _normalize_text(value)
+            feature = cache[(tag, value)] = f"{tag}:{text}" if text else ""
+        return feature
+
+    features = {f"n:{word}" for word in _normalize_text(candidate.name).split()}
+    features.update(tagged("c", job.company) for job in candidate.work_experiences or ())
+    education = candidate.education
+    features.update(
+        tagged("s", degree.originalSchool) for degree in (education.degrees if education is not None else None) or ()
+    )
+    features.discard("")
+    return frozenset(features)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+class MinHasher:
+    # Each feature hashes to LSH_BANDS * LSH_ROWS independent 32-bit values in one
+    # shake_128 call, cached since names, companies and schools repeat a lot; a
+    # signature is the elementwise minimum over a candidate's features
+    def __init__(self):
+        self.size = LSH_BANDS * LSH_ROWS
+        self._vectors: Dict[str, tuple] = {}
+
+    def vector(self, feature: str) -> tuple:
+        vector = self._vectors.get(feature)
+        if vector is None:
+            vector = self._vectors[feature] = tuple(
+                array("I", hashlib.shake_128(feature.encode()).digest(4 * self.size))
+            )
+        return vector
+
+    def signature(self, features: frozenset) -> tuple:
+        return tuple(map(min, *map(self.vector, features)))
+
+    @staticmethod
+    def band_keys(signature: tuple) -> List[int]:
+        return [hash(signature[start:start + LSH_ROWS]) for start in range(0, len(signature), LSH_ROWS)]
+
+
+class DisjointSets:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, a: int, b: int) -> bool:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        self.parent[max(a, b)] = min(a, b)
+        return True
+
+
+def _newest(candidates: list, members: List[int]) -> int:
+    # latest submitted_at, the later one in the file on a tie or without dates
+    return max(members, key=lambda i: (candidates[i].submitted_at or datetime.min, i))
+
+
+def deduplicate(candidates: list, threshold: float = DEDUP_THRESHOLD) -> Tuple[list, dict]:
+    # The candidates left once every group of repeat applications is folded into
+    # its newest member (in their original order), and what was collapsed
+    start = time.perf_counter()
+    sets = DisjointSets(len(candidates))
+    matches = Counter()
+
+    # exact blocking: the first candidate seen with a key stands for all the others
+    for name, key_of in (("email", lambda c: normalize_email(c.email)), ("phone", lambda c: normalize_phone(c.phone))):
+        first: Dict[str, int] = {}
+        for i, candidate in enumerate(candidates):
+            key = key_of(candidate)
+            if key is not None and sets.union(first.setdefault(key, i), i):
+                matches[name] += 1
+
+    # near duplicates: one band at a time, only buckets holding several candidates
+    cache = {}
+    features = [candidate_features(c, cache) for c in candidates]
+    eligible = [i for i, f in enumerate(features) if len(f) >= MIN_FEATURES]
+    hasher = MinHasher()
+    # one tuple of keys per band, in `eligible` order
+    bands = list(zip(*(hasher.band_keys(hasher.signature(features[i])) for i in eligible)))
+    find = sets.find
+    checked = set()
+    for keys in bands:
+        shared = {key for key, n in Counter(keys).items() if n > 1}
+        buckets: Dict[int, List[int]] = {}
+        for i, key in compress(zip(eligible, keys), map(shared.__contains__, keys)):
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            heads: List[int] = []
+            for i in members:
+                for head in heads:
+                    if find(head) == find(i):
+                        break
+                    # close pairs share several bands, compare them once
+                    if (head, i) in checked:
+                        continue
+                    checked.add((head, i))
+                    if jaccard(features[head], features[i]) >= threshold:
+                        sets.union(head, i)
+                        matches["near"] += 1
+                        break
+                else:
+                    if len(heads) < BUCKET_COMPARISONS:
+                        heads.append(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(candidates)):
+        groups.setdefault(sets.find(i), []).append(i)
+    kept = []
+    for members in groups.values():
+        newest = _newest(candidates, members)
+        if len(members) > 1:
+            candidate = candidates[newest]
+            merged = set(candidate.merged_ids or ())
+            for i in members:
+                if i != newest:
+                    merged.add(candidates[i].id)
+                    merged.update(candidates[i].merged_ids or ())
+            merged.discard(candidate.id)
+            candidate.merged_ids = sorted(merged)
+        kept.append(newest)
+    kept.sort()
+
+    for match, n in matches.items():
+        DUPLICATES_COLLAPSED.inc(n, match)
+    stats = {
+        "candidates": len(candidates),
+        "collapsed": len(candidates) - len(kept),
+        "groups": sum(1 for members in groups.values() if len(members) > 1),
+        "by_email": matches["email"],
+        "by_phone": matches["phone"],
+        "near_duplicates": matches["near"],
+        "compared": len(checked),
+        "seconds": time.perf_counter() - start,
+    }
+    return [candidates[i] for i in kept], stats
@@ -0,0 +1,77 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+from find_applicable_talent.backend.search import tokenize
+
+# Typed fields worked out once per candidate at load time (Candidate.derived), so
+# filters, sorting and ranking compare plain numbers instead of re-parsing
+# strings like "$117548" on every query.
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def parse_salary(value) -> Optional[float]:
+    # "$117548" -> 117548.0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER.search(value.replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def salaries_by_work_type(expectations: Optional[Dict[str, object]]) -> Dict[str, float]:
+    salaries = {}
+    for work_type, value in (expectations or {}).items():
+        salary = parse_salary(value)
+        if salary is not None:
+            salaries[work_type] = salary
+    return salaries
+
+
+def headline_salary(salaries: Dict[str, float]) -> Optional[float]:
+    # the full-time figure when there is one, otherwise the lowest
+    if "full-time" in salaries:
+        return salaries["full-time"]
+    return min(salaries.values(), default=None)
+
+
+def grad_year(candidate) -> Optional[int]:
+    # same "latest numeric end date" the eligibility rules use
+    education = candidate.education
+    years = [d.endDate.year for d in (education.degrees or []) if d.endDate is not None] if education else []
+    return max(years, default=None)
+
+
+def candidate_tokens(candidate) -> List[str]:
+    tokens = set()
+    for jobs in (candidate.work_experiences or []):
+        tokens.update(tokenize(jobs.roleName))
+        tokens.update(tokenize(jobs.company))
+    education = candidate.education
+    for degree in ((education.degrees or []) if education else []):
+        tokens.update(tokenize(degree.subject))
+        tokens.update(tokenize(degree.school))
+    for skill in (candidate.skills or []):
+        tokens.update(tokenize(skill))
+    return sorted(tokens)
+
+
+def years_since(year: Optional[int]) -> Optional[int]:
+    if year is None:
+        return None
+    return datetime.now().year - year
+
+
+def derive_fields(candidate) -> dict:
+    salaries = salaries_by_work_type(candidate.annual_salary_expectation)
+    year = grad_year(candidate)
+    return {
+        "salary": headline_salary(salaries),
+        "salary_full_time": salaries.get("full-time"),
+        "salary_part_time": salaries.get("part-time"),
+        "grad_year": year,
+        "years_since_grad": years_since(year),
+        "job_count": len(candidate.work_experiences or []),
+        "tokens": candidate_tokens(candidate),
+    }
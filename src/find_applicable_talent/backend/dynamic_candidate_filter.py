@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Callable, Optional, Union
 from datetime import datetime
+from functools import lru_cache
 import operator
 from find_applicable_talent.backend.util.logger import get_logger
 
@@ -31,6 +32,13 @@ def _collect_next_level(value, remaining_parts):
 
 def _extract(obj, parts):
     if not parts:
+        # Leaf lists (skills, work_availability) are compared element by element,
+        # same as lists met halfway down the path
+        if isinstance(obj, list):
+            results = []
+            for item in obj:
+                results.extend(_extract(item, parts))
+            return results
         # return list so callers can use `any(...)`
         return [obj]
 
@@ -86,36 +94,291 @@ def safe_compare(value, target_value, op):
             return op(value, target_value)
         if isinstance(value, float) or isinstance(target_value, float):
             return op(float(value), float(target_value))
+        if _is_int(value) and isinstance(target_value, str) and _try_convert(float, target_value) is not _FAILED:
+            # typed int fields against the string values the UI sends
+            return op(float(value), float(target_value))
         if isinstance(value, str):
             value = "".join(value.lower().split())
         if isinstance(target_value, str):
             target_value = "".join(target_value.lower().split())
         return op(value, target_value)
     except Exception as e:
-        logger.error(f"Error comparing {value} and {target_value} with {op}: {e}")
+        logger.error("Error comparing %r and %r with %s: %s", value, target_value, op, e)
         return False
 
 
 def build_filter_functions(path: str, operator_key: str, target_value, invert: bool = False):
-    if operator_key not in OPERATORS:
-        raise ValueError(f"Invalid operator: {operator_key}")
-    
-    op = OPERATORS[operator_key]
+    return compile_filter(path, operator_key, target_value, invert)
 
-    def filter_function(candidate):
-        values = get_values_by_path(candidate, path)
-        if not values:
-            return False
-        if operator_key == "contains":
-            return any(safe_compare(value, target_value, op) for value in values)
-        elif operator_key == "in":
-            return any(safe_compare(value, target_value, op) for value in values)
+
+# Everything that only depends on the spec (path segments, target coercion) is
+# worked out once at compile time instead of per candidate, and whole spec lists
+# are memoized by signature.
+_MISSING = object()
+_FAILED = object()
+_BOOL_STRINGS = ("true", "false")
+_PLAN_CACHE_SIZE = 256
+# paths come straight from requests, so their accessors are bounded too
+_PATH_CACHE_SIZE = 1024
+
+
+def _to_bool(v):
+    if isinstance(v, bool):
+        return v
+    if v.lower() == "true":
+        return True
+    return False
+
+
+def _to_dt(v):
+    if isinstance(v, datetime):
+        return v
+    if isinstance(v, str):
+        return datetime.fromisoformat(v)
+    raise TypeError(f"Cannot convert {v} to datetime")
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _try_convert(convert, value):
+    try:
+        return convert(value)
+    except Exception:
+        return _FAILED
+
+
+def normalize_string(value: str) -> str:
+    return "".join(value.lower().split())
+
+
+def _step(obj, key, out: list):
+    # Same lookup rules as `_extract`: lists fan out, attributes win over dict keys
+    if isinstance(obj, list):
+        for item in obj:
+            _step(item, key, out)
+        return
+    value = getattr(obj, key, _MISSING)
+    if value is not _MISSING:
+        out.append(value)
+    elif isinstance(obj, dict) and key in obj:
+        out.append(obj[key])
+
+
+def _flatten(values: list, out: list):
+    for value in values:
+        if isinstance(value, list):
+            _flatten(value, out)
         else:
-            return any(safe_compare(value, target_value, op) for value in values)
-    
-    if invert:
-        return lambda candidate: not filter_function(candidate)
-    return filter_function
+            out.append(value)
+
+
+@lru_cache(maxsize=_PATH_CACHE_SIZE)
+def compile_path(path: str) -> Callable[[object], list]:
+    parts = tuple(path.split('.'))
+
+    def accessor(obj) -> list:
+        frontier = [obj]
+        for key in parts:
+            found = []
+            for item in frontier:
+                _step(item, key, found)
+            if not found:
+                return found
+            frontier = found
+        for value in frontier:
+            if isinstance(value, list):
+                flat = []
+                _flatten(frontier, flat)
+                return flat
+        return frontier
+
+    return accessor
+
+
+def compile_comparison(target_value, op) -> Callable[[object], bool]:
+    # Mirrors `safe_compare` branch for branch, with the target side coerced up front
+    target_is_bool_str = isinstance(target_value, str) and target_value in _BOOL_STRINGS
+    target_is_dt = isinstance(target_value, datetime)
+    target_is_float = isinstance(target_value, float)
+    target_bool = _try_convert(_to_bool, target_value)
+    target_dt = _try_convert(_to_dt, target_value)
+    target_float = _try_convert(float, target_value)
+    target_norm = normalize_string(target_value) if isinstance(target_value, str) else target_value
+    target_is_numeric_str = isinstance(target_value, str) and target_float is not _FAILED
+
+    def compare(value) -> bool:
+        try:
+            if target_is_bool_str or (isinstance(value, str) and value in _BOOL_STRINGS):
+                if target_bool is _FAILED:
+                    return False
+                return op(_to_bool(value), target_bool)
+            if target_is_dt or isinstance(value, datetime):
+                if target_dt is _FAILED:
+                    return False
+                return op(_to_dt(value), target_dt)
+            if target_is_float or isinstance(value, float):
+                if target_float is _FAILED:
+                    return False
+                return op(float(value), target_float)
+            if target_is_numeric_str and _is_int(value):
+                return op(float(value), target_float)
+            if isinstance(value, str):
+                value = "".join(value.lower().split())
+            return op(value, target_norm)
+        except Exception:
+            return False
+
+    return compare
+
+
+def estimate_filter_cost(path: str, operator_key: str) -> int:
+    # Rough relative cost: every path segment is an attribute hop (and possibly a
+    # list fan-out), substring operators scan the whole string
+    cost = path.count('.') + 1
+    if operator_key in ("contains", "in"):
+        cost += 1
+    return cost
 
 
+class CompiledFilter:
+    __slots__ = ("path", "operator_key", "target_value", "invert", "cost", "accessor", "compare")
 
+    def __init__(self, path: str, operator_key: str, target_value, invert: bool = False):
+        if operator_key not in OPERATORS:
+            raise ValueError(f"Invalid operator: {operator_key}")
+        self.path = path
+        self.operator_key = operator_key
+        self.target_value = target_value
+        self.invert = invert
+        self.cost = estimate_filter_cost(path, operator_key)
+        self.accessor = compile_path(path)
+        self.compare = compile_comparison(target_value, OPERATORS[operator_key])
+
+    def matches(self, candidate) -> bool:
+        compare = self.compare
+        for value in self.accessor(candidate):
+            if compare(value):
+                return True
+        return False
+
+    def __call__(self, candidate) -> bool:
+        if self.invert:
+            return not self.matches(candidate)
+        return self.matches(candidate)
+
+
+# Filter expressions: a spec dict is a leaf, {"and": [...]} and {"or": [...]}
+# combine one or more expressions, {"not": expression} negates one. Anywhere a
+# list of specs is taken, its items may be groups too (the list is an AND).
+GROUP_KINDS = ("and", "or", "not")
+
+
+def expression_kind(spec: dict) -> Optional[str]:
+    # "and", "or" or "not" for a group, None for a leaf spec
+    kinds = [kind for kind in GROUP_KINDS if kind in spec]
+    if not kinds:
+        return None
+    if len(kinds) > 1 or "path" in spec:
+        raise ValueError(f"A filter group takes exactly one of and / or / not, got {sorted(spec)}")
+    kind = kinds[0]
+    if kind == "not":
+        if not isinstance(spec[kind], dict):
+            raise ValueError("not takes a single filter expression")
+    elif not isinstance(spec[kind], list) or not spec[kind]:
+        raise ValueError(f"{kind} takes a non-empty list of filter expressions")
+    return kind
+
+
+class FilterGroup:
+    __slots__ = ("kind", "children", "cost")
+
+    def __init__(self, kind: str, children: List["FilterNode"]):
+        self.kind = kind
+        self.children = tuple(children)
+        self.cost = sum(c.cost for c in self.children)
+
+    def __call__(self, candidate) -> bool:
+        if self.kind == "and":
+            return all(c(candidate) for c in self.children)
+        if self.kind == "or":
+            return any(c(candidate) for c in self.children)
+        return not self.children[0](candidate)
+
+
+FilterNode = Union[CompiledFilter, FilterGroup]
+
+
+class FilterPlan:
+    __slots__ = ("filters",)
+
+    def __init__(self, filters: List[FilterNode]):
+        # AND of side-effect free predicates, so cheap ones can safely go first
+        # (CandidateIndex.evaluate reorders them by estimated selectivity as well)
+        self.filters = tuple(sorted(filters, key=lambda f: f.cost))
+
+    def __call__(self, candidate) -> bool:
+        for f in self.filters:
+            if not f(candidate):
+                return False
+        return True
+
+
+def compile_filter(path: str, operator_key: str, target_value, invert: bool = False) -> CompiledFilter:
+    return CompiledFilter(path, operator_key, target_value, invert)
+
+
+def compile_expression(spec: dict) -> FilterNode:
+    kind = expression_kind(spec)
+    if kind == "not":
+        return FilterGroup(kind, [compile_expression(spec[kind])])
+    if kind is not None:
+        return FilterGroup(kind, [compile_expression(child) for child in spec[kind]])
+    return CompiledFilter(spec['path'], spec['operator'], spec['value'], spec.get('invert', False))
+
+
+def spec_signature(spec: dict) -> tuple:
+    # Hashable form of a spec or group; a group's children are a frozenset since
+    # neither their order nor repeats change what it matches
+    kind = expression_kind(spec)
+    if kind == "not":
+        return (kind, spec_signature(spec[kind]))
+    if kind is not None:
+        return (kind, frozenset(spec_signature(child) for child in spec[kind]))
+    value = spec['value']
+    # type name keeps True/1/1.0 from sharing a cache slot
+    return (spec['path'], spec['operator'], type(value).__name__, value, bool(spec.get('invert', False)))
+
+
+def spec_from_signature(signature: tuple) -> dict:
+    if len(signature) == 2:
+        kind, inner = signature
+        if kind == "not":
+            return {kind: spec_from_signature(inner)}
+        return {kind: [spec_from_signature(child) for child in inner]}
+    path, operator_key, _, value, invert = signature
+    return {"path": path, "operator": operator_key, "value": value, "invert": invert}
+
+
+def _compile_signature(signature: tuple) -> FilterNode:
+    if len(signature) == 2:
+        kind, inner = signature
+        children = [inner] if kind == "not" else inner
+        return FilterGroup(kind, [_compile_signature(child) for child in children])
+    path, operator_key, _, value, invert = signature
+    return CompiledFilter(path, operator_key, value, invert)
+
+
+@lru_cache(maxsize=_PLAN_CACHE_SIZE)
+def _compile_plan(signature: tuple) -> FilterPlan:
+    return FilterPlan([_compile_signature(s) for s in signature])
+
+
+def compile_filters(filter_spec_list: List[dict]) -> FilterPlan:
+    signature = tuple(spec_signature(spec) for spec in filter_spec_list)
+    try:
+        return _compile_plan(signature)
+    except TypeError:
+        # unhashable target value, nothing to memoize on
+        return FilterPlan([compile_expression(spec) for spec in filter_spec_list])
@@ -0,0 +1,197 @@
+import math
+import os
+from array import array
+from collections import Counter, OrderedDict
+from itertools import chain, compress
+from operator import itemgetter
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from find_applicable_talent.backend.columnar import Column, typecode
+from find_applicable_talent.backend.util.bitmaps import flags_from_bitmap, full_bitmap, iter_positions
+
+# Counts for the filter builder: how many candidates of a filtered set hold each
+# value of the categorical paths, and how many fall in each bucket of the numeric
+# ones. Low-cardinality indexed paths AND their postings bitmaps with the mask;
+# everything else takes one pass over the masked codes of its dictionary-encoded
+# column, so values are only looked at once per distinct code. A candidate counts
+# once per value even when it holds it twice (two jobs at the same company).
+
+FACET_PATHS = (
+    "location",
+    "education.highest_level",
+    "education.degrees.school",
+    "work_experiences.company",
+    "work_experiences.roleName",
+    "work_availability",
+    "skills",
+)
+# path -> bucket width, buckets are [start, start + width)
+BUCKET_PATHS = {
+    "education.most_recent_gpa": 0.5,
+    "derived.salary": 10000,
+    "derived.grad_year": 1,
+}
+FACET_CACHE_SIZE = int(os.environ.get("CANDIDATE_FACET_CACHE_SIZE", "128"))
+# indexed paths with at most this many values are counted from their postings
+POSTINGS_LIMIT = 64
+# masks holding fewer than 1 / SPARSE_RATIO of the pool are walked position by
+# position instead of through a flag per position
+SPARSE_RATIO = 16
+
+
+class FacetCounter:
+    def __init__(self, index):
+        self.index = index
+        # path -> (column length, owners, codes) of a list column, one entry per
+        # distinct (position, code)
+        self._distinct: Dict[str, Tuple[int, array, array]] = {}
+        self._buckets: Dict[tuple, list] = {}
+        self._totals_cache: Dict[str, Tuple[tuple, Counter]] = {}
+        # filter key -> (mask, facets); positions never change once added, so an
+        # entry holds for as long as the filters still give the same mask
+        self._cache: "OrderedDict[frozenset, Tuple[int, dict]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def counts(self, mask: int, key: Optional[frozenset] = None) -> dict:
+        # {"values": {path: [(value, count), ...] most common first},
+        #  "buckets": {path: [(start, end, count), ...] ascending}}
+        if key is not None:
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None and entry[0] == mask:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+        facets = self._count(mask)
+        if key is not None and FACET_CACHE_SIZE > 0:
+            with self._lock:
+                self._cache[key] = (mask, facets)
+                self._cache.move_to_end(key)
+                while len(self._cache) > FACET_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return facets
+
+    def _count(self, mask: int) -> dict:
+        index = self.index
+        size = len(index.pool)
+        # the masked positions, or the positions left out when that's far fewer
+        # (counts are then the whole column's minus theirs), or a flag per position
+        matched = mask.bit_count()
+        positions = excluded = flags = None
+        if matched * SPARSE_RATIO < size:
+            positions = list(iter_positions(mask))
+        elif (size - matched) * SPARSE_RATIO < size:
+            excluded = list(iter_positions(full_bitmap(size) & ~mask))
+        else:
+            flags = flags_from_bitmap(mask, size)
+        selection = (positions, excluded, flags)
+        columns = index.columns.columns
+        values = {}
+        for path in FACET_PATHS:
+            inverted = index.indexes.get(path)
+            if inverted is not None and len(inverted.postings) <= POSTINGS_LIMIT:
+                counts = inverted.value_counts(mask)
+            elif path in columns:
+                dictionary = columns[path].dictionary
+                counts = [(dictionary[code], n) for code, n in self._code_counts(columns[path], *selection).items()]
+            else:
+                # no column means unhashable values, nothing to count them by
+                continue
+            # ties keep the order values were first seen in
+            values[path] = sorted(
+                ((value, n) for value, n in counts if n and value is not None), key=itemgetter(1), reverse=True,
+            )
+        buckets = {}
+        for path, width in BUCKET_PATHS.items():
+            column = columns.get(path)
+            if column is None:
+                continue
+            starts = self._bucket_starts(column, width)
+            counts = Counter()
+            for code, n in self._code_counts(column, *selection).items():
+                if n:
+                    counts[starts[code]] += n
+            counts.pop(None, None)
+            buckets[path] = [(start, start + width, counts[start]) for start in sorted(counts)]
+        return {"values": values, "buckets": buckets}
+
+    def _bucket_starts(self, column: Column, width) -> list:
+        # bucket start of every code, None for codes that aren't numbers
+        key = (column.path, width)
+        with self._lock:
+            starts = self._buckets.get(key)
+        if starts is None or len(starts) != len(column.dictionary):
+            starts = [
+                math.floor(value / width) * width
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value) else None
+                for value in column.dictionary
+            ]
+            with self._lock:
+                self._buckets[key] = starts
+        return starts
+
+    def _code_counts(
+        self, column: Column, positions: Optional[List[int]], excluded: Optional[List[int]], flags: Optional[bytes],
+    ) -> Counter:
+        # candidates per code over the selection made in _count
+        if positions is not None:
+            counts = self._position_counts(column, positions)
+        elif excluded is not None:
+            counts = self._totals(column).copy()
+            counts.subtract(self._position_counts(column, excluded))
+        elif column.scalar:
+            counts = Counter(compress(column.codes, flags))
+        else:
+            owners, codes = self._distinct_pairs(column)
+            counts = Counter(compress(codes, map(flags.__getitem__, owners)))
+        counts.pop(0, None)
+        return counts
+
+    @staticmethod
+    def _position_counts(column: Column, positions: List[int]) -> Counter:
+        codes = column.codes
+        if column.scalar:
+            return Counter(map(codes.__getitem__, positions))
+        offsets = column.offsets
+        return Counter(chain.from_iterable(set(codes[offsets[p]:offsets[p + 1]]) for p in positions))
+
+    def _totals(self, column: Column) -> Counter:
+        # candidates per code over the whole column, tombstoned positions included
+        key = (column.path, len(column.codes))
+        with self._lock:
+            totals = self._totals_cache.get(column.path)
+        if totals is None or totals[0] != key:
+            codes = column.codes if column.scalar else self._distinct_pairs(column)[1]
+            totals = (key, Counter(codes))
+            with self._lock:
+                self._totals_cache[column.path] = totals
+        return totals[1]
+
+    def _distinct_pairs(self, column: Column) -> Tuple[array, array]:
+        with self._lock:
+            entry = self._distinct.get(column.path)
+        if entry is None or entry[0] != len(column.codes):
+            pairs = dict.fromkeys(zip(column.owners, column.codes))
+            entry = (
+                len(column.codes),
+                array(typecode(column.owners), [owner for owner, _ in pairs]),
+                array(typecode(column.codes), [code for _, code in pairs]),
+            )
+            with self._lock:
+                self._distinct[column.path] = entry
+        return entry[1], entry[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._cache)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": FACET_CACHE_SIZE,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,69 @@
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple, get_args, get_origin
+from pydantic import BaseModel
+from find_applicable_talent.backend.columnar import _nested_model
+from find_applicable_talent.backend.dynamic_candidate_filter import compile_path
+
+
+def paginate(items, offset: int = 0, limit: Optional[int] = None) -> list:
+    return list(islice(items, offset, None if limit is None else offset + limit))
+
+
+def _is_list(annotation) -> bool:
+    if get_origin(annotation) in (list, List):
+        return True
+    return any(_is_list(arg) for arg in get_args(annotation))
+
+
+def include_tree(model: type, fields: str) -> dict:
+    # "id,name,education.degrees.school" -> the `include` argument for model_dump,
+    # list-of-model fields get "__all__" so the projection applies to every item
+    tree = {}
+    for path in (f.strip() for f in fields.split(',')):
+        if not path:
+            continue
+        node, current = tree, model
+        parts = path.split('.')
+        for depth, key in enumerate(parts):
+            if current is None or key not in current.model_fields:
+                raise ValueError(f"Unknown field {path!r}")
+            annotation = current.model_fields[key].annotation
+            if depth == len(parts) - 1:
+                node[key] = True
+                break
+            child = node.get(key)
+            if child is True:
+                # the whole parent is already included
+                break
+            child = node.setdefault(key, {})
+            if _is_list(annotation):
+                child = child.setdefault("__all__", {})
+            node, current = child, _nested_model(annotation)
+    if not tree:
+        raise ValueError("No fields requested")
+    return tree
+
+
+def project(items: Iterable[BaseModel], include: dict) -> List[dict]:
+    return [item.model_dump(mode="json", include=include) for item in items]
+
+
+def sort_items(items: list, path: str, descending: bool = False) -> list:
+    # Same ordering as CandidateIndex.sort_positions, for lists that don't live in
+    # the index (the selected candidates): a list path sorts by its smallest value
+    # ascending and its largest descending, no value or None sorts last
+    accessor = compile_path(path)
+
+    def key(item) -> Tuple[bool, object]:
+        values = [v for v in accessor(item) if v is not None]
+        if not values:
+            return (True, None)
+        return (False, max(values) if descending else min(values))
+
+    keyed = [(key(item), item) for item in items]
+    present = [(k[1], item) for k, item in keyed if not k[0]]
+    try:
+        present.sort(key=lambda pair: pair[0], reverse=descending)
+    except TypeError as e:
+        raise ValueError(f"Cannot sort on {path}: {e}")
+    return [item for _, item in present] + [item for k, item in keyed if k[0]]
@@ -1,13 +1,22 @@
 from __future__ import annotations
+import time
 from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException, Query, status, Body, Response
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Body, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, TypeAdapter
-from typing import List, Optional, Union
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, model_validator
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from threading import RLock
 
-from find_applicable_talent.backend.candidates import CandidateList, Candidate
+from find_applicable_talent.backend.candidates import CandidateList, Candidate, candidate_model
+from find_applicable_talent.backend.records import CandidateRecord
+from find_applicable_talent.backend.listing import include_tree, project
+from find_applicable_talent.backend.metrics import Gauge, REQUEST_SECONDS, STAGE_SECONDS, TimedLock, render
+from find_applicable_talent.backend.profiler import start_profiler
+from find_applicable_talent.backend.sessions import SessionStore, FilterSession
+from find_applicable_talent.backend.reloader import ReloadManager, ReloadInProgress
+from find_applicable_talent.backend.submissions import parse_submission_batch
 from find_applicable_talent.backend.util.logger import get_logger
 from find_applicable_talent.backend import DATA_PATH
 
@@ -18,10 +27,77 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
-app.state.lock = RLock()  
-app.state.candidates = CandidateList(path_to_submissions=str(DATA_PATH))
+
+
+class RequestMetricsMiddleware:
+    # Times every request, labelled by route template (/candidates/{candidate_id},
+    # not the id) and status; streamed responses count until their last chunk
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route, str(status_code))
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
+# waits for it show up as candidate_lock_wait_seconds{lock="candidates"}
+app.state.lock = TimedLock(RLock(), "candidates")
+app.state.profiler = start_profiler()
+
+
+def _follow_reload(path: str, token: str):
+    # shared mode: some worker (maybe this one) logged a reload, rebuild alongside it
+    try:
+        app.state.reloader.start(path, token)
+    except ReloadInProgress as e:
+        logger.warning("Not following reload of %s: %s", path, e)
+
+
+app.state.candidates = CandidateList(path_to_submissions=str(DATA_PATH), on_reload=_follow_reload)
+app.state.sessions = SessionStore()
+
+
+def _publish_candidates(store: CandidateList):
+    # requests that already resolved the old list keep using it
+    with app.state.lock:
+        # selections and deletions made while the new list was being built
+        store.replay_operations()
+        app.state.candidates = store
+
+
+app.state.reloader = ReloadManager(lambda: app.state.candidates, _publish_candidates)
+
+
+def _candidate_counts() -> Dict[tuple, float]:
+    store = app.state.candidates
+    return {
+        ("live",): len(store),
+        ("filtered",): store.filtered_mask.bit_count(),
+        ("selected",): len(store._selected),
+    }
+
+
+Gauge("candidate_pool_candidates", "Candidates in the current pool", ("state",), collect=_candidate_counts)
 
 class FilterSpec(BaseModel):
     path: str
@@ -30,11 +106,206 @@ class FilterSpec(BaseModel):
     invert: bool = False
 
 
+class FilterGroup(BaseModel):
+    # {"and": [...]}, {"or": [...]} or {"not": {...}}, nesting specs and groups
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+    all_of: Optional[List[FilterNode]] = Field(None, alias="and", min_length=1)
+    any_of: Optional[List[FilterNode]] = Field(None, alias="or", min_length=1)
+    none_of: Optional[FilterNode] = Field(None, alias="not")
+
+    @model_validator(mode="after")
+    def _one_kind(self):
+        if sum(v is not None for v in (self.all_of, self.any_of, self.none_of)) != 1:
+            raise ValueError("A filter group takes exactly one of and / or / not")
+        return self
+
+
+FilterNode = Union[FilterSpec, FilterGroup]
+FilterGroup.model_rebuild()
+
+
+def filter_dicts(nodes: List[FilterNode]) -> List[dict]:
+    # The dicts dynamic_candidate_filter compiles, groups keyed by and / or / not
+    return [node.model_dump(by_alias=True, exclude_none=True) for node in nodes]
+
+
+class SearchRequest(BaseModel):
+    query: str
+    filters: List[FilterNode] = []
+    limit: int = Field(20, ge=1, le=1000)
+    prefix: bool = True
+    match_all: bool = True
+    fields: Optional[List[str]] = None
+
+
+class RankRequest(BaseModel):
+    # feature name (see ranking.FEATURES) -> weight
+    weights: Dict[str, float]
+    filters: List[FilterNode] = []
+    limit: int = Field(10, ge=1, le=1000)
+    roles: List[str] = []
+    skills: List[str] = []
+    salary_budget: Optional[float] = None
+
+
+class SearchHit(BaseModel):
+    score: float
+    candidate: Candidate
+
+
+class SearchResults(BaseModel):
+    total: int
+    results: List[SearchHit]
+
+
+class FacetRequest(BaseModel):
+    filters: List[FilterNode] = []
+    # values returned per categorical facet, most common first; 0 returns all of them
+    limit: int = Field(50, ge=0)
+
+
+class FacetValue(BaseModel):
+    value: Union[str, int, float, bool]
+    count: int
+
+
+class FacetBucket(BaseModel):
+    # [start, end), e.g. filter with >= start and < end
+    start: Union[int, float]
+    end: Union[int, float]
+    count: int
+
+
+class FacetResults(BaseModel):
+    total: int
+    values: Dict[str, List[FacetValue]]
+    buckets: Dict[str, List[FacetBucket]]
+
+
 FilterSpecList = TypeAdapter(List[FilterSpec])          
+CandidatesJSON = TypeAdapter(List[Candidate])
 
 
 def get_store() -> CandidateList:
-    return app.state.candidates
+    store = app.state.candidates
+    if store.events is not None and store.events.pending():
+        # pick up what the other workers changed
+        with app.state.lock:
+            store.sync()
+    return store
+
+
+def get_session(session_id: Optional[str] = Query(None, description="Filter session from POST /sessions")) -> Optional[FilterSession]:
+    # Without a session the shared filtered view is used, as before
+    if session_id is None:
+        return None
+    session = app.state.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+
+class PageParams(BaseModel):
+    offset: int = 0
+    limit: Optional[int] = None
+    sort: Optional[str] = None
+    descending: bool = False
+    include: Optional[dict] = None
+    stream: bool = False
+
+
+# candidates per write when streaming NDJSON
+STREAM_BATCH_SIZE = 256
+
+
+def get_page_params(
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    sort: Optional[str] = Query(None, description="Path to sort by, e.g. submitted_at"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = Query(None, description="Comma separated paths to return, e.g. id,name,education.degrees.school"),
+    stream: bool = Query(False, description="Stream the results as NDJSON, one candidate per line"),
+) -> PageParams:
+    include = None
+    if fields is not None:
+        try:
+            include = include_tree(Candidate, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return PageParams(offset=offset, limit=limit, sort=sort, descending=order == "desc", include=include, stream=stream)
+
+
+def _page(store: CandidateList, mask: int, params: PageParams) -> Tuple[int, Iterator[CandidateRecord]]:
+    try:
+        return mask.bit_count(), store.iter_page(mask, params.sort, params.descending, params.offset, params.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _ndjson(candidates: Iterable[Candidate], include: Optional[dict]) -> Iterator[str]:
+    # Serialized straight from the models, one batch of lines at a time, without
+    # going through response_model validation
+    batch = []
+    for candidate in candidates:
+        batch.append(candidate.model_dump_json(include=include))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def _listing_response(total: int, records: Iterable[CandidateRecord], params: PageParams):
+    # The full match count goes in X-Total-Count, the body only holds the page.
+    # Models are built lazily here, one per candidate actually sent, and dumped
+    # straight to JSON rather than re-validated against the response model.
+    candidates = map(candidate_model, records)
+    headers = {"X-Total-Count": str(total)}
+    if params.stream:
+        return StreamingResponse(_ndjson(candidates, params.include), media_type="application/x-ndjson", headers=headers)
+    with STAGE_SECONDS.time("serialize"):
+        if params.include is None:
+            return Response(CandidatesJSON.dump_json(list(candidates)), media_type="application/json", headers=headers)
+        return JSONResponse(project(candidates, params.include), headers=headers)
+
+
+def _filter_mask(store: CandidateList, session: Optional[FilterSession], specs: List[dict], fresh: bool) -> int:
+    if session is None:
+        return store.dynamic_filter_mask(specs, from_fresh_candidates=fresh)
+    return app.state.sessions.refine(session, store, specs, from_fresh_candidates=fresh)
+
+
+@app.post("/sessions", status_code=status.HTTP_201_CREATED)
+def create_session(store: CandidateList = Depends(get_store)):
+    session = app.state.sessions.create(store)
+    return {"session_id": session.session_id}
+
+
+@app.get("/sessions")
+def session_stats():
+    return app.state.sessions.stats()
+
+
+@app.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_session(session_id: str):
+    if not app.state.sessions.drop(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text format, see metrics.py
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+def profile():
+    # folded stacks from the sampling profiler (CANDIDATE_PROFILE=true)
+    if app.state.profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is off, set CANDIDATE_PROFILE=true")
+    return PlainTextResponse(app.state.profiler.folded())
 
 
 @app.get("/candidates", response_model=list[Candidate], status_code=status.HTTP_200_OK)
@@ -44,29 +315,148 @@ def list_candidates(
     value: Optional[str] = Query(None),
     invert: Optional[bool] = Query(False),
     fresh: bool = Query(False, alias="from_fresh_candidates"),
+    params: PageParams = Depends(get_page_params),
+    session: Optional[FilterSession] = Depends(get_session),
     store: CandidateList = Depends(get_store),
 ):
-    logger.info(f"Listing candidates with path: {path}, operator: {operator}, value: {value}, fresh: {fresh}")
-    logger.info(f"Have {len(store.candidates)} candidates")
+    logger.info("Listing candidates with path: %s, operator: %s, value: %s, fresh: %s", path, operator, value, fresh)
     if all(p is not None for p in (path, operator, value)):
         spec = [{"path": path, "operator": operator, "value": value, "invert": invert}]
-        logger.info(f"Filtering candidates with spec: {spec}")
-        data = store.dynamic_filters(spec, from_fresh_candidates=fresh)
-        logger.info(f"Have {len(data)} candidates after filtering")
-        return data
-    if fresh:
-        return store.get_candidates()
+        mask = _filter_mask(store, session, spec, fresh)
+    elif fresh:
+        mask = store.live_mask
+    elif session is not None:
+        mask = session.view(store)
     else:
-        return store.get_filtered_candidates()
+        mask = store.filtered_mask
+    return _listing_response(*_page(store, mask, params), params)
 
 
 @app.post("/candidates/filter", response_model=list[Candidate])
 def list_filtered_candidates(
-    specs: list[FilterSpec], fresh: bool = Query(True, alias="from_fresh_candidates"),
+    specs: Union[List[FilterNode], FilterNode], fresh: bool = Query(True, alias="from_fresh_candidates"),
+    params: PageParams = Depends(get_page_params),
+    session: Optional[FilterSession] = Depends(get_session),
+    store: CandidateList = Depends(get_store),
+):
+    # a list is ANDed, as is a single expression; a top level "and" is spread into
+    # the list so each of its parts is cached on its own
+    if isinstance(specs, FilterGroup) and specs.all_of is not None:
+        specs = specs.all_of
+    elif not isinstance(specs, list):
+        specs = [specs]
+    logger.info("Filtering candidates with specs: %s", specs)
+    try:
+        mask = _filter_mask(store, session, filter_dicts(specs), fresh)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _listing_response(*_page(store, mask, params), params)
+
+
+@app.get("/candidates/filter/cache")
+def filter_cache_stats(store: CandidateList = Depends(get_store)):
+    return store.filter_cache.stats()
+
+
+@app.post("/candidates/facets", response_model=FacetResults)
+def candidate_facets(
+    request: FacetRequest,
+    session: Optional[FilterSession] = Depends(get_session),
+    store: CandidateList = Depends(get_store),
+):
+    # Per value counts of the categorical paths and bucketed GPA / salary / grad
+    # year counts among the candidates passing `filters` (within the session's view
+    # if any), for the filter builder to show next to each choice
+    logger.info("Counting facets with %d filters", len(request.filters))
+    base_mask = session.view(store) if session is not None else None
+    try:
+        total, facets = store.facets(filter_dicts(request.filters), base_mask)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    limit = request.limit or None
+    return FacetResults(
+        total=total,
+        values={
+            path: [FacetValue(value=value, count=count) for value, count in counts[:limit]]
+            for path, counts in facets["values"].items()
+        },
+        buckets={
+            path: [FacetBucket(start=start, end=end, count=count) for start, end, count in counts]
+            for path, counts in facets["buckets"].items()
+        },
+    )
+
+
+@app.get("/candidates/facets/cache")
+def facet_cache_stats(store: CandidateList = Depends(get_store)):
+    return store.index.facet_counter.stats()
+
+
+@app.post("/candidates/search", response_model=SearchResults)
+def search_candidates(
+    request: SearchRequest,
+    session: Optional[FilterSession] = Depends(get_session),
+    store: CandidateList = Depends(get_store),
+):
+    # Top matches for a keyword query over roles, companies, subjects, schools and
+    # skills, among the candidates passing `filters` (within the session's view if any)
+    logger.info("Searching candidates for %r with %d filters", request.query, len(request.filters))
+    base_mask = session.view(store) if session is not None else None
+    try:
+        total, hits = store.search(
+            request.query, filter_dicts(request.filters), request.limit,
+            request.prefix, request.match_all, request.fields, base_mask,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return SearchResults(total=total, results=[SearchHit(score=score, candidate=candidate_model(c)) for c, score in hits])
+
+
+@app.post("/candidates/rank", response_model=SearchResults)
+def rank_candidates(
+    request: RankRequest,
+    session: Optional[FilterSession] = Depends(get_session),
     store: CandidateList = Depends(get_store),
 ):
-    logger.info(f"Filtering candidates with specs: {specs}")
-    return store.dynamic_filters([s.model_dump() for s in specs], from_fresh_candidates=fresh)
+    logger.info("Ranking candidates by %s with %d filters", request.weights, len(request.filters))
+    base_mask = session.view(store) if session is not None else None
+    try:
+        total, hits = store.rank(
+            request.weights, filter_dicts(request.filters), request.limit,
+            request.roles, request.skills, request.salary_budget, base_mask,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return SearchResults(total=total, results=[SearchHit(score=score, candidate=candidate_model(c)) for c, score in hits])
+
+
+@app.post("/candidates/ingest")
+async def ingest_candidates(request: Request):
+    # NDJSON (or a JSON array) of new or changed submissions, upserted by id
+    try:
+        submissions = parse_submission_batch(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid submissions: {e}")
+    return await run_in_threadpool(_upsert, submissions)
+
+
+def _upsert(submissions: List[dict]) -> dict:
+    with app.state.lock:
+        store = get_store()
+        stats = store.upsert_submissions(submissions)
+    store.commit()
+    return stats
+
+
+# registered ahead of /candidates/{candidate_id} so "reload" isn't taken for an id
+@app.get("/candidates/reload")
+def reload_status():
+    return app.state.reloader.status()
+
+
+@app.get("/candidates/shared")
+def shared_status(store: CandidateList = Depends(get_store)):
+    return store.shared_status()
 
 
 @app.get("/candidates/{candidate_id}", response_model=Candidate)
@@ -74,7 +464,7 @@ def get_candidate(candidate_id: str, store: CandidateList = Depends(get_store)):
     cand = store.get_candidate_by_id(candidate_id)
     if cand is None:
         raise HTTPException(status_code=404, detail="Candidate not found")
-    return cand
+    return candidate_model(cand)
 
 
 @app.delete("/candidates/{candidate_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -82,24 +472,39 @@ def delete_candidate(candidate_id: str, store: CandidateList = Depends(get_store
     with app.state.lock:
         if not store.remove_candidate_by_id(candidate_id):
             raise HTTPException(status_code=404, detail="Candidate not found")
+    store.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @app.post("/candidates/reload", status_code=status.HTTP_202_ACCEPTED)
-def reload_candidates(path: Optional[str] = Body(None, embed=True)):
-    with app.state.lock:
-        app.state.candidates = CandidateList(path_to_submissions=path or str(DATA_PATH))
-    return {"detail": "candidates reloaded"}
+def reload_candidates(path: Optional[str] = Body(None, embed=True), store: CandidateList = Depends(get_store)):
+    # Runs in the background, poll GET /candidates/reload for progress. In shared
+    # mode the request is logged and every worker reloads.
+    path = path or str(DATA_PATH)
+    reloader = app.state.reloader
+    try:
+        if store.events is None:
+            reload_status = reloader.start(path)
+        else:
+            if reloader.running:
+                raise ReloadInProgress(f"Reload of {reloader.status()['path']} already running")
+            with app.state.lock:
+                store.request_reload(path)
+            reload_status = reloader.status()
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"detail": "candidates reload started", "status": reload_status}
 
 @app.post("/candidates/selected/{candidate_id}", status_code=status.HTTP_200_OK)
 def select_candidate(
     candidate_id: str,
     store: CandidateList = Depends(get_store)
 ):
-    logger.info(f"Selecting candidate by ID {candidate_id}")
+    logger.info("Selecting candidate by ID %s", candidate_id)
     with app.state.lock:
         if not store.select_candidate_by_id(candidate_id):
             raise HTTPException(404, "Candidate not found")
+    store.commit()
     return {"detail": f"Candidate {candidate_id} selected successfully"}
 
 @app.delete("/candidates/selected/{candidate_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -107,13 +512,21 @@ def remove_selected_candidate(
     candidate_id: str,
     store: CandidateList = Depends(get_store)
 ):
-    logger.info(f"Removing candidate by ID {candidate_id}")
+    logger.info("Removing candidate by ID %s", candidate_id)
     with app.state.lock:
         if not store.remove_selected_candidate_by_id(candidate_id):
             raise HTTPException(404, "Candidate not in selected list")
+    store.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @app.get("/candidates/selected/", response_model=List[Candidate])
-def list_selected_candidates(store: CandidateList = Depends(get_store)):
-    logger.info(f"Listing selected candidates")
-    return store.get_selected_candidates()
\ No newline at end of file
+def list_selected_candidates(
+    params: PageParams = Depends(get_page_params),
+    store: CandidateList = Depends(get_store),
+):
+    logger.info("Listing selected candidates")
+    try:
+        total, page = store.selected_page(params.sort, params.descending, params.offset, params.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _listing_response(total, page, params)
\ No newline at end of file
@@ -0,0 +1,210 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Counters, gauges and histograms rendered in the Prometheus text format at
+# GET /metrics. Recording is a bisect and a few list updates under a lock, so it
+# can sit on request paths; everything else (cumulative buckets, text) happens
+# when the metrics are scraped. Label values are passed positionally in the order
+# of `labelnames`.
+
+# request and stage latencies, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# lock waits are usually microseconds
+WAIT_BUCKETS = (0.000001, 0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+# share of the candidates a filter kept
+RATIO_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1)
+
+_registry: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), register: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        if register:
+            _registry.append(self)
+
+    @abstractmethod
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        # (name suffix, formatted labels, value)
+        ...
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), register: bool = True):
+        super().__init__(name, documentation, labelnames, register)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield "_total", _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Metric):
+    # Set directly, or computed at scrape time by `collect`, which returns
+    # {label values: value}
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[tuple, float]]] = None, register: bool = True,
+    ):
+        super().__init__(name, documentation, labelnames, register)
+        self.collect = collect
+        self._values: Dict[tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self):
+        if self.collect is not None:
+            values = list(self.collect().items())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        for labels, value in values:
+            yield "", _format_labels(self.labelnames, labels), value
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS, register: bool = True,
+    ):
+        super().__init__(name, documentation, labelnames, register)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per bucket counts (last is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels) -> _Timer:
+        # with STAGE_SECONDS.time("filter"): ...
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        names = self.labelnames + ("le",)
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                yield "_bucket", _format_labels(names, (*labels, _format_value(bound))), cumulative
+            formatted = _format_labels(self.labelnames, labels)
+            yield "_sum", formatted, total
+            yield "_count", formatted, count
+
+
+class TimedLock:
+    # Stands in for a Lock/RLock and records how long every acquire waited
+    def __init__(self, lock, name: str, histogram: Optional[Histogram] = None):
+        self._lock = lock
+        self.name = name
+        self.histogram = histogram or LOCK_WAIT_SECONDS
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        self.histogram.observe(time.perf_counter() - start, self.name)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def render() -> str:
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "candidate_http_request_duration_seconds", "Time spent handling requests, by route template",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "candidate_stage_duration_seconds",
+    "Time spent per pipeline stage: load, validate (parsing and eligibility), dedup, index, filter, facets, serialize",
+    ("stage",),
+)
+FILTER_SELECTIVITY = Histogram(
+    "candidate_filter_selectivity", "Share of the candidates kept by an evaluated (uncached) filter",
+    buckets=RATIO_BUCKETS,
+)
+LOCK_WAIT_SECONDS = Histogram(
+    "candidate_lock_wait_seconds", "Time spent waiting for a lock", ("lock",), buckets=WAIT_BUCKETS,
+)
@@ -0,0 +1,296 @@
+import atexit
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from threading import Condition, Lock, Thread
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from find_applicable_talent.backend.util.files import file_lock, fsync_dir
+from find_applicable_talent.backend.util.logger import get_logger
+from find_applicable_talent.backend import OPLOG_DIR
+
+logger = get_logger(__name__)
+
+# Selections, deletions and ingested submissions are written ahead to an
+# operation log per source file and replayed on top of the pool whenever it is
+# loaded (startup, reloads), so they survive both. Set CANDIDATE_OPLOG=false to keep them in memory only.
+OPLOG_ENABLED = os.environ.get("CANDIDATE_OPLOG", "true").lower() == "true"
+# how long the writer waits for more records to share one fsync
+OPLOG_COMMIT_SECONDS = float(os.environ.get("CANDIDATE_OPLOG_COMMIT_MS", "2")) / 1000
+# records written before the log is folded into the state file
+OPLOG_COMPACT_EVERY = int(os.environ.get("CANDIDATE_OPLOG_COMPACT_EVERY", "10000"))
+
+SELECT = "S"
+UNSELECT = "U"
+DELETE = "D"
+# a submission was upserted; an earlier delete of its id no longer applies
+INGEST = "I"
+_OPS = frozenset((SELECT, UNSELECT, DELETE, INGEST))
+
+# Both files are lines of `<op> <json id>`, or `I <json [id, submission]>`. The
+# log starts with "#oplog <epoch>", the state file (the compacted log: the latest
+# submission of every ingested id in ingest order, one D per deleted id, one S
+# per selected id in selection order) with "#opstate <epoch>". Compaction writes state epoch + 1
+# and then a fresh log with the same epoch, so a log whose epoch is behind the
+# state's was already folded in and is skipped.
+_LOG_HEADER = b"#oplog"
+_STATE_HEADER = b"#opstate"
+
+
+def encode(op: str, candidate_id: str, submission: Optional[dict] = None) -> bytes:
+    if op == INGEST:
+        return f"{op} {json.dumps([candidate_id, submission], default=str)}\n".encode()
+    return f"{op} {json.dumps(candidate_id)}\n".encode()
+
+
+class OperationState:
+    # What a sequence of operations adds up to
+    def __init__(self):
+        self.deleted: Set[str] = set()
+        # id -> None, in selection order
+        self.selected: Dict[str, None] = {}
+        # id -> its latest submission, least recently ingested first
+        self.ingested: Dict[str, dict] = {}
+
+    def apply(self, op: str, candidate_id: str, submission: Optional[dict] = None):
+        if op == DELETE:
+            self.deleted.add(candidate_id)
+        elif op == INGEST:
+            self.deleted.discard(candidate_id)
+            self.ingested.pop(candidate_id, None)
+            self.ingested[candidate_id] = submission
+        elif op == SELECT:
+            self.selected.setdefault(candidate_id)
+        elif op == UNSELECT:
+            self.selected.pop(candidate_id, None)
+
+    def lines(self) -> Iterable[bytes]:
+        # ingests first, a later delete of the same id still applies
+        for candidate_id, submission in self.ingested.items():
+            yield encode(INGEST, candidate_id, submission)
+        for candidate_id in sorted(self.deleted):
+            yield encode(DELETE, candidate_id)
+        for candidate_id in self.selected:
+            yield encode(SELECT, candidate_id)
+
+
+def _read(path: Path, header: bytes) -> Tuple[Optional[int], List[tuple]]:
+    # (epoch, operations); (None, []) when the file doesn't exist. A torn last
+    # line (crash mid-write) is dropped.
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None, []
+    lines = data[:data.rfind(b"\n") + 1].splitlines()
+    if not lines or not lines[0].startswith(header):
+        raise ValueError(f"{path} is missing its {header.decode()} header")
+    epoch = int(lines[0][len(header):])
+    operations = []
+    for line in lines[1:]:
+        op = line[:1].decode()
+        if op not in _OPS:
+            logger.warning("Skipping bad operation %r in %s", line[:80], path)
+            continue
+        quoted = line[2:]
+        if op == INGEST:
+            operations.append((op, *json.loads(quoted)))
+            continue
+        # plain ids skip the JSON decoder, escaped ones (quotes, non-ASCII...) don't
+        operations.append((op, json.loads(quoted) if b"\\" in quoted else quoted[1:-1].decode()))
+    return epoch, operations
+
+
+def _epoch(path: Path, header: bytes) -> Optional[int]:
+    try:
+        with open(path, "rb") as f:
+            line = f.readline()
+    except FileNotFoundError:
+        return None
+    return int(line[len(header):]) if line.startswith(header) else None
+
+
+def _complete_length(f) -> int:
+    # where the last complete line of `f` ends
+    pos = f.seek(0, os.SEEK_END)
+    while pos > 0:
+        start = max(pos - 4096, 0)
+        f.seek(start)
+        newline = f.read(pos - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        pos = start
+    return 0
+
+
+def _write_atomic(path: Path, lines: Iterable[bytes]):
+    tmp_path = path.with_suffix(path.suffix + f".tmp{os.getpid()}")
+    with open(tmp_path, "wb") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path.parent)
+
+
+class OperationLog:
+    # Appends are group-committed: callers queue records and a writer thread puts
+    # everything queued in one write + fsync, so a burst of triage clicks costs a
+    # single fsync. wait() blocks until what was queued so far is durable. Writes
+    # and compaction hold a file lock, so several worker processes can share one
+    # log (shared pool mode).
+    def __init__(
+        self, path: Path, commit_seconds: float = OPLOG_COMMIT_SECONDS, compact_every: int = OPLOG_COMPACT_EVERY,
+    ):
+        self.path = path
+        self.state_path = path.with_suffix(".opstate")
+        self.lock_path = path.with_suffix(".lock")
+        self.commit_seconds = commit_seconds
+        self.compact_every = compact_every
+        self._cond = Condition()
+        self._pending: List[bytes] = []
+        self._queued = 0
+        self._durable = 0
+        self._since_compaction = 0
+        self._closed = False
+        self._error: Optional[Exception] = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = Thread(target=self._write_loop, name="oplog-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, op: str, candidate_id: str, submission: Optional[dict] = None) -> int:
+        # queues the record, returns its sequence number for wait()
+        with self._cond:
+            self._pending.append(encode(op, candidate_id, submission))
+            self._queued += 1
+            self._cond.notify_all()
+            return self._queued
+
+    def wait(self, seq: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            seq = self._queued if seq is None else seq
+            durable = self._cond.wait_for(lambda: self._durable >= seq or self._closed, timeout)
+            if self._error is not None:
+                raise self._error
+            return durable and self._durable >= seq
+
+    def state(self) -> OperationState:
+        # Replays the state file and the log; waits for queued records first so
+        # the result includes everything appended before the call
+        self.wait()
+        with file_lock(self.lock_path):
+            return self._replay()[0]
+
+    def _replay(self) -> Tuple[OperationState, int, int]:
+        # (state, epoch of the state file, operations in the live log); holds the lock
+        start = time.perf_counter()
+        state = OperationState()
+        state_epoch, compacted = _read(self.state_path, _STATE_HEADER)
+        state_epoch = state_epoch or 0
+        for operation in compacted:
+            state.apply(*operation)
+        log_epoch, operations = _read(self.path, _LOG_HEADER)
+        if log_epoch != state_epoch:
+            # missing, or already folded into the state by an interrupted compaction
+            operations = []
+            _write_atomic(self.path, [_LOG_HEADER + b" %d\n" % state_epoch])
+        for operation in operations:
+            state.apply(*operation)
+        logger.info(
+            "Replayed %s compacted and %s logged operations from %s in %.3fs",
+            len(compacted), len(operations), self.path, time.perf_counter() - start,
+        )
+        return state, state_epoch, len(operations)
+
+    def compact(self):
+        with file_lock(self.lock_path):
+            state, epoch, folded = self._replay()
+            _write_atomic(self.state_path, [_STATE_HEADER + b" %d\n" % (epoch + 1), *state.lines()])
+            _write_atomic(self.path, [_LOG_HEADER + b" %d\n" % (epoch + 1)])
+        logger.info(
+            "Compacted %s operations into %s (%s ingested, %s deleted, %s selected)",
+            folded, self.state_path, len(state.ingested), len(state.deleted), len(state.selected),
+        )
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+            if not self._closed:
+                # let concurrent requests join this batch
+                time.sleep(self.commit_seconds)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                seq = self._queued
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error("Could not write %s operations to %s: %s", len(batch), self.path, e)
+                with self._cond:
+                    self._error = e
+                    self._closed = True
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._durable = seq
+                self._cond.notify_all()
+            self._since_compaction += len(batch)
+            if self._since_compaction >= self.compact_every:
+                self._since_compaction = 0
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error("Could not compact %s: %s", self.path, e)
+
+    def _write(self, batch: List[bytes]):
+        with file_lock(self.lock_path):
+            if _epoch(self.path, _LOG_HEADER) != (_epoch(self.state_path, _STATE_HEADER) or 0):
+                # no log yet, or a compaction died half way: start the right one
+                self._replay()
+            with open(self.path, "r+b") as f:
+                end = _complete_length(f)
+                if end < f.seek(0, os.SEEK_END):
+                    # a crash tore the last record, which replay drops; cut it off
+                    # so this batch doesn't get glued onto it
+                    logger.warning("Dropping a torn record at the end of %s", self.path)
+                    f.truncate(end)
+                f.seek(end)
+                f.write(b"".join(batch))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+
+
+_logs: Dict[str, OperationLog] = {}
+_logs_lock = Lock()
+
+
+def oplog_path(source_path: str, oplog_dir: Path = OPLOG_DIR) -> Path:
+    source = Path(source_path).resolve()
+    tag = hashlib.sha1(str(source).encode()).hexdigest()[:12]
+    return oplog_dir / f"{source.stem}-{tag}.oplog"
+
+
+def operation_log(source_path: str) -> OperationLog:
+    # one log (and writer thread) per source file and process, shared by every
+    # CandidateList loaded from it, so reloads pick up where the last one was
+    path = oplog_path(source_path)
+    with _logs_lock:
+        log = _logs.get(str(path))
+        if log is None:
+            log = _logs[str(path)] = OperationLog(path)
+        return log
+
+
+@atexit.register
+def _flush_logs():
+    for log in list(_logs.values()):
+        log.close()
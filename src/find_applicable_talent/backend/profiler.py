@@ -0,0 +1,102 @@
+import atexit
+import os
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+from find_applicable_talent.backend.metrics import Counter as MetricCounter
+from find_applicable_talent.backend.util.logger import get_logger
+from find_applicable_talent.backend import BASE_DIR
+
+logger = get_logger(__name__)
+
+# Set CANDIDATE_PROFILE=true to sample the stack of every thread each
+# CANDIDATE_PROFILE_INTERVAL_MS. Samples are aggregated as folded stacks
+# ("outer;inner;leaf count", what flamegraph.pl and speedscope read), served at
+# GET /debug/profile and written to logs/profile_<pid>.folded every
+# CANDIDATE_PROFILE_FLUSH_SECONDS and at exit.
+PROFILE_ENABLED = os.environ.get("CANDIDATE_PROFILE", "false").lower() == "true"
+PROFILE_INTERVAL = float(os.environ.get("CANDIDATE_PROFILE_INTERVAL_MS", "10")) / 1000
+PROFILE_FLUSH_SECONDS = float(os.environ.get("CANDIDATE_PROFILE_FLUSH_SECONDS", "30"))
+PROFILE_DIR = BASE_DIR / "logs"
+
+PROFILE_SAMPLES = MetricCounter("candidate_profile_samples", "Stacks sampled by the sampling profiler")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = PROFILE_INTERVAL, path: Optional[Path] = None):
+        self.interval = interval
+        self.path = path or PROFILE_DIR / f"profile_{os.getpid()}.folded"
+        self.samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            logger.info("Sampling stacks every %.1fms into %s", self.interval * 1000, self.path)
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.write()
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(_frame_name(frame))
+                frame = frame.f_back
+            frames.append(names.get(ident, str(ident)))
+            stacks.append(";".join(reversed(frames)))
+        with self._lock:
+            self.samples.update(stacks)
+        PROFILE_SAMPLES.inc(len(stacks))
+
+    def _run(self):
+        flush_every = max(1, int(PROFILE_FLUSH_SECONDS / self.interval))
+        ticks = 0
+        while not self._stop.wait(self.interval):
+            self._sample()
+            ticks += 1
+            if ticks % flush_every == 0:
+                self.write()
+
+    def folded(self) -> str:
+        with self._lock:
+            samples = self.samples.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in samples)
+
+    def write(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(self.folded())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", self.path, e)
+
+
+def start_profiler() -> Optional[SamplingProfiler]:
+    # The process-wide profiler when CANDIDATE_PROFILE is set, else None
+    if not PROFILE_ENABLED:
+        return None
+    profiler = SamplingProfiler()
+    profiler.start()
+    atexit.register(profiler.stop)
+    return profiler
@@ -0,0 +1,198 @@
+import heapq
+import math
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, repeat
+from operator import add, mul, sub
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from find_applicable_talent.backend.columnar import Column
+from find_applicable_talent.backend.dynamic_candidate_filter import compile_path, normalize_string
+from find_applicable_talent.backend.util.bitmaps import iter_positions
+
+# Every feature is scaled to 0..1 so weights are comparable; a negative weight
+# prefers low values (e.g. recent graduates via years_since_grad)
+FEATURES = (
+    "gpa",               # most recent GPA / 4
+    "top25",             # any degree from a top 25 school
+    "top50",             # any degree from a top 50 school
+    "years_since_grad",  # years since the most recent degree ended, capped at 10, / 10
+    "job_count",         # number of jobs, capped at 10, / 10
+    "matching_roles",    # jobs whose role name contains one of `roles`, capped at 5, / 5
+    "skills_overlap",    # share of `skills` the candidate lists
+    "salary_fit",        # 1 within `salary_budget`, falling to 0 at twice the budget
+)
+
+_MAX_YEARS = 10
+_MAX_JOBS = 10
+_MAX_MATCHING_ROLES = 5
+# parameterised feature columns (per role list, skill list, budget) kept around
+_DYNAMIC_CACHE_SIZE = 32
+
+
+def _per_position(column: Column, table: List[float], combine: Callable = max) -> array:
+    # table[code] mapped over the column; list positions combine their elements
+    if column.scalar:
+        return array("d", map(table.__getitem__, column.codes))
+    if combine is sum:
+        # prefix sums over the elements, then one difference per position
+        totals = list(accumulate(map(table.__getitem__, column.codes), initial=0.0))
+        offsets = column.offsets
+        return array("d", map(sub, map(totals.__getitem__, offsets[1:]), map(totals.__getitem__, offsets[:-1])))
+    values = array("d", repeat(0.0, len(column)))
+    for owner, code in zip(column.owners, column.codes):
+        value = table[code]
+        if value > values[owner]:
+            values[owner] = value
+    return values
+
+
+def _scaled_counts(counts: Iterable[float], cap: float) -> array:
+    # min(count, cap) / cap for small integral counts, through a lookup table
+    counts = list(map(int, counts))
+    scale = [min(c, cap) / cap for c in range(max(counts, default=0) + 1)]
+    return array("d", map(scale.__getitem__, counts))
+
+
+class FeatureTable:
+    # Feature columns over every position of one CandidateIndex, computed once
+    # from the dictionary-encoded columns (one evaluation per distinct value)
+    def __init__(self, index):
+        self.index = index
+        self.size = len(index.pool)
+        self._static: Dict[str, array] = {}
+        self._dynamic: "OrderedDict[tuple, array]" = OrderedDict()
+        self._lock = Lock()
+
+    def _column(self, path: str) -> Optional[Column]:
+        return self.index.columns.columns.get(path)
+
+    def _zeros(self) -> array:
+        return array("d", repeat(0.0, self.size))
+
+    def _from_column(self, path: str, value: Callable[[object], float], combine: Callable = max) -> array:
+        column = self._column(path)
+        if column is None:
+            # no column (unhashable values): go through the candidates
+            accessor = compile_path(path)
+            return array("d", (
+                combine([value(v) for v in accessor(c)] or [0.0]) for c in self.index.pool
+            ))
+        table = [0.0] + [value(v) for v in column.dictionary[1:]]
+        return _per_position(column, table, combine)
+
+    def static(self, name: str) -> array:
+        with self._lock:
+            values = self._static.get(name)
+            if values is None:
+                values = self._static[name] = self._compute_static(name)
+            return values
+
+    def _compute_static(self, name: str) -> array:
+        if name == "gpa":
+            return self._from_column("education.most_recent_gpa", lambda v: min(v, 4.0) / 4.0 if v else 0.0)
+        if name == "top25":
+            return self._from_column("education.degrees.isTop25", lambda v: 1.0 if v is True else 0.0)
+        if name == "top50":
+            return self._from_column("education.degrees.isTop50", lambda v: 1.0 if v is True else 0.0)
+        if name == "years_since_grad":
+            return self._from_column(
+                "derived.years_since_grad", lambda v: min(max(v, 0), _MAX_YEARS) / _MAX_YEARS if v is not None else 0.0,
+            )
+        if name == "job_count":
+            return _scaled_counts(self._from_column("derived.job_count", lambda v: v or 0), _MAX_JOBS)
+        raise ValueError(f"Unknown feature {name!r}")
+
+    def _cached(self, key: tuple, compute: Callable[[], array]) -> array:
+        with self._lock:
+            values = self._dynamic.get(key)
+            if values is not None:
+                self._dynamic.move_to_end(key)
+                return values
+        values = compute()
+        with self._lock:
+            self._dynamic[key] = values
+            while len(self._dynamic) > _DYNAMIC_CACHE_SIZE:
+                self._dynamic.popitem(last=False)
+        return values
+
+    def matching_roles(self, roles: Iterable[str]) -> array:
+        wanted = tuple(sorted({normalize_string(r) for r in roles if r}))
+        if not wanted:
+            return self._zeros()
+
+        def compute() -> array:
+            counts = self._from_column(
+                "work_experiences.roleName",
+                lambda v: 1.0 if isinstance(v, str) and any(w in normalize_string(v) for w in wanted) else 0.0,
+                sum,
+            )
+            return _scaled_counts(counts, _MAX_MATCHING_ROLES)
+
+        return self._cached(("matching_roles", wanted), compute)
+
+    def skills_overlap(self, skills: Iterable[str]) -> array:
+        wanted = frozenset(normalize_string(s) for s in skills if s)
+        if not wanted:
+            return self._zeros()
+
+        def compute() -> array:
+            counts = self._from_column(
+                "skills", lambda v: 1.0 if isinstance(v, str) and normalize_string(v) in wanted else 0.0, sum,
+            )
+            return _scaled_counts(counts, len(wanted))
+
+        return self._cached(("skills_overlap", wanted), compute)
+
+    def salary_fit(self, budget: Optional[float]) -> array:
+        if budget is None or budget <= 0:
+            return self._zeros()
+
+        def fit(salary: Optional[float]) -> float:
+            if salary is None or math.isnan(salary):
+                return 0.0
+            if salary <= budget:
+                return 1.0
+            return max(0.0, 1.0 - (salary - budget) / budget)
+
+        return self._cached(("salary_fit", budget), lambda: self._from_column("derived.salary", fit))
+
+
+def rank_positions(
+    table: FeatureTable,
+    mask: int,
+    weights: Dict[str, float],
+    limit: int = 10,
+    roles: Iterable[str] = (),
+    skills: Iterable[str] = (),
+    salary_budget: Optional[float] = None,
+) -> Tuple[int, List[Tuple[int, float]]]:
+    # Weighted sum of the features, summed column-wise with map(add/mul) rather
+    # than per candidate, then a heap picks the top `limit` of the masked positions
+    unknown = [name for name in weights if name not in FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown features {', '.join(unknown)}; known: {', '.join(FEATURES)}")
+    positions = list(iter_positions(mask))
+    # small selections gather their rows first instead of summing whole columns
+    gather = len(positions) * 2 < table.size
+    totals = array("d", repeat(0.0, len(positions) if gather else table.size))
+    for name, weight in weights.items():
+        if not weight:
+            continue
+        if name == "matching_roles":
+            values = table.matching_roles(roles)
+        elif name == "skills_overlap":
+            values = table.skills_overlap(skills)
+        elif name == "salary_fit":
+            values = table.salary_fit(salary_budget)
+        else:
+            values = table.static(name)
+        if gather:
+            values = map(values.__getitem__, positions)
+        totals = array("d", map(add, totals, map(mul, values, repeat(weight))))
+    # nlargest is stable, ties go to the earlier position
+    if gather:
+        top = heapq.nlargest(limit, range(len(positions)), key=totals.__getitem__)
+        return len(positions), [(positions[i], totals[i]) for i in top]
+    top = heapq.nlargest(limit, positions, key=totals.__getitem__)
+    return len(positions), [(p, totals[p]) for p in top]
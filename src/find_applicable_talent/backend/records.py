@@ -0,0 +1,144 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+from find_applicable_talent.backend.derived import years_since
+
+# Compact in-memory form of the candidate models in candidates.py: the same
+# attribute names (so paths, filters, columns and eligibility work unchanged) on
+# __slots__ classes instead of pydantic models, with repeated values shared
+# through an Interner and degree years kept as plain ints. Pydantic models are
+# only built from these at the API boundary, see candidates.candidate_model.
+
+
+class Interner:
+    # One shared instance per distinct value; keyed on the type as well so 1,
+    # 1.0 and True stay distinct
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values: Dict[tuple, object] = {}
+
+    def __call__(self, value):
+        if value is None:
+            return None
+        return self._values.setdefault((type(value), value), value)
+
+    def all(self, values: Optional[list]) -> Optional[list]:
+        if values is None:
+            return None
+        return [self(v) for v in values]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+@lru_cache(maxsize=None)
+def _year_start(year: int) -> datetime:
+    return datetime(year, 1, 1)
+
+
+def pack_date(value: Optional[datetime]) -> Union[int, datetime, None]:
+    # "2019" parses to 2019-01-01 00:00, which is stored as the int 2019; anything
+    # more precise stays a datetime
+    if value is not None and value == _year_start(value.year):
+        return value.year
+    return value
+
+
+def unpack_date(value: Union[int, datetime, None]) -> Optional[datetime]:
+    if isinstance(value, int):
+        return _year_start(value)
+    return value
+
+
+class WorkRecord:
+    __slots__ = ("company", "roleName")
+
+    def __init__(self, company: Optional[str], roleName: Optional[str]):
+        self.company = company
+        self.roleName = roleName
+
+
+class DegreeRecord:
+    __slots__ = ("degree", "subject", "school", "gpa", "start", "end", "originalSchool", "isTop50", "isTop25")
+
+    def __init__(self, degree, subject, school, gpa, start, end, originalSchool, isTop50, isTop25):
+        self.degree = degree
+        self.subject = subject
+        self.school = school
+        self.gpa = gpa
+        # packed, see pack_date
+        self.start = start
+        self.end = end
+        self.originalSchool = originalSchool
+        self.isTop50 = isTop50
+        self.isTop25 = isTop25
+
+    @property
+    def startDate(self) -> Optional[datetime]:
+        return unpack_date(self.start)
+
+    @property
+    def endDate(self) -> Optional[datetime]:
+        return unpack_date(self.end)
+
+
+class EducationRecord:
+    __slots__ = ("highest_level", "degrees", "most_recent_end", "most_recent_gpa")
+
+    def __init__(self, highest_level, degrees: Optional[List[DegreeRecord]], most_recent_end, most_recent_gpa):
+        self.highest_level = highest_level
+        self.degrees = degrees
+        self.most_recent_end = most_recent_end
+        self.most_recent_gpa = most_recent_gpa
+
+    @property
+    def most_recent_end_date(self) -> Optional[datetime]:
+        return unpack_date(self.most_recent_end)
+
+
+class DerivedRecord:
+    __slots__ = ("salary", "salary_full_time", "salary_part_time", "grad_year", "job_count", "tokens")
+
+    def __init__(self, salary, salary_full_time, salary_part_time, grad_year, job_count, tokens):
+        self.salary = salary
+        self.salary_full_time = salary_full_time
+        self.salary_part_time = salary_part_time
+        self.grad_year = grad_year
+        self.job_count = job_count
+        self.tokens = tokens
+
+    @property
+    def years_since_grad(self) -> Optional[int]:
+        return years_since(self.grad_year)
+
+
+class CandidateRecord:
+    __slots__ = (
+        "id", "name", "email", "phone", "location", "submitted_at", "work_availability",
+        "salary_pairs", "work_experiences", "education", "skills", "derived", "merged_ids",
+    )
+
+    def __init__(
+        self, id, name, email, phone, location, submitted_at, work_availability,
+        salary_pairs, work_experiences, education, skills, derived, merged_ids=None,
+    ):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.location = location
+        self.submitted_at = submitted_at
+        self.work_availability = work_availability
+        # annual_salary_expectation as a shared tuple of (work type, value) pairs
+        self.salary_pairs = salary_pairs
+        self.work_experiences = work_experiences
+        self.education = education
+        self.skills = skills
+        self.derived = derived
+        # IDs of the repeat submissions folded into this one, see dedup.py
+        self.merged_ids = merged_ids
+
+    @property
+    def annual_salary_expectation(self) -> Optional[Dict[str, Union[int, str]]]:
+        return None if self.salary_pairs is None else dict(self.salary_pairs)
@@ -0,0 +1,115 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Optional
+from find_applicable_talent.backend.candidates import CandidateList
+from find_applicable_talent.backend.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+# how many of the outgoing list's hottest filter queries to pre-compute on the new one
+WARM_CACHE_ENTRIES = int(os.environ.get("CANDIDATE_RELOAD_WARM_ENTRIES", "64"))
+
+
+class ReloadInProgress(Exception):
+    pass
+
+
+class ReloadManager:
+    # Builds a replacement CandidateList (pool, indexes, warmed filter cache) on a
+    # background thread, then publishes it with a single reference swap. Requests
+    # resolve the current list once, so whatever they are doing when the swap
+    # happens finishes against the version they started on.
+    def __init__(
+        self,
+        current: Callable[[], CandidateList],
+        publish: Callable[[CandidateList], None],
+        warm_entries: int = WARM_CACHE_ENTRIES,
+    ):
+        self._current = current
+        self._publish = publish
+        self.warm_entries = warm_entries
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="candidate-reload")
+        self._lock = Lock()
+        self._future = None
+        self._status = {
+            "state": "idle",
+            "version": current().version,
+            "path": None,
+            "phase": None,
+            "submissions": 0,
+            "started_at": None,
+            "finished_at": None,
+            "seconds": None,
+            "candidates": None,
+            "error": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def start(self, path: str, token: Optional[str] = None) -> dict:
+        # `token` comes from a shared-mode reload event, see CandidateList.request_reload
+        with self._lock:
+            if self.running:
+                raise ReloadInProgress(f"Reload of {self._status['path']} already running")
+            self._status.update({
+                "state": "running", "path": path, "phase": "starting", "submissions": 0,
+                "started_at": time.time(), "finished_at": None, "seconds": None,
+                "candidates": None, "error": None,
+            })
+            self._future = self._executor.submit(self._run, path, token)
+            return dict(self._status)
+
+    def status(self) -> dict:
+        with self._lock:
+            status = dict(self._status)
+        status["version"] = self._current().version
+        return status
+
+    def wait(self, timeout: Optional[float] = None):
+        future = self._future
+        if future is not None:
+            future.result(timeout)
+
+    def _progress(self, phase: str, submissions: int):
+        with self._lock:
+            self._status["phase"] = phase
+            self._status["submissions"] = submissions
+
+    def _run(self, path: str, token: Optional[str]):
+        start = time.perf_counter()
+        try:
+            previous = self._current()
+            store = CandidateList(
+                path_to_submissions=path, on_progress=self._progress,
+                rebuild_token=token, on_reload=previous.on_reload,
+            )
+            store.on_progress = None
+            self._progress("warming", self._status["submissions"])
+            warmed = store.warm_filter_cache(previous.filter_cache.recent_keys(self.warm_entries))
+            store.version = previous.version + 1
+            self._publish(store)
+        except Exception as e:
+            logger.error("Reload of %s failed: %s", path, e)
+            with self._lock:
+                self._status.update({
+                    "state": "failed", "phase": None, "error": str(e),
+                    "finished_at": time.time(), "seconds": time.perf_counter() - start,
+                })
+            return
+        seconds = time.perf_counter() - start
+        logger.info(
+            "Published candidates v%s (%s candidates, %s warm queries) in %.3fs",
+            store.version, len(store), warmed, seconds,
+        )
+        with self._lock:
+            self._status.update({
+                "state": "succeeded", "phase": None, "candidates": len(store),
+                "finished_at": time.time(), "seconds": seconds,
+            })
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
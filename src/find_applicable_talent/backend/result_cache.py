@@ -0,0 +1,119 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, List, Optional
+from find_applicable_talent.backend.candidate_index import CandidateIndex
+from find_applicable_talent.backend.dynamic_candidate_filter import compile_filters, spec_from_signature, spec_signature
+
+FILTER_CACHE_SIZE = int(os.environ.get("CANDIDATE_FILTER_CACHE_SIZE", "512"))
+
+
+def canonical_key(filter_spec_list: List[dict]) -> Optional[frozenset]:
+    # Specs are ANDed, so neither their order nor repeats change the result
+    try:
+        return frozenset(spec_signature(spec) for spec in filter_spec_list)
+    except TypeError:
+        return None
+
+
+def specs_for(key: frozenset) -> List[dict]:
+    return [spec_from_signature(signature) for signature in key]
+
+
+class FilterResultCache:
+    # LRU of filter results over one CandidateIndex, keyed by canonical spec set.
+    # Entries are position bitmaps taken against every live candidate, stamped with
+    # the index generation they were computed at. Deletes only ever clear bits, so
+    # an entry from an older generation is patched by ANDing it with the live set
+    # and evaluating the filters over just the candidates added since, instead of
+    # being recomputed.
+    def __init__(self, index: CandidateIndex, max_entries: int = FILTER_CACHE_SIZE):
+        self.index = index
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[frozenset, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.patches = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: frozenset) -> Optional[int]:
+        index = self.index
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            generation, mask = entry
+        if generation != index.generation:
+            mask = self._patch(key, generation, mask)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return mask
+
+    def _patch(self, key: frozenset, generation: int, mask: int) -> int:
+        # Deletes are dropped by the live mask; candidates added since the entry
+        # was computed (new or updated ones) only need the filters run over them
+        index = self.index
+        current = index.generation
+        mask &= index.live
+        added = index.added_since(generation) & index.live
+        if added:
+            mask |= index.evaluate(compile_filters(specs_for(key)), added)
+        self.put(key, current, mask)
+        self.patches += 1
+        return mask
+
+    def put(self, key: frozenset, generation: int, mask: int):
+        with self._lock:
+            self._entries[key] = (generation, mask)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def evaluate(self, filter_spec_list: List[dict], base_mask: int, compute: Callable[[int], int]) -> int:
+        # compute(base) evaluates the specs against base. Results are only cached
+        # for the full live set; a narrower base reuses a cached full result (AND
+        # semantics: f(base) == f(live) & base) but doesn't pay for computing one.
+        key = canonical_key(filter_spec_list) if self.max_entries > 0 else None
+        if key is None:
+            return compute(base_mask)
+        cached = self.get(key)
+        if cached is not None:
+            return cached & base_mask
+        index = self.index
+        generation, live = index.generation, index.live
+        if base_mask != live:
+            return compute(base_mask)
+        mask = compute(live)
+        self.put(key, generation, mask)
+        return mask
+
+    def recent_keys(self, limit: int) -> List[frozenset]:
+        # most recently used first
+        with self._lock:
+            keys = list(self._entries)
+        return keys[:-limit - 1:-1] if limit > 0 else []
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "generation": self.index.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "patches": self.patches,
+        }
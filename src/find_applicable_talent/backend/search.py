@@ -0,0 +1,207 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from find_applicable_talent.backend.columnar import ColumnStore
+from find_applicable_talent.backend.dynamic_candidate_filter import compile_path
+from find_applicable_talent.backend.util.bitmaps import bitmap_from_positions, iter_positions
+from find_applicable_talent.backend.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+# field -> weight of its BM25 score in the total
+SEARCH_FIELDS = {
+    "work_experiences.roleName": 1.5,
+    "work_experiences.company": 1.0,
+    "education.degrees.subject": 1.0,
+    "education.degrees.school": 1.0,
+    "skills": 1.5,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# most terms a type-ahead prefix expands to
+MAX_PREFIX_TERMS = 50
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> List[str]:
+    if not isinstance(text, str):
+        return []
+    return _TOKEN.findall(text.lower())
+
+
+class FieldIndex:
+    # Inverted index for one text path: term -> {position: term frequency}, with
+    # every value of a list path (all roles, all skills...) counted towards the
+    # same document
+    def __init__(self, path: str, weight: float = 1.0):
+        self.path = path
+        self.weight = weight
+        self.accessor = compile_path(path)
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self._vocabulary: Optional[List[str]] = None
+        # term -> bitmap of its postings, kept up to date once computed
+        self._masks: Dict[str, int] = {}
+
+    def build(self, columns: ColumnStore, pool: list):
+        column = columns.columns.get(self.path)
+        if column is None:
+            for position, candidate in enumerate(pool):
+                self.add(position, candidate)
+            return
+        # every distinct value is tokenized once
+        tokens = [Counter(tokenize(value)) for value in column.dictionary]
+        for position, code in column.iter_codes():
+            self._add_tokens(position, tokens[code])
+
+    def add(self, position: int, candidate):
+        counts = Counter()
+        for value in self.accessor(candidate):
+            counts.update(tokenize(value))
+        self._add_tokens(position, counts)
+
+    def _add_tokens(self, position: int, counts: Counter):
+        if not counts:
+            return
+        postings = self.postings
+        for term, tf in counts.items():
+            posting = postings.get(term)
+            if posting is None:
+                posting = postings[term] = {}
+                self._vocabulary = None
+            posting[position] = posting.get(position, 0) + tf
+            if term in self._masks:
+                self._masks[term] |= 1 << position
+        length = sum(counts.values())
+        self.lengths[position] = self.lengths.get(position, 0) + length
+        self.total_length += length
+
+    @property
+    def vocabulary(self) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def expand(self, prefix: str) -> List[str]:
+        vocabulary = self.vocabulary
+        i = bisect_left(vocabulary, prefix)
+        terms = []
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix) and len(terms) < MAX_PREFIX_TERMS:
+            terms.append(vocabulary[i])
+            i += 1
+        return terms
+
+    def score(self, terms: Iterable[str], scores: Dict[int, float], documents: int, positions: List[int]):
+        # BM25 over `positions`, document frequencies counted over everything ever
+        # added (removed candidates are masked out elsewhere, they barely move idf)
+        if not self.lengths:
+            return
+        average = self.total_length / len(self.lengths)
+        lengths = self.lengths
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (documents - df + 0.5) / (df + 0.5)) * self.weight
+            # walk whichever side is shorter
+            if len(positions) < df:
+                hits = ((p, posting[p]) for p in positions if p in posting)
+            else:
+                hits = posting.items()
+            for position, tf in hits:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[position] / average)
+                scores[position] = scores.get(position, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    def term_mask(self, terms: Iterable[str]) -> int:
+        mask = 0
+        for term in terms:
+            term_mask = self._masks.get(term)
+            if term_mask is None:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                term_mask = self._masks[term] = bitmap_from_positions(sorted(posting))
+            mask |= term_mask
+        return mask
+
+
+class SearchIndex:
+    def __init__(self, columns: ColumnStore, pool: list, fields: Dict[str, float] = SEARCH_FIELDS):
+        self.fields = {path: FieldIndex(path, weight) for path, weight in fields.items()}
+        for field in self.fields.values():
+            field.build(columns, pool)
+        self.size = len(pool)
+        logger.info(
+            "Search index over %s candidates: %s",
+            self.size, ", ".join(f"{path} ({len(f.postings)} terms)" for path, f in self.fields.items()),
+        )
+
+    def add(self, position: int, candidate):
+        for field in self.fields.values():
+            field.add(position, candidate)
+        self.size = max(self.size, position + 1)
+
+    def _query_terms(self, query: str, prefix: bool, fields: List["FieldIndex"]) -> List[Dict[str, List[str]]]:
+        # per query token: field path -> the index terms it stands for. With prefix,
+        # the last token is still being typed and matches any term it starts
+        tokens = tokenize(query)
+        expanded = []
+        for i, token in enumerate(tokens):
+            typing = prefix and i == len(tokens) - 1
+            expanded.append({
+                field.path: field.expand(token) if typing else [token]
+                for field in fields
+            })
+        return expanded
+
+    def search(
+        self,
+        query: str,
+        mask: int,
+        limit: int = 20,
+        prefix: bool = True,
+        match_all: bool = True,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Tuple[int, List[Tuple[int, float]]]:
+        # (number of matches within mask, the top `limit` (position, score) pairs)
+        unknown = [f for f in (fields or ()) if f not in self.fields]
+        if unknown:
+            raise ValueError(f"Can't search {', '.join(unknown)}; searchable: {', '.join(self.fields)}")
+        selected = [self.fields[f] for f in (fields or self.fields)]
+        query_terms = self._query_terms(query, prefix, selected)
+        if not query_terms:
+            return 0, []
+
+        if match_all:
+            # every query token has to hit some field
+            for by_field in query_terms:
+                if not mask:
+                    break
+                token_mask = 0
+                for field in selected:
+                    token_mask |= field.term_mask(by_field[field.path])
+                mask &= token_mask
+        else:
+            any_mask = 0
+            for by_field in query_terms:
+                for field in selected:
+                    any_mask |= field.term_mask(by_field[field.path])
+            mask &= any_mask
+        if not mask:
+            return 0, []
+
+        documents = max(self.size, 1)
+        matches = list(iter_positions(mask))
+        scores: Dict[int, float] = {}
+        for field in selected:
+            terms = [term for by_field in query_terms for term in by_field[field.path]]
+            field.score(terms, scores, documents, matches)
+        top = heapq.nlargest(limit, matches, key=lambda p: (scores.get(p, 0.0), -p))
+        return len(matches), [(p, scores.get(p, 0.0)) for p in top]
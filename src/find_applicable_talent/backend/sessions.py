@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional
+from find_applicable_talent.backend.candidate_index import CandidateIndex
+from find_applicable_talent.backend.candidates import CandidateList
+from find_applicable_talent.backend.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_TTL = float(os.environ.get("CANDIDATE_SESSION_TTL", "1800"))
+MAX_SESSIONS = int(os.environ.get("CANDIDATE_MAX_SESSIONS", "1000"))
+SESSION_MEMORY_BYTES = int(float(os.environ.get("CANDIDATE_SESSION_MEMORY_MB", "256")) * (1 << 20))
+
+
+class FilterSession:
+    # One client's filtered view: a bitmap over the positions of `index`. The mask
+    # is an int, so it is never mutated in place, a refinement just swaps in a new one
+    __slots__ = ("session_id", "index", "mask", "last_used")
+
+    def __init__(self, session_id: str, index: CandidateIndex, mask: int):
+        self.session_id = session_id
+        self.index = index
+        self.mask = mask
+        self.last_used = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.mask)
+
+    def view(self, store: CandidateList) -> int:
+        # the view over the store's current index, minus anyone deleted since
+        index = store.index
+        if self.index is not index:
+            self.mask = index.remap(self.mask, self.index)
+            self.index = index
+        return self.mask & index.live
+
+
+class SessionStore:
+    # LRU of filter sessions with a TTL, a session count cap and a cap on the total
+    # size of their bitmaps. The lock only guards the bookkeeping, filters are
+    # evaluated outside it.
+    def __init__(
+        self,
+        ttl: float = SESSION_TTL,
+        max_sessions: int = MAX_SESSIONS,
+        max_bytes: int = SESSION_MEMORY_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, FilterSession]" = OrderedDict()
+        self._nbytes: Dict[str, int] = {}
+        self._lock = Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, store: CandidateList) -> FilterSession:
+        index = store.index
+        session = FilterSession(str(uuid.uuid4()), index, index.live)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._nbytes[session.session_id] = session.nbytes
+            self._evict()
+        logger.info("Created session %s, %d active", session.session_id, len(self._sessions))
+        return session
+
+    def get(self, session_id: str) -> Optional[FilterSession]:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.last_used > self.ttl:
+                self._drop(session_id)
+                self.expirations += 1
+                return None
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def refine(
+        self, session: FilterSession, store: CandidateList, filter_spec_list: List[dict], from_fresh_candidates: bool = False,
+    ) -> int:
+        # Narrows this session's own view (or starts over from everyone), nobody
+        # else's view is affected
+        base_mask = None if from_fresh_candidates else session.view(store)
+        mask = store.evaluate_filters(filter_spec_list, base_mask)
+        session.index = store.index
+        session.mask = mask
+        with self._lock:
+            if session.session_id in self._sessions:
+                self._nbytes[session.session_id] = session.nbytes
+                self._evict(keep=session.session_id)
+        return mask
+
+    def drop(self, session_id: str) -> bool:
+        with self._lock:
+            return self._drop(session_id)
+
+    def _drop(self, session_id: str) -> bool:
+        self._nbytes.pop(session_id, None)
+        return self._sessions.pop(session_id, None) is not None
+
+    def _evict(self, keep: Optional[str] = None):
+        now = time.monotonic()
+        for session_id in [s.session_id for s in self._sessions.values() if now - s.last_used > self.ttl]:
+            self._drop(session_id)
+            self.expirations += 1
+        total = sum(self._nbytes.values())
+        while self._sessions and (len(self._sessions) > self.max_sessions or total > self.max_bytes):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(session_id)
+                continue
+            total -= self._nbytes.get(session_id, 0)
+            self._drop(session_id)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": sum(self._nbytes.values()),
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,327 @@
+import fcntl
+import json
+import mmap
+import os
+import pickle
+import uuid
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from pathlib import Path
+from contextlib import contextmanager
+from threading import Lock
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from find_applicable_talent.backend.columnar import Column, typecode
+from find_applicable_talent.backend.snapshot import snapshot_path, source_header, stale_reason
+from find_applicable_talent.backend.util.files import file_lock
+from find_applicable_talent.backend.util.logger import get_logger
+from find_applicable_talent.backend import SNAPSHOT_DIR
+
+logger = get_logger(__name__)
+
+# Set CANDIDATE_SHARED_POOL=true when running several uvicorn workers: the first
+# worker to start builds a read-only segment file of the pool that every worker
+# maps, so the candidate data sits in the page cache once instead of once per
+# worker, and mutations go through a shared event log so all workers agree on
+# deletes, selections and ingests.
+SHARED_POOL = os.environ.get("CANDIDATE_SHARED_POOL", "false").lower() == "true"
+# decoded records each worker keeps around for lookups and scans
+RECORD_CACHE_SIZE = int(os.environ.get("CANDIDATE_SHARED_CACHE_SIZE", "4096"))
+# once a build's event log grows past this, the worker that appended last folds
+# the pool as it stands into a new build and the log starts over
+EVENT_LOG_FOLD_BYTES = int(os.environ.get("CANDIDATE_EVENT_LOG_FOLD_MB", "64")) * 2**20
+
+# magic, directory offset and length (u64 each), then 8-byte aligned sections:
+# the record offsets (count + 1 u64, relative to the first record), one pickled
+# row per record, and for every column its pickled dictionary and its code,
+# offset and owner arrays as raw bytes. The pickled directory (the header and
+# where each section is) comes last.
+_MAGIC = b"FATPOOL2"
+_WORD = 8
+
+
+def segment_path(source_path: str, snapshot_dir: Path = SNAPSHOT_DIR) -> Path:
+    return snapshot_path(source_path, snapshot_dir).with_suffix(".pool")
+
+
+def _aligned(n: int) -> int:
+    return (n + _WORD - 1) // _WORD * _WORD
+
+
+class Segment:
+    # A built segment, mapped read-only; the mapping outlives the file being
+    # replaced by a newer build
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = self._view = memoryview(self._mmap)
+        if view[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a candidate segment")
+        start = int.from_bytes(view[len(_MAGIC):len(_MAGIC) + _WORD], "little")
+        size = int.from_bytes(view[len(_MAGIC) + _WORD:len(_MAGIC) + 2 * _WORD], "little")
+        directory = pickle.loads(view[start:start + size])
+        self.header: dict = directory["header"]
+        (offsets_start, offsets_end), (data_start, data_end) = directory["records"]
+        self.offsets = view[offsets_start:offsets_end].cast("Q")
+        self._data = view[data_start:data_end]
+        self._columns: Dict[str, dict] = directory["columns"]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def blob(self, position: int) -> memoryview:
+        return self._data[self.offsets[position]:self.offsets[position + 1]]
+
+    def _array(self, section: Optional[tuple]) -> Optional[memoryview]:
+        if section is None:
+            return None
+        start, end, code = section
+        return self._view[start:end].cast(code)
+
+    def columns(self) -> Dict[str, Column]:
+        # New Column objects over the mapped code arrays, so no record has to be
+        # decoded to index the pool; only the dictionaries are unpickled
+        return {
+            path: Column.mapped(
+                path, pickle.loads(self._view[slice(*section["dictionary"])]),
+                self._array(section["codes"]), self._array(section["offsets"]), self._array(section["owners"]),
+            )
+            for path, section in self._columns.items()
+        }
+
+    @property
+    def build_id(self) -> str:
+        return self.header["build_id"]
+
+
+def write_segment(path: Path, header: dict, rows: List[tuple], columns: Dict[str, Column]):
+    tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC + bytes(2 * _WORD))
+
+        def section(*chunks) -> Tuple[int, int]:
+            f.write(bytes(_aligned(f.tell()) - f.tell()))
+            start = f.tell()
+            f.writelines(chunks)
+            return start, f.tell()
+
+        def array_section(values) -> Optional[tuple]:
+            return None if values is None else (*section(values), typecode(values))
+
+        blobs = [pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL) for row in rows]
+        records = (section(array("Q", accumulate(map(len, blobs), initial=0))), section(*blobs))
+        sections = {
+            column_path: {
+                "dictionary": section(pickle.dumps(column.dictionary[1:], protocol=pickle.HIGHEST_PROTOCOL)),
+                "codes": array_section(column.codes),
+                "offsets": array_section(column.offsets),
+                "owners": array_section(column.owners),
+            }
+            for column_path, column in columns.items()
+        }
+        directory = {"header": dict(header, count=len(blobs)), "records": records, "columns": sections}
+        start, end = section(pickle.dumps(directory, protocol=pickle.HIGHEST_PROTOCOL))
+        f.seek(len(_MAGIC))
+        f.write(start.to_bytes(_WORD, "little") + (end - start).to_bytes(_WORD, "little"))
+    # workers only ever map a complete segment
+    os.replace(tmp_path, path)
+    logger.info("Wrote segment of %s candidates and %s columns (%s bytes) to %s", len(blobs), len(columns), end, path)
+
+
+def open_segment(
+    source_path: str,
+    schema: int,
+    dedup: bool,
+    threshold: float,
+    build: Callable[[], Tuple[List[tuple], Dict[str, Column]]],
+    rebuild_token: Optional[str] = None,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+) -> Segment:
+    # Maps the segment for `source_path`, building it first (rows and columns
+    # from `build`) if it is missing or stale. Whoever holds the lock builds,
+    # everyone else waits and maps the result. A reload passes the token from its
+    # event so that exactly one worker rebuilds and the rest attach to that build.
+    path = segment_path(source_path, snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    previous = None
+    with file_lock(path.with_suffix(".lock")):
+        if path.exists():
+            try:
+                segment = Segment(path)
+                stale = stale_reason(segment.header, source_path, schema, dedup, threshold)
+                if stale is None and rebuild_token is not None and segment.header.get("token") != rebuild_token:
+                    stale = "predates the requested reload"
+                if stale is None:
+                    logger.info("Attached segment %s (%s candidates, build %s)", path, len(segment), segment.build_id)
+                    EventLog.for_segment(segment).path.touch(exist_ok=True)
+                    return segment
+                logger.info("Segment %s %s, rebuilding", path, stale)
+                previous = segment.build_id
+            except Exception as e:
+                logger.warning("Could not map segment %s, rebuilding: %s", path, e)
+        header = source_header(source_path, schema, dedup, threshold)
+        header.update(build_id=uuid.uuid4().hex, token=rebuild_token)
+        write_segment(path, header, *build())
+        return _started(Segment(path), previous)
+
+
+def fold_segment(
+    segment: Segment, events: "EventLog", build: Callable[[], Tuple[List[tuple], Dict[str, Column], dict]],
+) -> Optional[Segment]:
+    # Writes a new build of `segment` from `build` (rows, columns and extra header
+    # fields, taken once it has applied the rest of the log) and seals `events`
+    # with a fold event naming it, which moves every other worker over. None if
+    # another worker folded or rebuilt the segment first.
+    path = segment.path
+    with file_lock(path.with_suffix(".lock")):
+        try:
+            with events.exclusive() as log:
+                if Segment(path).build_id != segment.build_id:
+                    return None
+                rows, columns, fields = build()
+                header = dict(segment.header, **fields, build_id=uuid.uuid4().hex)
+                write_segment(path, header, rows, columns)
+                EventLog.write(log, {"op": "fold", "build": header["build_id"]})
+        except LogSuperseded:
+            return None
+        logger.info("Folded %s bytes of events on build %s into build %s", events.offset, segment.build_id, header["build_id"])
+        return _started(Segment(path), segment.build_id)
+
+
+def _started(segment: Segment, previous: Optional[str]) -> Segment:
+    # Creates the event log of a build just written and deletes the logs of every
+    # build before `previous` (the one it replaced, if any): workers still on `previous` move over through the
+    # last event in its log, anyone further behind finds their log gone and maps
+    # the current build. Runs under the segment lock.
+    log = EventLog.for_segment(segment).path
+    log.touch(exist_ok=True)
+    keep = {log.name, f"{segment.path.stem}-{previous}.events"}
+    for stale in segment.path.parent.glob(f"{segment.path.stem}-*.events"):
+        if stale.name not in keep:
+            stale.unlink(missing_ok=True)
+            logger.info("Deleted superseded event log %s", stale)
+    return segment
+
+
+class SharedRecords:
+    # The pool as CandidateIndex sees it: records decoded from the segment on
+    # access, with a small LRU in front, then whatever this process appended
+    # since (upserts), which only lives here. Indexes come from the segment's
+    # mapped columns, so records are only decoded for responses and for paths
+    # without a column.
+    def __init__(self, segment: Segment, decode: Callable[[memoryview], object], cache_size: int = RECORD_CACHE_SIZE):
+        self.segment = segment
+        self.decode = decode
+        self.cache_size = cache_size
+        self._base = len(segment)
+        self._local: list = []
+        self._cache: "OrderedDict[int, object]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return self._base + len(self._local)
+
+    def __getitem__(self, position: int):
+        if position < 0:
+            position += len(self)
+        if position >= self._base:
+            return self._local[position - self._base]
+        with self._lock:
+            record = self._cache.get(position)
+            if record is not None:
+                self._cache.move_to_end(position)
+                return record
+        record = self.decode(self.segment.blob(position))
+        with self._lock:
+            self._cache[position] = record
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return record
+
+    def __iter__(self) -> Iterator:
+        # full passes decode straight through, past the cache
+        decode, blob = self.decode, self.segment.blob
+        for position in range(self._base):
+            yield decode(blob(position))
+        yield from self._local
+
+    def append(self, record):
+        self._local.append(record)
+
+
+class LogSuperseded(Exception):
+    # the event log was folded into a newer build, or deleted once superseded
+    pass
+
+
+class EventLog:
+    # Append-only NDJSON of the mutations every worker applies in the same order
+    # (deletes, selections, upserts, reloads). One log per segment build, so a
+    # rebuilt pool starts from a clean slate. Appends hold an exclusive flock so
+    # lines never interleave; each process tails the log from its own offset,
+    # and the log size is the shared generation number. A fold event is always
+    # the last line: nothing is appended after it.
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+
+    @classmethod
+    def for_segment(cls, segment: Segment) -> "EventLog":
+        return cls(segment.path.with_name(f"{segment.path.stem}-{segment.build_id}.events"))
+
+    @property
+    def generation(self) -> int:
+        return os.stat(self.path).st_size
+
+    def pending(self) -> bool:
+        try:
+            return self.generation > self.offset
+        except FileNotFoundError:
+            # deleted, the caller has to move to the current build
+            return True
+
+    @contextmanager
+    def exclusive(self) -> Iterator[BinaryIO]:
+        # The log, locked against appends and positioned at its end
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            raise LogSuperseded(f"{self.path} was deleted")
+        # closing the file drops the lock
+        with f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - 256, 0))
+            if f.read().rstrip(b"\n").rpartition(b"\n")[2].startswith(b'{"op": "fold"'):
+                raise LogSuperseded(f"{self.path} was folded")
+            f.seek(size)
+            yield f
+
+    @staticmethod
+    def write(f: BinaryIO, event: dict) -> int:
+        f.write((json.dumps(event) + "\n").encode())
+        f.flush()
+        return f.tell()
+
+    def append(self, event: dict) -> int:
+        # returns the offset just past the new line
+        with self.exclusive() as f:
+            return self.write(f, event)
+
+    def read_new(self) -> List[Tuple[dict, int]]:
+        # (event, offset past it) for every complete line since the last call
+        events = []
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            raise LogSuperseded(f"{self.path} was deleted")
+        with f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # still being written
+                    break
+                self.offset += len(line)
+                events.append((json.loads(line), self.offset))
+        return events
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import List, Optional
+from find_applicable_talent.backend.util.logger import get_logger
+from find_applicable_talent.backend import SNAPSHOT_DIR
+
+logger = get_logger(__name__)
+
+# Snapshots are pickles of plain row tuples that this process wrote itself into
+# SNAPSHOT_DIR: a header dict (which source file and format they were built from)
+# followed by the rows. Never point this at files from elsewhere.
+_MAGIC = b"FATSNAP1"
+_HASH_CHUNK = 1 << 20
+
+
+def snapshot_path(source_path: str, snapshot_dir: Path = SNAPSHOT_DIR) -> Path:
+    source = Path(source_path).resolve()
+    tag = hashlib.sha1(str(source).encode()).hexdigest()[:12]
+    return snapshot_dir / f"{source.stem}-{tag}.snapshot"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_header(
+    source_path: str, schema: int, dedup: bool, threshold: float, sha256: Optional[str] = None,
+) -> dict:
+    # what a pool built from `source_path` depends on: the source, the row format
+    # and how repeat applications were collapsed (dedup.py)
+    stat = os.stat(source_path)
+    return {
+        "schema": schema,
+        "dedup": dedup,
+        "threshold": threshold if dedup else None,
+        "source": str(Path(source_path).resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256 or file_sha256(source_path),
+    }
+
+
+def stale_reason(header: dict, source_path: str, schema: int, dedup: bool, threshold: float) -> Optional[str]:
+    # None when whatever `header` describes was built from the current source
+    # with the current settings
+    if header.get("schema") != schema or header.get("source") != str(Path(source_path).resolve()):
+        return "was built for another schema or source"
+    if header.get("dedup") != dedup or header.get("threshold") != (threshold if dedup else None):
+        return "was built with other dedup settings"
+    stat = os.stat(source_path)
+    if stat.st_size != header["size"]:
+        return "is stale (source size changed)"
+    if stat.st_mtime_ns != header["mtime_ns"]:
+        # touched but maybe not changed, only the content hash can tell
+        if file_sha256(source_path) != header["sha256"]:
+            return "is stale (source content changed)"
+    return None
+
+
+def load_snapshot(
+    source_path: str, schema: int, dedup: bool, threshold: float, snapshot_dir: Path = SNAPSHOT_DIR,
+) -> Optional[List[tuple]]:
+    path = snapshot_path(source_path, snapshot_dir)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("bad magic")
+            header = pickle.load(f)
+            stale = stale_reason(header, source_path, schema, dedup, threshold)
+            if stale is not None:
+                logger.info("Snapshot %s %s, rebuilding", path, stale)
+                return None
+            rows = pickle.load(f)
+    except Exception as e:
+        logger.warning("Could not read snapshot %s, rebuilding: %s", path, e)
+        return None
+    logger.info("Loaded %s rows from snapshot %s", len(rows), path)
+    return rows
+
+
+def write_snapshot(source_path: str, rows: List[tuple], header: dict, snapshot_dir: Path = SNAPSHOT_DIR):
+    # `header` is source_header() taken before the source was read, so a file
+    # replaced mid-load leaves a snapshot that is already stale
+    path = snapshot_path(source_path, snapshot_dir)
+    tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+    try:
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(_MAGIC)
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # readers only ever see a complete snapshot
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning("Could not write snapshot %s: %s", path, e)
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+        return
+    logger.info("Wrote snapshot of %s rows to %s", len(rows), path)
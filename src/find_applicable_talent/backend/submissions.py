@@ -0,0 +1,109 @@
+import json
+from typing import IO, Iterator, List, Tuple
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\r\n"
+# a decode error this close to the end of the buffer may just be an item cut off
+# at a chunk boundary (a literal, a number, a \uXXXX\uXXXX escape); anything
+# earlier is a malformed item
+_MAX_TOKEN = 16
+
+
+def iter_submissions(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    # Accepts either a top-level JSON array (like data.json) or NDJSON, one
+    # submission per line. Only one submission is held in memory at a time.
+    with open(path, 'r') as f:
+        stripped = ""
+        while not stripped:
+            head = f.read(chunk_size)
+            if not head:
+                return
+            stripped = head.lstrip(_WHITESPACE)
+        if stripped.startswith('['):
+            yield from _iter_json_array(f, stripped[1:], chunk_size)
+        else:
+            f.seek(0)
+            yield from iter_ndjson(f)
+
+
+def iter_ndjson(lines) -> Iterator[dict]:
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode()
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_ndjson_tail(path: str, offset: int = 0) -> Tuple[List[dict], int]:
+    # Complete NDJSON lines written after `offset`, and the offset to resume from;
+    # a partially written last line is left for the next call
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    return list(iter_ndjson(data[:end].splitlines())), offset + end
+
+
+def parse_submission_batch(body: bytes) -> List[dict]:
+    # request bodies: NDJSON, or a JSON array of submissions
+    stripped = body.lstrip()
+    if stripped.startswith(b"["):
+        submissions = json.loads(stripped)
+        if not all(isinstance(s, dict) for s in submissions):
+            raise ValueError("Expected an array of submission objects")
+        return submissions
+    return list(iter_ndjson(body.splitlines()))
+
+
+def _iter_json_array(f: IO[str], buf: str, chunk_size: int) -> Iterator[dict]:
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+
+    def more(grow: bool = False) -> bool:
+        # `grow` reads at least as much as is left unparsed, so an item spanning
+        # many chunks is re-parsed a logarithmic number of times, not once per chunk
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(max(chunk_size, len(buf) - pos) if grow else chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    expect_item = True
+    while True:
+        # skip whitespace and the separating comma
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not more():
+                break
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of submissions file, missing ']'")
+        if buf[pos] == ']':
+            return
+        if not expect_item:
+            if buf[pos] != ',':
+                raise ValueError(f"Expected ',' between submissions, got {buf[pos]!r}")
+            pos += 1
+            expect_item = True
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            truncated = e.msg.startswith("Unterminated string") or e.pos >= len(buf) - _MAX_TOKEN
+            if truncated and more(grow=True):
+                continue
+            raise
+        if end == len(buf) and more(grow=True):
+            # a scalar could have been cut off at the chunk boundary, parse it again
+            continue
+        yield item
+        pos = end
+        expect_item = False
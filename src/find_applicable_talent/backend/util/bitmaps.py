@@ -0,0 +1,66 @@
+from itertools import compress
+from typing import Iterable, Iterator
+
+# Candidate-position sets are plain Python ints used as bitmaps: bit i is set when
+# the candidate at position i is in the set. &, |, ~ and bit_count() all run in C.
+#
+# Dense sets go through an ASCII "0"/"1" string so that int(..., 2) and
+# bytes.translate do the per-bit work; sparse ones are cheaper bit by bit.
+
+TO_ASCII_BITS = bytes.maketrans(b"\x00\x01", b"01")
+FROM_ASCII_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def bitmap_from_ascii(bits: bytes) -> int:
+    # bits[i] is b"1" when position i is set
+    if not bits:
+        return 0
+    return int(bits[::-1], 2)
+
+
+def bitmap_from_flags(flags: bytes) -> int:
+    # flags[i] is 1 when position i is set
+    return bitmap_from_ascii(flags.translate(TO_ASCII_BITS))
+
+
+def bitmap_from_positions(positions: Iterable[int]) -> int:
+    positions = positions if isinstance(positions, (list, tuple)) else list(positions)
+    if not positions:
+        return 0
+    size = max(positions) + 1
+    if len(positions) * 16 >= size:
+        flags = bytearray(size)
+        for p in positions:
+            flags[p] = 1
+        return bitmap_from_flags(flags)
+    buf = bytearray((size >> 3) + 1)
+    for p in positions:
+        buf[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(buf, "little")
+
+
+def full_bitmap(size: int) -> int:
+    return (1 << size) - 1
+
+
+def iter_positions(mask: int) -> Iterator[int]:
+    # bin() is LSB-last, so reverse it to get position order
+    bits = bin(mask)[:1:-1]
+    if mask.bit_count() * 32 >= len(bits):
+        flags = bits.encode().translate(FROM_ASCII_BITS)
+        yield from compress(range(len(flags)), flags)
+        return
+    i = bits.find("1")
+    while i != -1:
+        yield i
+        i = bits.find("1", i + 1)
+
+
+def count_positions(mask: int) -> int:
+    return mask.bit_count()
+
+
+def flags_from_bitmap(mask: int, size: int) -> bytes:
+    # flags[i] is 1 when position i is set, for the first `size` positions
+    bits = bin(mask)[:1:-1].encode()[:size]
+    return bits.translate(FROM_ASCII_BITS).ljust(size, b"\x00")
@@ -1,7 +1,12 @@
+import atexit
 import logging
 import json
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from threading import Lock
+from typing import Dict, List
 import os
 
 
@@ -30,6 +35,56 @@ class ColorFormatter(logging.Formatter):
         return f"{color}{message}{RESET}"
 
 
+# With ASYNC_LOGGING (the default) loggers only put records on a queue; one
+# background thread formats them and does the console/file writes, so a request
+# never waits on log I/O. ASYNC_LOGGING=false writes on the calling thread.
+ASYNC_LOGGING = os.environ.get("ASYNC_LOGGING", "true").lower() == "true"
+
+
+class DeferredQueueHandler(QueueHandler):
+    # Queues the record as is: the message (msg % args) is only built on the
+    # writer thread. Log values, not objects that change after the call.
+    def prepare(self, record):
+        return record
+
+
+class _Dispatcher(logging.Handler):
+    # Sends each queued record to the handlers of the logger that made it
+    def __init__(self):
+        super().__init__()
+        self.targets: Dict[str, List[logging.Handler]] = {}
+
+    def handle(self, record):
+        for handler in self.targets.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_dispatcher = _Dispatcher()
+_queue_handler = DeferredQueueHandler(_queue)
+_listener = None
+_listener_lock = Lock()
+
+
+def _start_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_queue, _dispatcher)
+            _listener.start()
+            atexit.register(flush_logs)
+
+
+def flush_logs():
+    # Writes out everything queued so far and stops the writer (at exit)
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
 class DataInjectingFormatter(logging.Formatter):
     def format(self, record):
         base = super().format(record)
@@ -61,8 +116,9 @@ def get_logger(name: str, quiet_mode: bool = os.environ.get("QUIET_MODE", "false
         )
         stream_handler.setFormatter(stream_formatter)
 
+        handlers = []
         if not quiet_mode:
-            logger.addHandler(stream_handler)
+            handlers.append(stream_handler)
 
         file_handler = logging.FileHandler(log_file_path, mode="a")
         file_formatter = DataInjectingFormatter(
@@ -71,7 +127,14 @@ def get_logger(name: str, quiet_mode: bool = os.environ.get("QUIET_MODE", "false
         )
         file_handler.setFormatter(file_formatter)
         if not disable_file_logging:
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
+        if ASYNC_LOGGING and handlers:
+            _dispatcher.targets[name] = handlers
+            logger.addHandler(_queue_handler)
+            _start_listener()
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
         txt = ""
         if quiet_mode:
             txt += "Logger initialized with quiet mode enabled, no logging to console. "
@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# the benchmarks measure the pool, not logging or the bundled file's operation
+# log; set these explicitly to override
+os.environ.setdefault("QUIET_MODE", "true")
+os.environ.setdefault("DISABLE_FILE_LOGGING", "true")
+os.environ.setdefault("CANDIDATE_OPLOG", "false")
+
+from find_applicable_talent.benchmarks.suite import compare, run, write_results  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m find_applicable_talent.benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Benchmark synthetic pools and write the results as JSON")
+    run_parser.add_argument("--sizes", default="10000", help="Comma separated pool sizes, e.g. 10000,100000,1000000")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=5, help="Runs per filter benchmark")
+    run_parser.add_argument("--no-api", action="store_true", help="Skip the end to end API benchmarks")
+    run_parser.add_argument("--output", type=Path, default=None, help="Defaults to benchmark-<commit>.json")
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("before", type=Path)
+    compare_parser.add_argument("after", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative change worth flagging")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        import json
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        lines, regressions = compare(before, after, args.threshold)
+        print("\n".join(lines))
+        return 1 if regressions else 0
+
+    results = run([int(n) for n in args.sizes.split(",")], args.seed, args.repeat, not args.no_api)
+    output = args.output or Path(f"benchmark-{results['meta']['commit'] or 'unknown'}.json")
+    write_results(results, output)
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+import gc
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from find_applicable_talent.backend.candidates import (
+    CandidateList, CANDIDATE_SNAPSHOT_SCHEMA, _parse_submission, _record_to_row,
+)
+from find_applicable_talent.backend.dedup import DEDUP_ENABLED, DEDUP_THRESHOLD
+from find_applicable_talent.backend.dynamic_candidate_filter import compile_path
+from find_applicable_talent.backend.oplog import OperationLog
+from find_applicable_talent.backend.snapshot import source_header, write_snapshot
+from find_applicable_talent.backend.submissions import iter_submissions
+from find_applicable_talent.backend.util.bitmaps import iter_positions
+from find_applicable_talent.benchmarks.synthetic import synthetic_submissions
+
+# Benchmarks of the candidate pool on synthetic data (see synthetic.py): loading,
+# eligibility, the filter operator x path matrix, id lookups and mutations, and
+# end to end API latency. Timings are in milliseconds; results are JSON so two
+# runs (e.g. before and after a change) can be put side by side with compare().
+
+CATEGORICAL = ("==", "!=", "contains")
+NUMERIC = ("==", ">", "<=")
+DATES = (">=", "<")
+# path -> operators benchmarked on it
+FILTER_MATRIX = {
+    "location": CATEGORICAL,
+    "work_experiences.roleName": CATEGORICAL,
+    "work_experiences.company": CATEGORICAL,
+    "education.highest_level": CATEGORICAL,
+    "education.degrees.subject": CATEGORICAL,
+    "education.degrees.originalSchool": CATEGORICAL,
+    "skills": CATEGORICAL,
+    "education.degrees.isTop50": ("==",),
+    "education.most_recent_gpa": NUMERIC,
+    "derived.salary": NUMERIC,
+    "derived.job_count": NUMERIC,
+    "derived.years_since_grad": NUMERIC,
+    "submitted_at": DATES,
+    "education.degrees.endDate": DATES,
+}
+# candidates sampled to pick filter targets, and ids used for lookups/mutations
+SAMPLE_SIZE = 2000
+OPERATION_COUNT = 1000
+DURABLE_OPERATION_COUNT = 200
+# submissions parsed for the eligibility benchmark
+ELIGIBILITY_SAMPLE = 20000
+API_REQUESTS = 50
+
+
+def stats(seconds: List[float]) -> dict:
+    ms = sorted(s * 1000 for s in seconds)
+    return {
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": ms[len(ms) // 2],
+        "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "min_ms": ms[0],
+        "runs": len(ms),
+    }
+
+
+def timed(fn: Callable[[], object], repeat: int, before: Optional[Callable[[], object]] = None) -> dict:
+    # `before` runs ahead of every timed call, outside the measurement
+    samples = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return stats(samples)
+
+
+def timed_each(fn: Callable[[object], object], items: Iterable) -> dict:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return stats(samples)
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(seed: int) -> dict:
+    status = _git("status", "--porcelain")
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+    }
+
+
+def filter_targets(store: CandidateList, rng: random.Random) -> Dict[str, dict]:
+    # Per path, realistic filter values from a sample of the pool: the most common
+    # value for equality, a 3 letter fragment of it for contains, the median for
+    # numbers and dates
+    pool = store.index.pool
+    positions = list(iter_positions(store.live_mask))
+    sample = [pool[p] for p in rng.sample(positions, min(SAMPLE_SIZE, len(positions)))]
+    targets = {}
+    for path in FILTER_MATRIX:
+        accessor = compile_path(path)
+        values = [v for c in sample for v in accessor(c) if v is not None and v != ""]
+        if not values:
+            continue
+        if isinstance(values[0], str):
+            common = Counter(values).most_common(1)[0][0]
+            targets[path] = {"==": common, "!=": common, "contains": common[:3].lower()}
+        elif isinstance(values[0], bool):
+            targets[path] = {"==": True}
+        else:
+            median = sorted(values)[len(values) // 2]
+            if isinstance(median, datetime):
+                median = median.isoformat()
+            targets[path] = {op: median for op in (*NUMERIC, *DATES)}
+    return targets
+
+
+def bench_load(path: Path) -> Tuple[CandidateList, dict]:
+    results = {}
+    header = source_header(str(path), CANDIDATE_SNAPSHOT_SCHEMA, DEDUP_ENABLED, DEDUP_THRESHOLD)
+    gc.collect()
+    start = time.perf_counter()
+    store = CandidateList(str(path), workers=1, use_snapshot=False, shared=False, use_oplog=False)
+    results["parse_seconds"] = time.perf_counter() - start
+    results["max_rss_mb"] = _max_rss_mb()
+    # written here rather than by a second parsing load
+    write_snapshot(str(path), [_record_to_row(c) for c in store.candidates], header)
+    start = time.perf_counter()
+    CandidateList(str(path), workers=1, use_snapshot=True, shared=False, use_oplog=False)
+    results["snapshot_seconds"] = time.perf_counter() - start
+    return store, results
+
+
+def bench_eligibility(path: Path, store: CandidateList, repeat: int) -> dict:
+    parsed = [
+        c for c in map(_parse_submission, islice(iter_submissions(str(path)), ELIGIBILITY_SAMPLE)) if c is not None
+    ]
+    result = timed(lambda: store._filter_candidates(parsed), repeat)
+    result["candidates"] = len(parsed)
+    return result
+
+
+def bench_filters(store: CandidateList, targets: Dict[str, dict], repeat: int) -> dict:
+    # Each cell through dynamic_filters: cold with the result cache cleared before
+    # every run, then warm (a cache hit)
+    results = {}
+    for path, operators in FILTER_MATRIX.items():
+        for op in operators:
+            if op not in targets.get(path, {}):
+                continue
+            specs = [{"path": path, "operator": op, "value": targets[path][op]}]
+            results[f"{path} {op}"] = {
+                "cold": timed(lambda: store.dynamic_filters(specs), repeat, store.filter_cache.clear),
+                "warm": timed(lambda: store.dynamic_filters(specs), repeat),
+                "matches": store.dynamic_filter_mask(specs).bit_count(),
+            }
+    combined = [
+        {"path": path, "operator": op, "value": targets[path][op]}
+        for path, op in (("location", "!="), ("derived.salary", "<="), ("skills", "contains"))
+        if path in targets
+    ]
+    results["combined"] = {
+        "cold": timed(lambda: store.dynamic_filters(combined), repeat, store.filter_cache.clear),
+        "warm": timed(lambda: store.dynamic_filters(combined), repeat),
+        "matches": store.dynamic_filter_mask(combined).bit_count(),
+    }
+    store.dynamic_filter_mask([])
+    return results
+
+
+def bench_operations(store: CandidateList, ids: List[str]) -> dict:
+    # Last in a run: deletes the sampled candidates
+    results = {
+        "get": timed_each(store.get_candidate_by_id, ids),
+        "get_missing": timed_each(store.get_candidate_by_id, (f"missing-{i}" for i in range(len(ids)))),
+        "select": timed_each(store.select_candidate_by_id, ids),
+        "unselect": timed_each(store.remove_selected_candidate_by_id, ids),
+    }
+    # the same selections written ahead to an operation log, waiting for each fsync
+    with tempfile.TemporaryDirectory() as directory:
+        store.oplog = OperationLog(Path(directory) / "bench.oplog")
+
+        def select_durably(candidate_id: str):
+            store.select_candidate_by_id(candidate_id)
+            store.commit()
+
+        results["select_durable"] = timed_each(select_durably, ids[:DURABLE_OPERATION_COUNT])
+        store.oplog.close()
+        store.oplog = None
+    for candidate_id in ids[:DURABLE_OPERATION_COUNT]:
+        store.remove_selected_candidate_by_id(candidate_id)
+    results["delete"] = timed_each(store.remove_candidate_by_id, ids)
+    return results
+
+
+def bench_api(store: CandidateList, targets: Dict[str, dict], ids: List[str]) -> dict:
+    # End to end through FastAPI's test client (routing, validation, serialization)
+    from fastapi.testclient import TestClient
+    from find_applicable_talent.backend.main import app
+
+    app.state.candidates = store
+    client = TestClient(app)
+    filters = [
+        {"path": path, "operator": op, "value": targets[path][op]}
+        for path, op in (("location", "!="), ("derived.salary", "<="))
+        if path in targets
+    ]
+    role = targets.get("work_experiences.roleName", {}).get("==", "engineer")
+    requests = {
+        "list": lambda i: client.get("/candidates", params={"from_fresh_candidates": True, "limit": 50}),
+        "list_sorted": lambda i: client.get(
+            "/candidates", params={"from_fresh_candidates": True, "limit": 50, "sort": "derived.salary", "order": "desc"},
+        ),
+        "filter": lambda i: client.post("/candidates/filter", params={"limit": 50}, json=filters),
+        "get": lambda i: client.get(f"/candidates/{ids[i % len(ids)]}"),
+        "search": lambda i: client.post("/candidates/search", json={"query": role, "limit": 20}),
+        "rank": lambda i: client.post(
+            "/candidates/rank", json={"weights": {"gpa": 1, "top50": 0.5, "years_since_grad": -0.5}, "limit": 10},
+        ),
+        "select": lambda i: client.post(f"/candidates/selected/{ids[i % len(ids)]}"),
+    }
+    results = {}
+    for name, request in requests.items():
+        response = request(0)
+        if response.status_code != 200:
+            raise RuntimeError(f"API benchmark {name} got {response.status_code}: {response.text[:200]}")
+        results[name] = timed_each(request, range(API_REQUESTS))
+    for candidate_id in ids:
+        store.remove_selected_candidate_by_id(candidate_id)
+    return results
+
+
+def run_size(n: int, seed: int, repeat: int, api: bool = True) -> dict:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    path = synthetic_submissions(n, seed)
+    results = {"generate_seconds": time.perf_counter() - start}
+    store, results["load"] = bench_load(path)
+    results["pool"] = {"submissions": n, "eligible": len(store)}
+    results["eligibility"] = bench_eligibility(path, store, repeat)
+    targets = filter_targets(store, rng)
+    results["filter_targets"] = targets
+    results["filters"] = bench_filters(store, targets, repeat)
+    pool = store.index.pool
+    positions = list(iter_positions(store.live_mask))
+    ids = [pool[p].id for p in rng.sample(positions, min(OPERATION_COUNT, len(positions)))]
+    if api:
+        results["api"] = bench_api(store, targets, ids)
+    results["operations"] = bench_operations(store, ids)
+    return results
+
+
+def run(sizes: Iterable[int], seed: int = 0, repeat: int = 5, api: bool = True) -> dict:
+    return {
+        "meta": run_metadata(seed),
+        "sizes": {str(n): run_size(n, seed, repeat, api) for n in sizes},
+    }
+
+
+def _timings(results: dict, prefix: str = "") -> Dict[str, float]:
+    # metric path -> p50 in ms, for every stats() block (and *_seconds value) in a run
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            if "p50_ms" in value:
+                flat[name] = value["p50_ms"]
+            elif key != "filter_targets":
+                flat.update(_timings(value, f"{name}/"))
+        elif key.endswith("_seconds"):
+            flat[name] = value * 1000
+    return flat
+
+
+def compare(before: dict, after: dict, threshold: float = 0.1) -> Tuple[List[str], int]:
+    # (report lines, regressions): after / before per metric, flagging changes
+    # beyond `threshold`
+    old, new = _timings(before["sizes"]), _timings(after["sizes"])
+    width = max((len(k) for k in new), default=0)
+    lines = [f"{before['meta'].get('commit')} -> {after['meta'].get('commit')} (p50 ms)"]
+    regressions = 0
+    for name in sorted(old.keys() & new.keys()):
+        ratio = new[name] / old[name] if old[name] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        lines.append(f"{name:<{width}}  {old[name]:>10.3f}  {new[name]:>10.3f}  x{ratio:.2f}{flag}")
+    for name in sorted(old.keys() ^ new.keys()):
+        lines.append(f"{name:<{width}}  only in {'before' if name in old else 'after'}")
+    return lines, regressions
+
+
+def write_results(results: dict, path: Path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
@@ -0,0 +1,226 @@
+import json
+import random
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from find_applicable_talent.backend.util.logger import get_logger
+from find_applicable_talent.backend import BASE_DIR, DATA_PATH
+
+logger = get_logger(__name__)
+
+# Synthetic submissions shaped like data/data.json for the benchmarks. Counts
+# (jobs, degrees, skills), dates, salaries and the small categorical fields follow
+# the bundled data; the open-ended vocabularies (locations, companies, roles,
+# schools, subjects, skills) start from the bundled values and grow with the pool
+# size, sampled with a Zipf-like skew so a few values are very common and most
+# are rare, as in real applications.
+
+SYNTHETIC_DIR = BASE_DIR / "data" / "synthetic"
+
+# distinct values at n submissions ~ bundled count * (n / bundled size) ** exponent
+GROWTH = {
+    "location": 0.5,
+    "company": 0.8,
+    "roleName": 0.3,
+    "originalSchool": 0.6,
+    "subject": 0.2,
+    "skill": 0.3,
+}
+# rank r is drawn with weight 1 / r ** ZIPF_EXPONENT
+ZIPF_EXPONENT = 1.05
+
+_SYLLABLES = (
+    "ar", "bel", "cor", "dan", "el", "fen", "gar", "hal", "is", "jor", "kel", "lin", "mar", "nor", "or",
+    "pen", "quin", "ros", "sel", "tor", "ul", "val", "wen", "xen", "yar", "zel", "bri", "cla", "dro", "fla",
+)
+_SUFFIXES = {
+    "location": ("", " City", " Springs", " Falls", " Heights", " Harbor"),
+    "company": (" Labs", " Systems", " Digital", " Ventures", " Technologies", " Group", " Health", " Partners"),
+    "roleName": (" Engineer", " Analyst", " Manager", " Specialist", " Consultant", " Developer", " Lead"),
+    "originalSchool": (" University", " College", " Institute of Technology", " State University"),
+    "subject": (" Studies", " Engineering", " Science"),
+    "skill": ("", ".js", " Ops", " Analytics"),
+}
+
+
+class Vocabulary:
+    # The bundled values (most frequent first) followed by made up ones, drawn by
+    # rank with Zipf weights
+    def __init__(self, field: str, counts: Counter, size: int, rng: random.Random):
+        values = [v for v, _ in counts.most_common()]
+        seen = set(values)
+        suffixes = _SUFFIXES[field]
+        while len(values) < size:
+            stem = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+            value = stem + rng.choice(suffixes)
+            if value not in seen:
+                seen.add(value)
+                values.append(value)
+        self.values = values[:max(size, 1)]
+        self.cum_weights = list(accumulate(1 / (rank ** ZIPF_EXPONENT) for rank in range(1, len(self.values) + 1)))
+        self.rng = rng
+
+    def draw(self) -> str:
+        return self.values[bisect_right(self.cum_weights, self.rng.random() * self.cum_weights[-1])]
+
+    def draw_distinct(self, k: int) -> List[str]:
+        k = min(k, len(self.values))
+        picked: Dict[str, None] = {}
+        while len(picked) < k:
+            picked.setdefault(self.draw())
+        return list(picked)
+
+
+class Empirical:
+    # Draws values with the frequencies they have in the bundled data
+    def __init__(self, values: list, rng: random.Random):
+        counts = Counter(json.dumps(v) for v in values)
+        self.values = [json.loads(v) for v in counts]
+        self.cum_weights = list(accumulate(counts.values()))
+        self.rng = rng
+
+    def draw(self):
+        return self.values[bisect_right(self.cum_weights, self.rng.random() * self.cum_weights[-1])]
+
+
+def _degrees(submission: dict) -> List[dict]:
+    return (submission.get("education") or {}).get("degrees") or []
+
+
+class SubmissionGenerator:
+    def __init__(self, n: int, seed: int = 0, template_path: Path = DATA_PATH):
+        with open(template_path, "r") as f:
+            template = json.load(f)
+        self.n = n
+        rng = self.rng = random.Random(seed)
+        scale = max(n / len(template), 1.0)
+
+        def vocabulary(field: str, values: list) -> Vocabulary:
+            counts = Counter(v for v in values if v)
+            return Vocabulary(field, counts, int(len(counts) * scale ** GROWTH[field]), rng)
+
+        jobs = [j for s in template for j in (s.get("work_experiences") or [])]
+        degrees = [d for s in template for d in _degrees(s)]
+        self.locations = vocabulary("location", [s.get("location") for s in template])
+        self.companies = vocabulary("company", [j.get("company") for j in jobs])
+        self.roles = vocabulary("roleName", [j.get("roleName") for j in jobs])
+        self.schools = vocabulary("originalSchool", [d.get("originalSchool") for d in degrees])
+        self.subjects = vocabulary("subject", [d.get("subject") for d in degrees])
+        self.skills = vocabulary("skill", [k for s in template for k in (s.get("skills") or [])])
+
+        def empirical(values: list) -> Callable[[], object]:
+            return Empirical(values, rng).draw
+
+        self.job_count = empirical([len(s.get("work_experiences") or []) for s in template])
+        self.degree_count = empirical([len(_degrees(s)) for s in template])
+        self.skill_count = empirical([len(s.get("skills") or []) for s in template])
+        self.highest_level = empirical([(s.get("education") or {}).get("highest_level") for s in template])
+        self.availability = empirical([s.get("work_availability") for s in template])
+        self.degree_type = empirical([d.get("degree") for d in degrees])
+        self.school_category = empirical([d.get("school") for d in degrees])
+        self.gpa = empirical([d.get("gpa") for d in degrees])
+        self.start_date = empirical([d.get("startDate", None) for d in degrees])
+        self.end_date = empirical([d.get("endDate", None) for d in degrees])
+        self.top = empirical([(d.get("isTop50", None), d.get("isTop25", None)) for d in degrees])
+        names = [s["name"].split() for s in template if len((s.get("name") or "").split()) == 2]
+        self.adjectives = sorted({first for first, _ in names}) or ["Clever"]
+        self.animals = sorted({last for _, last in names}) or ["Monkey"]
+        salaries = sorted(
+            int(v.lstrip("$")) for s in template for v in (s.get("annual_salary_expectation") or {}).values()
+            if isinstance(v, str) and v.lstrip("$").isdigit()
+        )
+        self.salary_range = (salaries[0], salaries[-1]) if salaries else (40000, 150000)
+        submitted = sorted(s["submitted_at"] for s in template if s.get("submitted_at"))
+        self.first_submitted = datetime.fromisoformat(submitted[0]) if submitted else datetime(2025, 1, 26)
+        self.submission_window = (
+            (datetime.fromisoformat(submitted[-1]) - self.first_submitted).total_seconds() if submitted else 4 * 86400
+        )
+
+    def _name(self) -> Tuple[str, str]:
+        words = [self.rng.choice(self.adjectives), self.rng.choice(self.animals)]
+        name = " ".join(words)
+        return name, f"{'-'.join(words).lower()}-{self.rng.randrange(10 ** 6)}@example.com"
+
+    def _degree(self) -> dict:
+        top50, top25 = self.top()
+        degree = {
+            "degree": self.degree_type(),
+            "subject": self.subjects.draw(),
+            "school": self.school_category(),
+            "gpa": self.gpa(),
+        }
+        # a few degrees in the bundled data have no dates, school or top lists at all
+        if top50 is None:
+            return degree
+        degree.update(
+            startDate=self.start_date() or "", endDate=self.end_date() or "",
+            originalSchool=self.schools.draw(), isTop50=top50,
+        )
+        if top25 is not None:
+            degree["isTop25"] = top25
+        return degree
+
+    def submission(self) -> dict:
+        rng = self.rng
+        name, email = self._name()
+        submitted_at = self.first_submitted + timedelta(seconds=rng.random() * self.submission_window)
+        low, high = self.salary_range
+        return {
+            "name": name,
+            "email": email,
+            "phone": str(rng.randrange(10 ** 10, 10 ** 13)),
+            "location": self.locations.draw(),
+            "submitted_at": submitted_at.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "work_availability": self.availability(),
+            "annual_salary_expectation": {"full-time": f"${int(rng.triangular(low, high, (low + high) / 2))}"},
+            "work_experiences": [
+                {"company": self.companies.draw(), "roleName": self.roles.draw()} for _ in range(self.job_count())
+            ],
+            "education": {
+                "highest_level": self.highest_level(),
+                "degrees": [self._degree() for _ in range(self.degree_count())],
+            },
+            "skills": self.skills.draw_distinct(self.skill_count()),
+        }
+
+    def __iter__(self) -> Iterator[dict]:
+        for _ in range(self.n):
+            yield self.submission()
+
+    def cardinalities(self) -> Dict[str, int]:
+        return {
+            "location": len(self.locations.values),
+            "company": len(self.companies.values),
+            "roleName": len(self.roles.values),
+            "originalSchool": len(self.schools.values),
+            "subject": len(self.subjects.values),
+            "skill": len(self.skills.values),
+        }
+
+
+def write_submissions(path: Path, n: int, seed: int = 0) -> Path:
+    # Streams the JSON array so a million submissions never sit in memory at once
+    generator = SubmissionGenerator(n, seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        f.write("[")
+        for i, submission in enumerate(generator):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(submission))
+        f.write("]\n")
+    tmp_path.replace(path)
+    logger.info("Wrote %s synthetic submissions to %s (vocabularies: %s)", n, path, generator.cardinalities())
+    return path
+
+
+def synthetic_submissions(n: int, seed: int = 0, directory: Optional[Path] = None) -> Path:
+    # The generated file for (n, seed), generated on first use
+    path = (directory or SYNTHETIC_DIR) / f"synthetic-{n}-{seed}.json"
+    if not path.exists():
+        write_submissions(path, n, seed)
+    return path
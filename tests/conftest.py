@@ -0,0 +1,55 @@
+import json
+from functools import partial
+import pytest
+from find_applicable_talent.backend import DATA_PATH
+from find_applicable_talent.backend import candidates, oplog, shared_pool
+from find_applicable_talent.backend.candidates import CandidateList
+
+SAMPLE_SIZE = 300
+
+
+@pytest.fixture(scope="session")
+def raw_submissions():
+    with open(DATA_PATH) as f:
+        return json.load(f)[:SAMPLE_SIZE]
+
+
+@pytest.fixture
+def submissions_path(tmp_path, raw_submissions):
+    # a private copy, so snapshots, segments and operation logs keyed by the
+    # source path never collide with the real pool's
+    path = tmp_path / "submissions.json"
+    path.write_text(json.dumps(raw_submissions))
+    yield path
+    log = oplog._logs.pop(str(oplog.oplog_path(str(path))), None)
+    if log is not None:
+        log.close()
+    log_path = oplog.oplog_path(str(path))
+    for leftover in (log_path, log_path.with_suffix(".opstate"), log_path.with_suffix(".lock")):
+        leftover.unlink(missing_ok=True)
+
+
+@pytest.fixture
+def load(submissions_path):
+    # CandidateList over the private copy; snapshots off unless asked for
+    def load(**kwargs):
+        kwargs.setdefault("use_snapshot", False)
+        kwargs.setdefault("shared", False)
+        return CandidateList(str(submissions_path), **kwargs)
+
+    return load
+
+
+@pytest.fixture
+def shared_load(load, tmp_path, monkeypatch):
+    # shared-mode CandidateList, every instance standing in for one worker; the
+    # segments and event logs go under tmp_path
+    snapshot_dir = tmp_path / "snapshots"
+    monkeypatch.setattr(candidates, "open_segment", partial(shared_pool.open_segment, snapshot_dir=snapshot_dir))
+
+    def shared_load(**kwargs):
+        kwargs.setdefault("use_oplog", False)
+        return load(shared=True, **kwargs)
+
+    shared_load.snapshot_dir = snapshot_dir
+    return shared_load
@@ -0,0 +1,106 @@
+from find_applicable_talent.backend.candidates import Candidate
+
+
+def _first_eligible(store, raw_submissions):
+    ids = {c.id for c in store.candidates}
+    for submission in raw_submissions:
+        candidate_id = Candidate(**dict(submission)).id
+        if candidate_id in ids:
+            return candidate_id, submission
+    raise AssertionError("no eligible submission in the sample")
+
+
+def test_delete_survives_reload(load, submissions_path, raw_submissions):
+    store = load()
+    candidate_id, _ = _first_eligible(store, raw_submissions)
+    assert store.remove_candidate_by_id(candidate_id)
+    store.commit()
+    store.reload_candidates(str(submissions_path))
+    assert store.get_candidate_by_id(candidate_id) is None
+    assert load().get_candidate_by_id(candidate_id) is None
+
+
+def test_reingested_candidate_survives_reload(load, submissions_path, raw_submissions):
+    store = load()
+    candidate_id, submission = _first_eligible(store, raw_submissions)
+    before = len(store)
+    assert store.remove_candidate_by_id(candidate_id)
+    stats = store.upsert_submissions([dict(submission)])
+    assert stats["added"] == 1 and stats["restored"] == 1
+    store.commit()
+
+    store.reload_candidates(str(submissions_path))
+    assert store.get_candidate_by_id(candidate_id) is not None
+    assert len(store) == before
+    # and on a restart
+    assert load().get_candidate_by_id(candidate_id) is not None
+
+
+def test_upsert_replaces_selected_candidate(load, raw_submissions):
+    store = load()
+    candidate_id, submission = _first_eligible(store, raw_submissions)
+    assert store.select_candidate_by_id(candidate_id)
+    stats = store.upsert_submissions([dict(submission, id=candidate_id, location="Upsertville")])
+    assert stats["updated"] == 1 and stats["added"] == 0
+    assert store.get_candidate_by_id(candidate_id).location == "Upsertville"
+    assert [c.location for c in store.get_selected_candidates()] == ["Upsertville"]
+    matched = store.dynamic_filters([{"path": "location", "operator": "==", "value": "Upsertville"}])
+    assert [c.id for c in matched] == [candidate_id]
+
+
+def test_ineligible_upsert_removes_candidate(load, raw_submissions):
+    store = load()
+    candidate_id, submission = _first_eligible(store, raw_submissions)
+    before = len(store)
+    jobs = [{"company": f"Company {i}", "roleName": "Engineer"} for i in range(11)]
+    stats = store.upsert_submissions([dict(submission, id=candidate_id, work_experiences=jobs)])
+    assert stats["ineligible"] == 1 and stats["removed"] == 1
+    assert store.get_candidate_by_id(candidate_id) is None
+    assert len(store) == before - 1
+
+
+def test_selection_survives_delete_and_reload(load, submissions_path, raw_submissions):
+    store = load()
+    candidate_id, _ = _first_eligible(store, raw_submissions)
+    assert store.select_candidate_by_id(candidate_id)
+    assert store.remove_candidate_by_id(candidate_id)
+    store.commit()
+    store.reload_candidates(str(submissions_path))
+    assert store.get_candidate_by_id(candidate_id) is None
+    assert [c.id for c in store.get_selected_candidates()] == [candidate_id]
+    assert store.remove_selected_candidate_by_id(candidate_id)
+    store.commit()
+    assert load().get_selected_candidates() == []
+
+
+def test_reingest_by_id_after_delete(load, submissions_path, raw_submissions):
+    store = load()
+    candidate_id, submission = _first_eligible(store, raw_submissions)
+    assert store.remove_candidate_by_id(candidate_id)
+    stats = store.upsert_submissions([dict(submission, id=candidate_id, location="Elsewhere")])
+    assert stats["restored"] == 1
+    store.commit()
+    # the upserted version, not the source's, on a reload and on a restart
+    store.reload_candidates(str(submissions_path))
+    assert store.get_candidate_by_id(candidate_id).location == "Elsewhere"
+    assert load().get_candidate_by_id(candidate_id).location == "Elsewhere"
+
+
+def test_ingested_applicants_survive_restart(load, submissions_path, raw_submissions):
+    store = load()
+    removed_id, submission = _first_eligible(store, raw_submissions)
+    new = dict(submission, id="new-applicant", name="New Applicant")
+    # no longer eligible, so it leaves the pool
+    jobs = [{"company": f"Company {i}", "roleName": "Engineer"} for i in range(11)]
+    store.upsert_submissions([new, dict(submission, id=removed_id, work_experiences=jobs)])
+    assert store.select_candidate_by_id("new-applicant")
+    store.commit()
+    expected = sorted(c.id for c in store.candidates)
+
+    store.reload_candidates(str(submissions_path))
+    for restarted in (store, load()):
+        assert sorted(c.id for c in restarted.candidates) == expected
+        assert restarted.get_candidate_by_id("new-applicant").name == "New Applicant"
+        assert restarted.get_candidate_by_id(removed_id) is None
+        assert [c.id for c in restarted.get_selected_candidates()] == ["new-applicant"]
+        assert [c.id for c in restarted.filtered_candidates] == [c.id for c in restarted.candidates]
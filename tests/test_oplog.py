@@ -0,0 +1,93 @@
+from find_applicable_talent.backend.oplog import (
+    _LOG_HEADER, _STATE_HEADER, DELETE, INGEST, SELECT, UNSELECT, OperationLog, _write_atomic, encode,
+)
+
+
+def _log(tmp_path, **kwargs):
+    kwargs.setdefault("commit_seconds", 0)
+    return OperationLog(tmp_path / "pool.oplog", **kwargs)
+
+
+def _state(tmp_path):
+    log = _log(tmp_path)
+    try:
+        return log.state()
+    finally:
+        log.close()
+
+
+def test_torn_record_is_dropped_and_not_glued_to_the_next(tmp_path):
+    log = _log(tmp_path)
+    log.append(SELECT, "a")
+    log.append(DELETE, "b")
+    log.wait()
+    log.close()
+    # a crash half way through the next record
+    with open(tmp_path / "pool.oplog", "ab") as f:
+        f.write(encode(DELETE, "c")[:-3])
+    state = _state(tmp_path)
+    assert state.deleted == {"b"} and list(state.selected) == ["a"]
+
+    log = _log(tmp_path)
+    log.append(SELECT, "d")
+    log.wait()
+    log.close()
+    state = _state(tmp_path)
+    assert state.deleted == {"b"} and list(state.selected) == ["a", "d"]
+
+
+def test_operations_add_up(tmp_path):
+    log = _log(tmp_path)
+    for operation in [
+        (SELECT, "a"), (SELECT, "b"), (UNSELECT, "a"), (SELECT, "a"),
+        (DELETE, "c"), (DELETE, "d"), (INGEST, "c", {"id": "c", "name": "C"}),
+        (INGEST, "e", {"id": "e", "name": "E"}), (INGEST, "c", {"id": "c", "name": "C again"}), (DELETE, "e"),
+    ]:
+        log.append(*operation)
+    log.wait()
+    log.close()
+    state = _state(tmp_path)
+    assert list(state.selected) == ["b", "a"]
+    assert state.deleted == {"d", "e"}
+    assert state.ingested == {"e": {"id": "e", "name": "E"}, "c": {"id": "c", "name": "C again"}}
+    assert list(state.ingested) == ["e", "c"]
+
+
+def test_compaction_keeps_state(tmp_path):
+    log = _log(tmp_path, compact_every=3)
+    for candidate_id in "abcde":
+        log.append(DELETE, candidate_id)
+        log.wait()
+    log.append(INGEST, "b", {"id": "b", "note": "line\nbreak \u00e9"})
+    log.append(INGEST, "f", {"id": "f"})
+    log.append(DELETE, "f")
+    log.append(SELECT, "e")
+    log.wait()
+    log.close()
+    assert (tmp_path / "pool.opstate").exists()
+    state = _state(tmp_path)
+    assert state.deleted == {"a", "c", "d", "e", "f"} and list(state.selected) == ["e"]
+    assert state.ingested == {"b": {"id": "b", "note": "line\nbreak \u00e9"}, "f": {"id": "f"}}
+
+
+def test_interrupted_compaction_is_not_replayed_twice(tmp_path):
+    log = _log(tmp_path)
+    log.append(SELECT, "a")
+    log.append(DELETE, "b")
+    log.wait()
+    log.close()
+    # compaction wrote the new state, then died before starting a fresh log
+    state = _state(tmp_path)
+    _write_atomic(tmp_path / "pool.opstate", [_STATE_HEADER + b" 1\n", *state.lines()])
+    with open(tmp_path / "pool.oplog", "ab") as f:
+        # only in the old log: must not come back
+        f.write(encode(UNSELECT, "a"))
+
+    log = _log(tmp_path)
+    assert list(log.state().selected) == ["a"]
+    log.append(DELETE, "c")
+    log.wait()
+    log.close()
+    assert (tmp_path / "pool.oplog").read_bytes().startswith(_LOG_HEADER + b" 1\n")
+    state = _state(tmp_path)
+    assert list(state.selected) == ["a"] and state.deleted == {"b", "c"}
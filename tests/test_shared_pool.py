@@ -0,0 +1,73 @@
+import pytest
+from find_applicable_talent.backend import candidates
+from find_applicable_talent.backend.shared_pool import LogSuperseded
+
+
+@pytest.fixture
+def fold_after(monkeypatch):
+    def fold_after(size: int):
+        monkeypatch.setattr(candidates, "EVENT_LOG_FOLD_BYTES", size)
+
+    return fold_after
+
+
+def _event_logs(shared_load):
+    return sorted(path.name for path in shared_load.snapshot_dir.glob("*.events"))
+
+
+def test_workers_agree_on_mutations(shared_load, raw_submissions):
+    first, second = shared_load(), shared_load()
+    ids = [c.id for c in first.candidates]
+    assert first.remove_candidate_by_id(ids[-1])
+    assert first.select_candidate_by_id(ids[1])
+    first.upsert_submissions(raw_submissions[:20])
+    assert second.events.pending()
+    second.sync()
+    assert second.get_candidate_by_id(ids[-1]) is None
+    assert list(second._selected) == [ids[1]]
+    assert {c.id for c in second.candidates} == {c.id for c in first.candidates}
+
+
+def test_log_folds_into_a_new_build(shared_load, fold_after, raw_submissions):
+    fold_after(50_000)
+    first, second = shared_load(), shared_load()
+    ids = [c.id for c in first.candidates]
+    build = first.segment.build_id
+    assert second.select_candidate_by_id(ids[1])
+    assert first.remove_candidate_by_id(ids[-1])
+    while first.segment.build_id == build:
+        first.upsert_submissions(raw_submissions[:60])
+    assert first.events.offset == 0
+
+    # the old log is sealed, the other worker follows the fold on its next append
+    with pytest.raises(LogSuperseded):
+        second.events.append({"op": "select", "id": ids[2]})
+    assert second.select_candidate_by_id(ids[2])
+    assert second.segment.build_id == first.segment.build_id
+    first.sync()
+    assert list(first._selected) == list(second._selected) == [ids[1], ids[2]]
+    assert first.get_candidate_by_id(ids[-1]) is None
+    assert {c.id for c in second.candidates} == {c.id for c in first.candidates}
+
+    # a worker starting now replays nothing from before the fold
+    third = shared_load()
+    assert third.segment.build_id == first.segment.build_id
+    assert list(third._selected) == [ids[1], ids[2]]
+    assert len(third) == len(first)
+
+
+def test_superseded_logs_are_deleted(shared_load, fold_after, raw_submissions):
+    fold_after(10_000)
+    first, behind = shared_load(), shared_load()
+    builds = [first.segment.build_id]
+    while len(builds) < 4:
+        first.upsert_submissions(raw_submissions[:40])
+        if first.segment.build_id != builds[-1]:
+            builds.append(first.segment.build_id)
+    # the current build's log and the one it replaced
+    assert len(_event_logs(shared_load)) == 2
+    assert not behind.events.path.exists()
+    assert behind.events.pending()
+    behind.sync()
+    assert behind.segment.build_id == builds[-1]
+    assert len(behind) == len(first)
@@ -0,0 +1,110 @@
+import os
+from find_applicable_talent.backend.columnar import Column
+from find_applicable_talent.backend.shared_pool import open_segment
+from find_applicable_talent.backend.snapshot import load_snapshot, snapshot_path, source_header, write_snapshot
+
+SCHEMA = 1
+THRESHOLD = 0.8
+ROWS = [("a", 1), ("b", 2)]
+
+
+def _snapshot(submissions_path, tmp_path, dedup=True, threshold=THRESHOLD):
+    header = source_header(str(submissions_path), SCHEMA, dedup, threshold)
+    write_snapshot(str(submissions_path), ROWS, header, tmp_path / "snapshots")
+
+    def load(schema=SCHEMA, dedup=dedup, threshold=threshold):
+        return load_snapshot(str(submissions_path), schema, dedup, threshold, tmp_path / "snapshots")
+
+    return load
+
+
+def test_fresh_snapshot_loads(submissions_path, tmp_path):
+    load = _snapshot(submissions_path, tmp_path)
+    assert load() == ROWS
+
+
+def test_changed_source_is_stale(submissions_path, tmp_path):
+    load = _snapshot(submissions_path, tmp_path)
+    with open(submissions_path, "a") as f:
+        f.write(" ")
+    assert load() is None
+
+
+def test_same_size_edit_is_stale(submissions_path, tmp_path):
+    load = _snapshot(submissions_path, tmp_path)
+    size = os.stat(submissions_path).st_size
+    submissions_path.write_bytes(submissions_path.read_bytes().replace(b"a", b"b", 1))
+    # only the content hash can tell
+    assert os.stat(submissions_path).st_size == size
+    assert load() is None
+
+
+def test_touched_source_still_loads(submissions_path, tmp_path):
+    load = _snapshot(submissions_path, tmp_path)
+    stat = os.stat(submissions_path)
+    os.utime(submissions_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load() == ROWS
+
+
+def test_other_schema_is_stale(submissions_path, tmp_path):
+    load = _snapshot(submissions_path, tmp_path)
+    assert load(schema=SCHEMA + 1) is None
+
+
+def test_source_replaced_while_loading_is_stale(submissions_path, tmp_path):
+    # the rows came from the file as it was before the load started
+    header = source_header(str(submissions_path), SCHEMA, True, THRESHOLD)
+    submissions_path.write_text("[]")
+    write_snapshot(str(submissions_path), ROWS, header, tmp_path / "snapshots")
+    assert load_snapshot(str(submissions_path), SCHEMA, True, THRESHOLD, tmp_path / "snapshots") is None
+
+
+def test_other_dedup_settings_are_stale(submissions_path, tmp_path):
+    load = _snapshot(submissions_path, tmp_path)
+    assert load(dedup=False) is None
+    assert load(threshold=0.9) is None
+    # the threshold means nothing while dedup is off
+    load = _snapshot(submissions_path, tmp_path, dedup=False)
+    assert load(threshold=0.9) == ROWS
+    assert load(dedup=True) is None
+
+
+def test_corrupt_snapshot_is_ignored(submissions_path, tmp_path):
+    load = _snapshot(submissions_path, tmp_path)
+    path = snapshot_path(str(submissions_path), tmp_path / "snapshots")
+    path.write_bytes(path.read_bytes()[:40])
+    assert load() is None
+
+
+def test_segment_rebuilds_when_stale(submissions_path, tmp_path):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return ROWS, {"id": Column("id")}
+
+    def segment(token=None, dedup=True):
+        return open_segment(str(submissions_path), SCHEMA, dedup, THRESHOLD, build, token, tmp_path / "snapshots")
+
+    first = segment()
+    assert segment().build_id == first.build_id and len(builds) == 1
+    # a reload token the segment wasn't built for
+    reloaded = segment("reload-1")
+    assert reloaded.build_id != first.build_id and len(builds) == 2
+    assert segment("reload-1").build_id == reloaded.build_id and len(builds) == 2
+    with open(submissions_path, "a") as f:
+        f.write(" ")
+    changed = segment("reload-1")
+    assert changed.build_id != reloaded.build_id and len(builds) == 3
+    assert segment("reload-1", dedup=False).build_id != changed.build_id and len(builds) == 4
+
+
+def test_toggling_dedup_rebuilds_the_pool(shared_load):
+    collapsed = shared_load(dedup=True)
+    assert shared_load(dedup=True).segment.build_id == collapsed.segment.build_id
+    uncollapsed = shared_load(dedup=False)
+    assert uncollapsed.segment.build_id != collapsed.segment.build_id
+    assert uncollapsed.dedup_stats is None
+    changed = shared_load(dedup=True, dedup_threshold=0.5)
+    assert changed.segment.build_id != uncollapsed.segment.build_id
+    assert changed.dedup_stats is not None